@@ -0,0 +1,159 @@
+"""Rollups and retention for user activity (view history).
+
+refresh_trending() counts each vehicle's views over the last day and week - a range
+read of the view_history(viewed_at) index - and replaces the `vehicle_trending` table
+in one short write, so /cars/trending is a read of a few hundred rows. The score is
+the last day's views plus the weekly daily average, which favours vehicles picking
+up interest without dropping steady ones.
+
+compact_view_history() deletes views older than VIEW_HISTORY_RETENTION_DAYS in small
+batches, so request writes interleave with it instead of waiting on one long delete.
+Both run as single-instance scheduler jobs (see scheduler.py).
+
+record_view() is the write side. A detail page re-rendering or being refreshed posts
+the same view again, so a (user, vehicle) pair seen within VIEW_DEDUP_WINDOW_S, or a
+repeated Idempotency-Key, is dropped before it reaches the database. Both are
+remembered in bounded in-memory sets, per worker.
+"""
+
+import asyncio
+import os
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Dict, Hashable, List, Optional
+
+from sqlalchemy import case, delete, func, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from . import metrics
+from .models import Vehicle, VehicleTrending, ViewHistory
+
+VIEW_HISTORY_RETENTION_DAYS = int(os.getenv("VIEW_HISTORY_RETENTION_DAYS", "365"))  # 0 keeps everything
+COMPACT_BATCH_SIZE = 5000
+VIEW_DEDUP_WINDOW_S = float(os.getenv("VIEW_DEDUP_WINDOW_S", "1800"))  # 0 records every view
+IDEMPOTENCY_KEY_TTL_S = 24 * 3600
+RECENT_VIEWS_MAX = int(os.getenv("RECENT_VIEWS_MAX", "200000"))  # remembered keys per set
+
+VIEWS_DROPPED = metrics.Counter("view_history_duplicates_total", "Views not recorded because they repeat one.",
+                                ["reason"])
+
+
+class RecentKeys:
+    """Keys seen in the last `ttl_s` seconds, oldest first, at most `max_keys` of them.
+
+    A key's time is when it was first recorded, not refreshed on repeats, so the
+    order is also expiry order and expired keys are popped from the front.
+    """
+
+    def __init__(self, ttl_s: float, max_keys: int = RECENT_VIEWS_MAX):
+        self.ttl_s = ttl_s
+        self.max_keys = max_keys
+        self._seen: "OrderedDict[int, float]" = OrderedDict()  # hash of key -> first seen
+
+    def __len__(self) -> int:
+        return len(self._seen)
+
+    def add(self, key: Hashable, now: float) -> bool:
+        """Remember `key`; False if it was already seen within the window."""
+        h = hash(key)  # an int per entry keeps the set compact; a 64-bit collision drops one view
+        seen = self._seen.get(h)
+        if seen is not None and now - seen < self.ttl_s:
+            return False
+        self._seen.pop(h, None)
+        self._seen[h] = now
+        while self._seen:
+            oldest = next(iter(self._seen.values()))
+            if now - oldest < self.ttl_s and len(self._seen) <= self.max_keys:
+                break
+            self._seen.popitem(last=False)
+        return True
+
+    def discard(self, key: Hashable) -> None:
+        self._seen.pop(hash(key), None)
+
+
+recent_views = RecentKeys(VIEW_DEDUP_WINDOW_S)
+idempotency_keys = RecentKeys(IDEMPOTENCY_KEY_TTL_S)
+
+
+async def record_view(db: AsyncSession, user_id: str, vehicle_id: int, idempotency_key: Optional[str] = None) -> bool:
+    """Insert a view unless it repeats a recent one; True if it was recorded."""
+    now = time.monotonic()
+    # Both checks happen before the first await, so concurrent duplicates cannot both pass
+    if idempotency_key is not None and not idempotency_keys.add((user_id, idempotency_key), now):
+        VIEWS_DROPPED.inc(reason="idempotency_key")
+        return False
+    view = (user_id, vehicle_id)
+    if VIEW_DEDUP_WINDOW_S > 0 and not recent_views.add(view, now):
+        VIEWS_DROPPED.inc(reason="window")
+        return False
+    try:
+        db.add(ViewHistory(user_id=user_id, vehicle_id=vehicle_id))
+        await db.commit()
+    except BaseException:  # not recorded, so a retry must not be dropped
+        recent_views.discard(view)
+        if idempotency_key is not None:
+            idempotency_keys.discard((user_id, idempotency_key))
+        raise
+    return True
+
+
+async def refresh_trending(read_db: AsyncSession, write_db: AsyncSession) -> Dict[str, int]:
+    """Recompute vehicle_trending from the last 7 days of views."""
+    now = datetime.utcnow()
+    day, week = now - timedelta(days=1), now - timedelta(days=7)
+    views_24h = func.sum(case((ViewHistory.viewed_at >= day, 1), else_=0))
+    rows = (await read_db.execute(
+        select(ViewHistory.vehicle_id, views_24h, func.count())
+        .where(ViewHistory.viewed_at >= week)
+        .group_by(ViewHistory.vehicle_id)
+    )).all()
+    await write_db.execute(delete(VehicleTrending))
+    if rows:
+        await write_db.execute(insert(VehicleTrending), [
+            {"vehicle_id": vid, "views_24h": d, "views_7d": w, "score": d + w / 7, "computed_at": now}
+            for vid, d, w in rows
+        ])
+    await write_db.commit()
+    return {"vehicles": len(rows), "views_7d": sum(w for _, _, w in rows)}
+
+
+async def trending(db: AsyncSession, limit: int) -> List[Dict[str, object]]:
+    """Most-viewed vehicles as of the last refresh, highest score first."""
+    rows = (await db.execute(
+        select(Vehicle, VehicleTrending)
+        .join(VehicleTrending, VehicleTrending.vehicle_id == Vehicle.id)
+        .order_by(VehicleTrending.score.desc())
+        .limit(limit)
+    )).all()
+    return [
+        {
+            "vehicle": vehicle,
+            "views_24h": t.views_24h,
+            "views_7d": t.views_7d,
+            "score": round(t.score, 2),
+            "computed_at": t.computed_at,
+        }
+        for vehicle, t in rows
+    ]
+
+
+async def compact_view_history(db: AsyncSession, retention_days: int = VIEW_HISTORY_RETENTION_DAYS) -> Dict[str, int]:
+    """Delete views older than the retention window, one committed batch at a time."""
+    if retention_days <= 0:
+        return {"deleted": 0}
+    cutoff = datetime.utcnow() - timedelta(days=retention_days)
+    batch = select(ViewHistory.id).where(ViewHistory.viewed_at < cutoff).limit(COMPACT_BATCH_SIZE)
+    deleted = 0
+    while True:
+        result = await db.execute(delete(ViewHistory).where(ViewHistory.id.in_(batch.scalar_subquery())))
+        await db.commit()
+        deleted += result.rowcount
+        if result.rowcount < COMPACT_BATCH_SIZE:
+            return {"deleted": deleted}
+        await asyncio.sleep(0)  # let queued request writes take the connection
+
+
+metrics.GaugeFunc("view_history_recent_keys", "Views and idempotency keys remembered for deduplication.", ["set"],
+                  lambda: {("views",): len(recent_views), ("idempotency_keys",): len(idempotency_keys)})
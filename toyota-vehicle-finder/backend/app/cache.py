@@ -0,0 +1,197 @@
+"""In-process caches of catalog data, kept coherent across workers by the change feed.
+
+Each uvicorn worker holds its own caches (vehicle listings, single vehicles, the
+chatbot's inventory context, the fuzzy search vocabulary, filter facets). Writers
+record every catalog change in the database (catalog.record_change), and each worker
+runs a CatalogWatcher that polls `catalog_version` - one primary-key read - every
+CATALOG_POLL_INTERVAL_S seconds. When the version moves it reads the change log and
+drops only the entries that depend on the changed vehicles, or everything after a
+bulk change (seed, import).
+
+A worker that makes a change itself invalidates at once; other workers follow within
+one poll interval. CATALOG_POLL_INTERVAL_S=0 disables polling (single worker, no
+out-of-process imports).
+"""
+
+import asyncio
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Iterable, List, Optional, Set, Tuple
+
+from . import metrics
+from .catalog import catalog_version, changes_since
+from .database import AsyncReadSessionLocal
+
+CATALOG_POLL_INTERVAL_S = float(os.getenv("CATALOG_POLL_INTERVAL_S", "1"))
+
+_MISS = object()
+
+
+class CatalogCache:
+    """Bounded LRU of values derived from the catalog.
+
+    Entries stored with `vehicle_ids` are dropped when one of those vehicles changes;
+    entries stored without (listings, aggregates) depend on the whole catalog and are
+    dropped on any change.
+    """
+
+    def __init__(self, name: str, max_entries: int):
+        self.name = name
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Hashable, Tuple[Any, Optional[Tuple[int, ...]]]]" = OrderedDict()
+        self._by_vehicle: Dict[int, Set[Hashable]] = {}
+        self._lock = threading.Lock()
+        # Bumped by every invalidation; a load that started before one is not stored.
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+        _CACHES.append(self)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._entries.get(key, _MISS)
+            if entry is _MISS:
+                self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key: Hashable, value: Any, vehicle_ids: Optional[Iterable[int]] = None,
+            generation: Optional[int] = None) -> bool:
+        """Store `value`; skipped (returns False) if the cache was invalidated since `generation`."""
+        tags = tuple(vehicle_ids) if vehicle_ids is not None else None
+        with self._lock:
+            if generation is not None and generation != self.generation:
+                return False
+            self._remove(key)
+            self._entries[key] = (value, tags)
+            for vid in tags or ():
+                self._by_vehicle.setdefault(vid, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+            return True
+
+    async def get_or_load(self, key: Hashable, load: Callable[[], Awaitable[Any]],
+                          vehicle_ids: Optional[Iterable[int]] = None) -> Any:
+        value = self.get(key, _MISS)
+        if value is not _MISS:
+            return value
+        generation = self.generation
+        value = await load()
+        self.put(key, value, vehicle_ids, generation)
+        return value
+
+    def _remove(self, key: Hashable) -> None:
+        entry = self._entries.pop(key, None)
+        for vid in (entry[1] or ()) if entry else ():
+            keys = self._by_vehicle.get(vid)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._by_vehicle[vid]
+
+    def invalidate(self, vehicle_ids: Optional[Iterable[int]] = None) -> None:
+        """Drop entries depending on `vehicle_ids` (and all whole-catalog entries); None drops everything."""
+        with self._lock:
+            self.generation += 1
+            if vehicle_ids is None:
+                self._entries.clear()
+                self._by_vehicle.clear()
+                return
+            stale = {key for key, (_, tags) in self._entries.items() if tags is None}
+            for vid in vehicle_ids:
+                stale |= self._by_vehicle.get(vid, set())
+            for key in stale:
+                self._remove(key)
+
+
+_CACHES: List[CatalogCache] = []
+
+# Caches shared by the API and the chatbot
+LISTINGS = CatalogCache("listings", max_entries=64)
+VEHICLES = CatalogCache("vehicles", max_entries=4096)
+INVENTORY_CONTEXT = CatalogCache("inventory_context", max_entries=256)
+SEARCH_INDEX = CatalogCache("search_index", max_entries=1)  # fuzzy.catalog_index()
+FACETS = CatalogCache("facets", max_entries=1)  # facets.catalog_facets()
+MATCH_INDEX = CatalogCache("match_index", max_entries=1)  # matching.match_index()
+
+
+_LISTENERS: List[Callable[[Optional[List[int]]], None]] = []
+
+
+def on_invalidate(listener: Callable[[Optional[List[int]]], None]) -> None:
+    """Call `listener(vehicle_ids)` after every invalidate() (None = everything changed)."""
+    _LISTENERS.append(listener)
+
+
+def off_invalidate(listener: Callable[[Optional[List[int]]], None]) -> None:
+    """Stop calling a listener registered with on_invalidate(); no-op if it is not registered."""
+    if listener in _LISTENERS:
+        _LISTENERS.remove(listener)
+
+
+def invalidate(vehicle_ids: Optional[Iterable[int]] = None) -> None:
+    """Invalidate every catalog cache in this process."""
+    ids = None if vehicle_ids is None else list(vehicle_ids)
+    for cache in _CACHES:
+        cache.invalidate(ids)
+    for listener in list(_LISTENERS):
+        listener(ids)
+
+
+class CatalogWatcher:
+    """Polls the change feed and invalidates this worker's caches."""
+
+    def __init__(self, interval_s: float = CATALOG_POLL_INTERVAL_S, session_factory=AsyncReadSessionLocal):
+        self.interval_s = interval_s
+        self.session_factory = session_factory
+        self.version: Optional[int] = None
+        self.polls = 0
+        self.invalidations = 0
+
+    async def poll(self) -> bool:
+        """Check the catalog version once; returns True if caches were invalidated."""
+        self.polls += 1
+        async with self.session_factory() as db:
+            version = await db.run_sync(lambda s: catalog_version(s.connection()))
+            if self.version is None or version == self.version:
+                self.version = version
+                return False
+            since = self.version
+            changed = await db.run_sync(lambda s: changes_since(s.connection(), since))
+        if changed is None or None in changed:
+            invalidate()
+        else:
+            invalidate(changed)
+        self.version = version
+        self.invalidations += 1
+        return True
+
+    async def run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval_s)
+            try:
+                await self.poll()
+            except Exception as e:  # keep polling; a locked or missing table is transient
+                print("[cache] catalog poll failed:", type(e).__name__, str(e))
+
+
+watcher = CatalogWatcher()
+
+metrics.CounterFunc(
+    "catalog_cache_requests_total",
+    "Catalog cache lookups by cache and result.",
+    ["cache", "result"],
+    lambda: {k: v for c in _CACHES for k, v in (((c.name, "hit"), c.hits), ((c.name, "miss"), c.misses))},
+)
+metrics.GaugeFunc("catalog_cache_entries", "Entries held per catalog cache.", ["cache"],
+                  lambda: {(c.name,): len(c) for c in _CACHES})
+metrics.GaugeFunc("catalog_version", "Last catalog version this worker has seen.", [],
+                  lambda: {(): watcher.version} if watcher.version is not None else {})
+metrics.CounterFunc("catalog_invalidations_total", "Cache invalidations triggered by the change feed.", [],
+                    lambda: {(): watcher.invalidations})
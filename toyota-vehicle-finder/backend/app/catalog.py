@@ -0,0 +1,141 @@
+"""Catalog write helpers shared by the startup seed, the bulk importer and admin edits.
+
+Every write to `vehicles` goes through record_change() in the same transaction: it
+bumps `catalog_version` in catalog_meta and appends to the catalog_changes feed, which
+each worker polls (see cache.py) to drop cached catalog data.
+"""
+
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import Integer, delete, func, insert, select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.engine import Connection
+
+from .geo import ensure_spatial_index
+from .pricing import ensure_price_history
+from .models import Base, CatalogChange, CatalogMeta, Dealer, Stock, Vehicle
+
+VEHICLE_KEY = ("model", "year", "trim")  # unique key for a vehicle
+CATALOG_VERSION_KEY = "catalog_version"
+CHANGE_LOG_KEEP = 10000  # versions kept in catalog_changes; older rows are pruned
+
+
+def _dedupe_vehicles(conn: Connection) -> int:
+    """Fold duplicate (model, year, trim) rows into the lowest id so the unique index can be built."""
+    dupes = conn.exec_driver_sql(
+        "SELECT v.id, k.keep FROM vehicles v JOIN ("
+        " SELECT model, year, trim, MIN(id) AS keep FROM vehicles"
+        " GROUP BY model, year, trim HAVING COUNT(*) > 1"
+        ") k ON v.model = k.model AND v.year = k.year AND v.trim = k.trim AND v.id <> k.keep"
+    ).all()
+    for dupe_id, keep_id in dupes:
+        for table in ("favorites", "comparisons", "view_history", "stock"):
+            conn.exec_driver_sql(f"UPDATE {table} SET vehicle_id = ? WHERE vehicle_id = ?", (keep_id, dupe_id))
+        for table in ("price_history", "vehicle_trending"):
+            conn.exec_driver_sql(f"DELETE FROM {table} WHERE vehicle_id = ?", (dupe_id,))
+        conn.exec_driver_sql("DELETE FROM vehicles WHERE id = ?", (dupe_id,))
+    return len(dupes)
+
+
+def ensure_schema(conn: Connection) -> None:
+    """Create missing tables and indexes.
+
+    create_all only adds indexes along with new tables, so databases created before an
+    index existed (the (model, year, trim) unique key, the timestamp indexes exports
+    read by) get it here; duplicate vehicles are folded together first. The dealer
+    R*Tree (a virtual table) and the price-history triggers are created here too.
+    """
+    Base.metadata.create_all(bind=conn)
+    ensure_spatial_index(conn)
+    ensure_price_history(conn)
+    for table in Base.metadata.sorted_tables:
+        index_names = {row[1] for row in conn.exec_driver_sql(f"PRAGMA index_list({table.name})")}
+        missing = [ix for ix in table.indexes if ix.name not in index_names]
+        if table is Vehicle.__table__ and any(ix.unique for ix in missing):
+            _dedupe_vehicles(conn)
+        for index in missing:
+            index.create(bind=conn)
+
+
+def _upsert(conn: Connection, table, key: Tuple[str, ...], rows: List[Dict]) -> None:
+    """INSERT ... ON CONFLICT (key) DO UPDATE for a batch of dicts."""
+    if not rows:
+        return
+    stmt = sqlite_insert(table)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[table.c[k] for k in key],
+        set_={c.name: stmt.excluded[c.name] for c in table.columns if c.name not in key and c.name != "id"},
+    )
+    conn.execute(stmt, rows)
+
+
+def upsert_vehicles(conn: Connection, rows: List[Dict]) -> None:
+    """Upsert vehicle dicts keyed on (model, year, trim)."""
+    _upsert(conn, Vehicle.__table__, VEHICLE_KEY, rows)
+
+
+def upsert_dealers(conn: Connection, rows: List[Dict]) -> None:
+    """Upsert dealer dicts keyed on name."""
+    _upsert(conn, Dealer.__table__, ("name",), rows)
+
+
+def upsert_stock(conn: Connection, rows: List[Dict]) -> None:
+    """Upsert stock units keyed on VIN."""
+    _upsert(conn, Stock.__table__, ("vin",), rows)
+
+
+def get_meta(conn: Connection, key: str):
+    return conn.execute(select(CatalogMeta.value).where(CatalogMeta.key == key)).scalar()
+
+
+def set_meta(conn: Connection, key: str, value: str) -> None:
+    stmt = sqlite_insert(CatalogMeta.__table__).values(key=key, value=value)
+    conn.execute(stmt.on_conflict_do_update(index_elements=["key"], set_={"value": stmt.excluded.value}))
+
+
+def catalog_version(conn: Connection) -> int:
+    return int(get_meta(conn, CATALOG_VERSION_KEY) or 0)
+
+
+def bump_catalog_version(conn: Connection) -> int:
+    """Increment the catalog version and return it.
+
+    The increment is a single upsert, so the transaction takes the write lock before
+    reading the version and two concurrent writers can never hand out the same number.
+    """
+    stmt = sqlite_insert(CatalogMeta.__table__).values(key=CATALOG_VERSION_KEY, value="1")
+    conn.execute(stmt.on_conflict_do_update(
+        index_elements=["key"],
+        set_={"value": func.cast(CatalogMeta.__table__.c.value, Integer) + 1},
+    ))
+    return catalog_version(conn)
+
+
+def record_change(conn: Connection, source: str, vehicle_ids: Optional[Iterable[int]] = None) -> int:
+    """Bump the catalog version and log the change (call once per logical write).
+
+    `vehicle_ids` names the rows touched; None marks a bulk change, which makes
+    readers drop everything instead of individual vehicles.
+    """
+    version = bump_catalog_version(conn)
+    ids = sorted(set(vehicle_ids)) if vehicle_ids is not None else [None]
+    conn.execute(insert(CatalogChange.__table__), [
+        {"version": version, "vehicle_id": vid, "source": source} for vid in ids
+    ])
+    if version % 100 == 0:
+        conn.execute(delete(CatalogChange.__table__).where(CatalogChange.version <= version - CHANGE_LOG_KEEP))
+    return version
+
+
+def changes_since(conn: Connection, version: int, limit: int = 1000) -> Optional[List[Optional[int]]]:
+    """Vehicle ids changed after `version` (None entries = bulk change).
+
+    Returns None when the log no longer covers `version` or holds more than `limit`
+    rows, i.e. when the reader should treat it as a bulk change.
+    """
+    if catalog_version(conn) - version > CHANGE_LOG_KEEP:
+        return None
+    rows = conn.execute(
+        select(CatalogChange.vehicle_id).where(CatalogChange.version > version).limit(limit + 1)
+    ).scalars().all()
+    return None if len(rows) > limit else list(rows)
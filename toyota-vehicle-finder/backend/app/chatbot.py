@@ -5,32 +5,40 @@
 #    summarized by Gemini in ONE short paragraph (≤ ~70 words).
 # 3) Reliability intent (e.g., “reliability of prius”) handled explicitly via web.
 # 4) Robust Gemini extraction (avoids .text crashes), strict brevity, no tables/lists.
+# 5) Web and inventory-LLM fallbacks raced under one latency budget (CHAT_DEADLINE_S).
+# 6) Token streaming (stream_chat_response) for the /chat/stream SSE endpoint.
+# 7) Identical concurrent web searches / Gemini calls coalesced into one (single-flight).
+# 8) Prometheus metrics (see metrics.py): stage latencies, rule hits, winners, coalescing.
 
 import os
 import re
+import time
 import asyncio
-from typing import Optional, List, Dict, Tuple
+import threading
+from contextlib import contextmanager
+from typing import AsyncIterator, Optional, List, Dict, Tuple
 
 from dotenv import load_dotenv, find_dotenv
-import google.generativeai as genai
-from google.generativeai.types import HarmCategory, HarmBlockThreshold
 import requests
-from pydantic import BaseModel
-from sqlalchemy.orm import Session
+from sqlalchemy import or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
 
+from . import metrics
 from .models import Vehicle  # fields: year, model, trim, price, mpg_combined
+from .singleflight import SingleFlight, normalize_key
+from .cache import INVENTORY_CONTEXT
+from .fuzzy import TrigramIndex, normalize, tokenize
+from .inventory_context import build_inventory_context, detect_intents
+from .concurrency import Overloaded, limiter_stats, llm_limiter, web_limiter
 
 # -----------------------------------------------------------------------------
-# Env + Gemini config
+# Env + LLM backend (see llm.py: LLM_PROVIDER=gemini|stub, breaker, timeout)
 # -----------------------------------------------------------------------------
 load_dotenv(find_dotenv(usecwd=True), override=True)
 
-API_KEY = os.getenv("GEMINI_API_KEY", "")
-genai.configure(api_key=API_KEY)
+from .llm import LLMUnavailable, llm_from_env  # noqa: E402  (reads env loaded above)
 
-# Use a model your key supports (confirmed via list_models())
-MODEL_NAME = "models/gemini-2.5-flash"  # alternatives: "models/gemini-2.5-pro", "models/gemini-pro-latest"
-_model = genai.GenerativeModel(MODEL_NAME)
+_llm = llm_from_env()
 
 # -----------------------------------------------------------------------------
 # Output style (ONE short paragraph, plain text)
@@ -42,29 +50,10 @@ Use inventory price/MPG when available; otherwise omit numbers.
 Briefly state the tradeoff (who should pick which). Output plain text only.
 """
 
-GEN_CFG = {
-    "temperature": 0.3,
-    "top_p": 0.9,
-    "max_output_tokens": 120,  # brevity
-}
-
-# Loosen safety for benign car-shopping queries to reduce empty responses
-SAFETY_SETTINGS = {
-    HarmCategory.HARM_CATEGORY_HARASSMENT: HarmBlockThreshold.BLOCK_NONE,
-    HarmCategory.HARM_CATEGORY_HATE_SPEECH: HarmBlockThreshold.BLOCK_NONE,
-    HarmCategory.HARM_CATEGORY_SEXUALLY_EXPLICIT: HarmBlockThreshold.BLOCK_NONE,
-    HarmCategory.HARM_CATEGORY_DANGEROUS_CONTENT: HarmBlockThreshold.BLOCK_NONE,
-}
-
 # -----------------------------------------------------------------------------
 # Schemas (kept for compatibility with your existing imports)
 # -----------------------------------------------------------------------------
-class ChatMessage(BaseModel):
-    message: str
-    context: str = ""
-
-class ChatResponse(BaseModel):
-    response: str
+from .schemas import ChatMessage, ChatResponse  # noqa: F401  (defined in schemas so main.py can skip importing this module)
 
 # -----------------------------------------------------------------------------
 # Inventory helpers
@@ -88,12 +77,24 @@ _MODEL_ALIASES: Dict[str, List[str]] = {
     "gr86": ["gr86", "gr 86", "86"],
 }
 
+# Misspellings beyond the listed aliases ("highlandr", "tacomma"): trigram index over
+# every alias, mapped back to its canonical model
+_ALIAS_TO_MODEL = {normalize(v): canonical for canonical, variants in _MODEL_ALIASES.items() for v in variants}
+_MODEL_INDEX = TrigramIndex(_ALIAS_TO_MODEL)
+# Ordinary words are only corrected to a model when they also look alike ("carry" stays)
+_MODEL_MIN_SIMILARITY = 0.4
+
 def _extract_models_from_text(text: str) -> List[str]:
     t = text.lower()
     found: List[str] = []
     for canonical, variants in _MODEL_ALIASES.items():
         if any(v in t for v in variants):
             found.append(canonical)
+    for word in tokenize(t):
+        if len(word) >= 4 and normalize(word) not in _ALIAS_TO_MODEL:
+            match = _MODEL_INDEX.lookup(word, min_similarity=_MODEL_MIN_SIMILARITY, limit=1)
+            if match:
+                found.append(_ALIAS_TO_MODEL[normalize(match[0][0])])
     # preserve order, unique
     seen, ordered = set(), []
     for m in found:
@@ -102,12 +103,19 @@ def _extract_models_from_text(text: str) -> List[str]:
             seen.add(m)
     return ordered
 
-def _query_by_model(db: Session, canonical_model: str) -> List[Vehicle]:
-    return (
-        db.query(Vehicle)
-        .filter(Vehicle.model.ilike(f"%{canonical_model}%"))
-        .all()
+async def _query_by_model(db: AsyncSession, canonical_model: str) -> List[Vehicle]:
+    result = await db.execute(
+        select(Vehicle).where(Vehicle.model.ilike(f"%{canonical_model}%"))
+    )
+    return list(result.scalars().all())
+
+async def _query_by_models(db: AsyncSession, canonical_models: List[str]) -> List[List[Vehicle]]:
+    """Rows for several models in one query, split per model (same matching as _query_by_model)."""
+    result = await db.execute(
+        select(Vehicle).where(or_(*[Vehicle.model.ilike(f"%{m}%") for m in canonical_models]))
     )
+    rows = list(result.scalars().all())
+    return [[r for r in rows if m in (r.model or "").lower()] for m in canonical_models]
 
 def _price_range_and_mpg(rows: List[Vehicle]) -> Tuple[Optional[Tuple[float, float]], Optional[int]]:
     if not rows:
@@ -127,19 +135,21 @@ def _format_money_range(rng: Tuple[float, float]) -> str:
         return f"${lo:,.0f}"
     return f"${lo:,.0f}–${hi:,.0f}"
 
-def _most_expensive(db: Session) -> Optional[Tuple[int, str, str, float]]:
-    row = db.query(Vehicle).order_by(Vehicle.price.desc()).first()
+async def _most_expensive(db: AsyncSession) -> Optional[Tuple[int, str, str, float]]:
+    result = await db.execute(select(Vehicle).order_by(Vehicle.price.desc()).limit(1))
+    row = result.scalars().first()
     if not row:
         return None
     return (row.year, row.model, row.trim, float(row.price))
 
-def _most_efficient(db: Session) -> Optional[Tuple[int, str, str, int]]:
-    row = (
-        db.query(Vehicle)
-        .filter(Vehicle.mpg_combined.isnot(None))
+async def _most_efficient(db: AsyncSession) -> Optional[Tuple[int, str, str, int]]:
+    result = await db.execute(
+        select(Vehicle)
+        .where(Vehicle.mpg_combined.isnot(None))
         .order_by(Vehicle.mpg_combined.desc())
-        .first()
+        .limit(1)
     )
+    row = result.scalars().first()
     if not row:
         return None
     return (row.year, row.model, row.trim, int(round(float(row.mpg_combined))))
@@ -172,6 +182,20 @@ def _is_trims_question(text: str) -> bool:
     t = text.lower()
     return any(k in t for k in ["trim", "trims", "grade", "grades", "variant", "variants"])
 
+def _rule_intent(text: str) -> str:
+    """Which rule a message is aimed at (first match, same order as _handle_rules); for metrics."""
+    if _is_most_expensive(text):
+        return "most_expensive"
+    if _is_efficiency_question(text):
+        return "efficiency"
+    if _is_trims_question(text):
+        return "trims"
+    if _is_price_question(text):
+        return "price"
+    if _is_compare_question(text):
+        return "compare"
+    return "none"
+
 def _is_reliability_question(text: str) -> bool:
     t = text.lower()
     # reliability, reliable, dependability, breakdowns, maintenance, issues, problems (catch misspellings)
@@ -180,10 +204,10 @@ def _is_reliability_question(text: str) -> bool:
 # -----------------------------------------------------------------------------
 # Rule-based responses (deterministic, fast)
 # -----------------------------------------------------------------------------
-def _handle_rules(message: str, db: Session) -> Optional[str]:
+async def _handle_rules(message: str, db: AsyncSession) -> Optional[str]:
     # Most expensive in inventory
     if _is_most_expensive(message):
-        top = _most_expensive(db)
+        top = await _most_expensive(db)
         if top:
             y, m, tr, p = top
             return f"The most expensive Toyota in our inventory is the {y} {m} {tr} at ${p:,.0f}."
@@ -191,7 +215,7 @@ def _handle_rules(message: str, db: Session) -> Optional[str]:
 
     # Most fuel-efficient in inventory
     if _is_efficiency_question(message):
-        eff = _most_efficient(db)
+        eff = await _most_efficient(db)
         if eff:
             y, m, tr, mpg = eff
             return f"Our most fuel-efficient Toyota in inventory is the {y} {m} {tr}, around {mpg} MPG combined."
@@ -203,7 +227,7 @@ def _handle_rules(message: str, db: Session) -> Optional[str]:
         if len(models) == 0:
             return "Which Toyota model should I list trims for?"
         mk = models[0]
-        rows = _query_by_model(db, mk)
+        rows = await _query_by_model(db, mk)
         trims = sorted({(r.trim or "").strip() for r in rows if (r.trim or "").strip()})
         name = mk.upper() if mk == "gr86" else mk.capitalize()
         if trims:
@@ -216,7 +240,7 @@ def _handle_rules(message: str, db: Session) -> Optional[str]:
         models = _extract_models_from_text(message)
         if len(models) == 1:
             mk = models[0]
-            rows = _query_by_model(db, mk)
+            rows = await _query_by_model(db, mk)
             pr, mpg = _price_range_and_mpg(rows)
             name = mk.upper() if mk == "gr86" else mk.capitalize()
             if pr:
@@ -225,7 +249,7 @@ def _handle_rules(message: str, db: Session) -> Optional[str]:
             return f"I don’t have pricing for {name} in our inventory."
         if len(models) >= 2:
             a, b = models[0], models[1]
-            rows_a, rows_b = _query_by_model(db, a), _query_by_model(db, b)
+            rows_a, rows_b = await _query_by_models(db, [a, b])
             pra, mpga = _price_range_and_mpg(rows_a)
             prb, mpgb = _price_range_and_mpg(rows_b)
             name_a = a.upper() if a == "gr86" else a.capitalize()
@@ -245,7 +269,7 @@ def _handle_rules(message: str, db: Session) -> Optional[str]:
         models = _extract_models_from_text(message)
         if len(models) >= 2:
             a, b = models[0], models[1]
-            rows_a, rows_b = _query_by_model(db, a), _query_by_model(db, b)
+            rows_a, rows_b = await _query_by_models(db, [a, b])
             pra, mpga = _price_range_and_mpg(rows_a)
             prb, mpgb = _price_range_and_mpg(rows_b)
             name_a = a.upper() if a == "gr86" else a.capitalize()
@@ -265,8 +289,24 @@ def _handle_rules(message: str, db: Session) -> Optional[str]:
 # Web fallback (Tavily)
 # -----------------------------------------------------------------------------
 TAVILY_KEY = os.getenv("TAVILY_API_KEY", "")
+# "stub" returns canned results after WEB_STUB_LATENCY_MS, for offline/load testing
+WEB_SEARCH_PROVIDER = os.getenv("WEB_SEARCH_PROVIDER", "tavily").lower()
+WEB_STUB_LATENCY_S = float(os.getenv("WEB_STUB_LATENCY_MS", "100")) / 1000
+
+def _stub_search(query: str, max_results: int) -> List[dict]:
+    time.sleep(WEB_STUB_LATENCY_S)
+    return [
+        {
+            "title": f"Stub result {i + 1}: {query[:80]}",
+            "content": "Owners report solid reliability and low running costs for this model.",
+            "url": f"https://example.com/stub/{i + 1}",
+        }
+        for i in range(min(max_results, 3))
+    ]
 
 def search_web(query: str, sites: List[str] | None = None, max_results: int = 5) -> List[dict]:
+    if WEB_SEARCH_PROVIDER == "stub":
+        return _stub_search(query, max_results)
     if not TAVILY_KEY:
         return []
     q = query
@@ -302,38 +342,8 @@ WEB_DOMAINS_DEFAULT = [
 ]
 
 # -----------------------------------------------------------------------------
-# Gemini helpers (robust text extraction + formatting)
+# Formatting
 # -----------------------------------------------------------------------------
-def _extract_text(resp) -> Optional[str]:
-    text = getattr(resp, "text", None)
-    if text:
-        return text.strip()
-
-    pf = getattr(resp, "prompt_feedback", None)
-    if pf:
-        print("[gemini] prompt_feedback:", pf)
-
-    cands = getattr(resp, "candidates", None) or []
-    if not cands:
-        print("[gemini] no candidates returned")
-        return None
-
-    for idx, c in enumerate(cands):
-        fr = getattr(c, "finish_reason", None)
-        fb = getattr(c, "finish_message", None)
-        print(f"[gemini] candidate[{idx}] finish_reason={fr} finish_message={fb}")
-        content = getattr(c, "content", None)
-        parts = getattr(content, "parts", None) if content else None
-        if parts:
-            chunks = []
-            for p in parts:
-                t = getattr(p, "text", None)
-                if t:
-                    chunks.append(t)
-            if chunks:
-                return " ".join(chunks).strip()
-    return None
-
 def _clean_one_paragraph(text: str, word_cap: int = 75) -> str:
     para = " ".join(text.split())
     if "|" in para:  # strip any table residue
@@ -343,38 +353,81 @@ def _clean_one_paragraph(text: str, word_cap: int = 75) -> str:
         para = " ".join(words[:word_cap]) + "…"
     return para
 
+class _IncrementalParagraph:
+    """Streaming counterpart of _clean_one_paragraph: same output, fed chunk by chunk."""
+
+    def __init__(self, word_cap: int = 75):
+        self.word_cap = word_cap
+        self.words = 0
+        self.pending = ""  # trailing partial word of the last chunk
+        self.done = False
+
+    def _emit(self, words: List[str]) -> str:
+        out: List[str] = []
+        for w in words:
+            if self.words >= self.word_cap:
+                self.done = True
+                return "".join(out) + "…"
+            out.append(w if self.words == 0 else " " + w)
+            self.words += 1
+        return "".join(out)
+
+    def feed(self, chunk: str) -> str:
+        if self.done:
+            return ""
+        buf = (self.pending + chunk).replace("|", " ")
+        words = buf.split()
+        if words and not buf[-1].isspace():
+            self.pending = words.pop()
+        else:
+            self.pending = ""
+        return self._emit(words)
+
+    def flush(self) -> str:
+        if self.done or not self.pending:
+            return ""
+        words, self.pending = [self.pending], ""
+        return self._emit(words)
+
 # -----------------------------------------------------------------------------
-# Public API
+# Fallback pipeline (latency budget)
 # -----------------------------------------------------------------------------
-def get_car_context(db: Session) -> str:
-    cars: List[Vehicle] = db.query(Vehicle).all()
-    lines = [f"- {c.year} {c.model} {c.trim}: ${c.price:,} (MPG: {c.mpg_combined})" for c in cars]
-    return "Currently available vehicles:\n" + ("\n".join(lines) if lines else "(none)") + "\n\nBe concise and neutral."
+# Overall budget for the web/LLM fallback stages. Whatever is not answered by
+# then gets the neutral one-liner instead of blocking the user.
+CHAT_DEADLINE_S = float(os.getenv("CHAT_DEADLINE_S", "12"))
+# Longest gap between two streamed chunks; a stream that stalls mid-answer ends with what it sent
+LLM_STREAM_IDLE_S = float(os.getenv("LLM_STREAM_IDLE_S", str(_llm.timeout_s)))
 
-async def generate_chat_response(message: str, db: Session) -> str:
-    """
-    1) Try rule-based answers for price/efficiency/trims/compare using DB (fast + deterministic).
-    2) Reliability questions: search reliability sources and summarize.
-    3) If not handled, do a quick web search on trusted domains and summarize (ONE short paragraph).
-    4) If web gives nothing, ask Gemini using inventory context.
-    5) If Gemini still returns nothing, return a neutral one-liner.
-    """
-    # 1) Rules
-    rule = _handle_rules(message, db)
-    if rule:
-        return _clean_one_paragraph(rule, word_cap=65)
+NEUTRAL_REPLY = "I can pull Toyota info from our inventory and trusted sources. What model or detail should I focus on?"
 
-    # 2) Reliability-first handling (web preferred)
-    if _is_reliability_question(message):
-        models = _extract_models_from_text(message)
-        if models:
-            q = f"Toyota {models[0]} reliability owner reports 2024 2025"
-        else:
-            q = "Toyota reliability owner reports 2024 2025"
-        rel_results = search_web(q, sites=WEB_DOMAINS_DEFAULT, max_results=5)
-        if rel_results:
-            web_ctx = build_web_context(rel_results)
-            prompt = f"""{STYLE_GUIDE}
+# -----------------------------------------------------------------------------
+# Metrics
+# -----------------------------------------------------------------------------
+STAGE_LATENCY = metrics.Histogram("chat_stage_duration_seconds", "Time spent in each chatbot stage.", ["stage"])
+RULE_CHECKS = metrics.Counter(
+    "chat_rule_checks_total", "Messages checked against the rules, by intent and whether a rule answered.", ["intent", "hit"]
+)
+ANSWERS = metrics.Counter("chat_answers_total", "Chat replies by the stage that produced them.", ["mode", "winner"])
+WEB_SEARCH_LATENCY = metrics.Histogram(
+    "chat_web_search_duration_seconds", "Web search calls (coalesced waiters not included).", ["provider"]
+)
+LLM_LATENCY = metrics.Histogram("chat_llm_duration_seconds", "LLM generate calls by outcome.", ["provider", "outcome"])
+
+@contextmanager
+def _stage(timings: Dict[str, object], name: str):
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - t0
+        timings[name] = round(elapsed * 1000, 1)
+        STAGE_LATENCY.observe(elapsed, stage=name)
+
+def _record_rules(message: str, answered: bool) -> None:
+    RULE_CHECKS.inc(intent=_rule_intent(message), hit=str(answered).lower())
+
+def _web_prompt(web_ctx: str, message: str) -> str:
+    return f"""{STYLE_GUIDE}
 
 Use ONLY this web context to answer (if insufficient, say so briefly):
 {web_ctx}
@@ -384,74 +437,307 @@ USER:
 
 Return exactly one concise paragraph (plain text, ≤70 words). No lists. No tables.
 """
-            try:
-                def _call_rel():
-                    return _model.generate_content(
-                        prompt,
-                        generation_config=GEN_CFG,
-                        safety_settings=SAFETY_SETTINGS,
-                    )
-                resp = await asyncio.to_thread(_call_rel)
-                text = _extract_text(resp)
-                if text:
-                    return _clean_one_paragraph(text, word_cap=70)
-            except Exception as e:
-                print("[gemini] reliability summarize error:", type(e).__name__, str(e))
-        # If reliability search failed, fall through to general web/LLM
-
-    # 3) General web fallback (trusted domains)
-    web_results = search_web(message, sites=WEB_DOMAINS_DEFAULT, max_results=5)
-    if web_results:
-        web_ctx = build_web_context(web_results)
-        prompt = f"""{STYLE_GUIDE}
 
-Use ONLY this web context to answer (if insufficient, say so briefly):
-{web_ctx}
+def _inventory_prompt(inventory: str, message: str) -> str:
+    return f"""{STYLE_GUIDE}
+
+INVENTORY:
+{inventory}
 
 USER:
 {message}
 
 Return exactly one concise paragraph (plain text, ≤70 words). No lists. No tables.
 """
+
+# Concurrent identical requests (e.g. a promo-driven burst of the same question)
+# share one in-flight web search / Gemini call.
+_web_flight = SingleFlight("web_search")
+_llm_flight = SingleFlight("llm")
+
+def singleflight_stats() -> Dict[str, Dict[str, int]]:
+    return {f.name: f.stats() for f in (_web_flight, _llm_flight)}
+
+def llm_stats() -> Dict[str, object]:
+    return _llm.stats()
+
+def outbound_stats() -> Dict[str, Dict[str, object]]:
+    return limiter_stats()
+
+metrics.CounterFunc(
+    "chat_coalesced_total",
+    "Calls answered by an identical call already in flight (single-flight hits).",
+    ["flight"],
+    lambda: {(f.name,): f.deduplicated for f in (_web_flight, _llm_flight)},
+)
+metrics.GaugeFunc(
+    "chat_llm_circuit_open",
+    "1 while the LLM circuit breaker is open (LLM stages are skipped).",
+    ["provider"],
+    lambda: {(_llm.provider.name,): float(_llm.breaker.state == "open")},
+)
+
+def warm_up() -> None:
+    """Pay one-time LLM SDK import/configuration before the first chat request."""
+    _llm.provider.warm_up()
+
+def _timed_search_web(query: str, sites: List[str] | None, max_results: int) -> List[dict]:
+    t0 = time.perf_counter()
+    try:
+        return search_web(query, sites, max_results)
+    finally:
+        WEB_SEARCH_LATENCY.observe(time.perf_counter() - t0, provider=WEB_SEARCH_PROVIDER)
+
+async def _search(query: str, sites: List[str] | None = None, max_results: int = 5) -> List[dict]:
+    key = (normalize_key(query), tuple(sites or ()), max_results)
+    try:
+        return await _web_flight.do(key, lambda: web_limiter.run(_timed_search_web, query, sites, max_results))
+    except Overloaded as e:
+        print("[web] search shed:", str(e))
+        return []
+
+async def _summarize(prompt: str, label: str) -> Optional[str]:
+    async def _run() -> Optional[str]:
+        t0 = time.perf_counter()
+        outcome = "empty"
         try:
-            def _call_web():
-                return _model.generate_content(
-                    prompt,
-                    generation_config=GEN_CFG,
-                    safety_settings=SAFETY_SETTINGS,
-                )
-            resp = await asyncio.to_thread(_call_web)
-            text = _extract_text(resp)
+            text = await _llm.generate(prompt)
             if text:
+                outcome = "ok"
                 return _clean_one_paragraph(text, word_cap=70)
+        except (LLMUnavailable, Overloaded):
+            outcome = "skipped"
+        except asyncio.CancelledError:
+            outcome = "cancelled"
+            raise
         except Exception as e:
-            print("[gemini] web summarize error:", type(e).__name__, str(e))
+            outcome = "error"
+            print(f"[llm] {label} error:", type(e).__name__, str(e))
+        finally:
+            if outcome != "skipped":
+                LLM_LATENCY.observe(time.perf_counter() - t0, provider=_llm.provider.name, outcome=outcome)
+        return None
+
+    return await _llm_flight.do(normalize_key(prompt), _run)
+
+def _reliability_query(message: str) -> str:
+    models = _extract_models_from_text(message)
+    if models:
+        return f"Toyota {models[0]} reliability owner reports 2024 2025"
+    return "Toyota reliability owner reports 2024 2025"
+
+async def _web_stage(message: str, timings: Dict[str, object]) -> Optional[str]:
+    # Reliability questions search reliability sources first, then fall through
+    # to the general trusted-domain search.
+    if _is_reliability_question(message):
+        q = _reliability_query(message)
+        with _stage(timings, "reliability_search"):
+            rel_results = await _search(q, WEB_DOMAINS_DEFAULT, 5)
+        if rel_results:
+            with _stage(timings, "reliability_llm"):
+                text = await _summarize(_web_prompt(build_web_context(rel_results), message), "reliability summarize")
+            if text:
+                return text
 
-    # 4) Final LLM attempt (inventory-only)
+    with _stage(timings, "web_search"):
+        web_results = await _search(message, WEB_DOMAINS_DEFAULT, 5)
+    if not web_results:
+        return None
+    with _stage(timings, "web_llm"):
+        return await _summarize(_web_prompt(build_web_context(web_results), message), "web summarize")
+
+async def _inventory_stage(message: str, inventory: str, timings: Dict[str, object]) -> Optional[str]:
+    with _stage(timings, "inventory_llm"):
+        return await _summarize(_inventory_prompt(inventory, message), "inventory attempt")
+
+async def _first_acceptable(tasks: Dict[str, "asyncio.Task[Optional[str]]"], timeout: float) -> Tuple[Optional[str], Optional[str]]:
+    """Return (stage, text) of the first task yielding a non-empty answer; cancel the rest."""
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    names = {task: name for name, task in tasks.items()}
+    pending = set(tasks.values())
     try:
-        inventory = get_car_context(db)
-        prompt = f"""{STYLE_GUIDE}
+        while pending:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            done, pending = await asyncio.wait(pending, timeout=remaining, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.cancelled():
+                    continue
+                exc = task.exception()
+                if exc is not None:
+                    print(f"[llm] {names[task]} stage error:", type(exc).__name__, str(exc))
+                    continue
+                if task.result():
+                    return names[task], task.result()
+        return None, None
+    finally:
+        for task in pending:
+            task.cancel()
 
-INVENTORY:
-{inventory}
+# -----------------------------------------------------------------------------
+# Streaming (SSE)
+# -----------------------------------------------------------------------------
+async def _search_context(message: str, timings: Dict[str, object]) -> Optional[str]:
+    """Web context for the streamed answer: reliability sources first, then trusted domains."""
+    if _is_reliability_question(message):
+        with _stage(timings, "reliability_search"):
+            results = await _search(_reliability_query(message), WEB_DOMAINS_DEFAULT, 5)
+        if results:
+            return build_web_context(results)
+    with _stage(timings, "web_search"):
+        results = await _search(message, WEB_DOMAINS_DEFAULT, 5)
+    return build_web_context(results) if results else None
 
-USER:
-{message}
+# -----------------------------------------------------------------------------
+# Public API
+# -----------------------------------------------------------------------------
+async def get_car_context(db: AsyncSession, message: str = "") -> str:
+    # Grouped per model, relevant models first, capped at INVENTORY_CONTEXT_MAX_CHARS.
+    # Cached per (models, intents) until the catalog changes (see cache.py)
+    models, intents = _extract_models_from_text(message), detect_intents(message)
+    context = await INVENTORY_CONTEXT.get_or_load(
+        (tuple(models), frozenset(intents)), lambda: build_inventory_context(db, models, intents)
+    )
+    return "Currently available vehicles:\n" + context + "\n\nBe concise and neutral."
+
+async def generate_chat_response(
+    message: str,
+    db: AsyncSession,
+    timings: Optional[Dict[str, object]] = None,
+    deadline_s: Optional[float] = None,
+) -> str:
+    """
+    1) Try rule-based answers for price/efficiency/trims/compare using DB (fast + deterministic).
+    2) Otherwise race, within one latency budget:
+       - web: reliability search (for reliability questions), then a trusted-domain search, summarized by Gemini;
+       - inventory: Gemini over the inventory context.
+       The first non-empty answer wins and the other stage is cancelled.
+    3) If nothing answers before the deadline, or the LLM backend is unconfigured or
+       its circuit breaker is open, return a neutral one-liner.
 
-Return exactly one concise paragraph (plain text, ≤70 words). No lists. No tables.
-"""
-        def _call():
-            return _model.generate_content(
-                prompt,
-                generation_config=GEN_CFG,
-                safety_settings=SAFETY_SETTINGS,
-            )
-        resp = await asyncio.to_thread(_call)
-        text = _extract_text(resp)
+    Raises Overloaded when the LLM call queue is already full.
+
+    Per-stage durations (ms) are written to `timings` when given.
+    """
+    timings = timings if timings is not None else {}
+    t0 = time.perf_counter()
+    try:
+        # 1) Rules
+        with _stage(timings, "rules"):
+            rule = await _handle_rules(message, db)
+        _record_rules(message, bool(rule))
+        if rule:
+            timings["winner"] = "rules"
+            return _clean_one_paragraph(rule, word_cap=65)
+
+        # Every remaining stage needs the LLM; don't pay for web searches or
+        # timeouts while it is unconfigured or its circuit breaker is open.
+        if not _llm.ready():
+            timings["winner"] = "llm_unavailable"
+            return NEUTRAL_REPLY
+        # Fail fast instead of queueing behind a full LLM backlog.
+        if llm_limiter.saturated():
+            timings["winner"] = "overloaded"
+            raise Overloaded("llm: queue full")
+
+        # 2) Web + inventory LLM, concurrently
+        inventory = await get_car_context(db, message)
+        tasks = {
+            "web": asyncio.create_task(_web_stage(message, timings)),
+            "inventory": asyncio.create_task(_inventory_stage(message, inventory, timings)),
+        }
+        budget = CHAT_DEADLINE_S if deadline_s is None else deadline_s
+        winner, text = await _first_acceptable(tasks, budget)
         if text:
-            return _clean_one_paragraph(text, word_cap=70)
-    except Exception as e:
-        print("[gemini] final attempt error:", type(e).__name__, str(e))
+            timings["winner"] = winner
+            return text
+
+        # 3) Neutral one-liner last
+        timings["winner"] = "neutral"
+        return NEUTRAL_REPLY
+    finally:
+        timings["total"] = round((time.perf_counter() - t0) * 1000, 1)
+        ANSWERS.inc(mode="json", winner=timings.get("winner", "error"))
+
+async def stream_chat_response(
+    message: str,
+    db: AsyncSession,
+    timings: Optional[Dict[str, object]] = None,
+    deadline_s: Optional[float] = None,
+) -> AsyncIterator[str]:
+    """
+    Streaming variant of generate_chat_response, yielding text pieces as they are ready.
+
+    Rule answers are yielded at once as a single piece. Otherwise web context is fetched
+    (falling back to the inventory context) and the Gemini answer is streamed with the
+    word cap applied incrementally. The deadline bounds the time to the first piece;
+    if it expires, or nothing is produced, the neutral one-liner is yielded instead.
+    Later pieces may each take up to LLM_STREAM_IDLE_S; a stream that stalls longer
+    ends with what was already yielded.
+    """
+    timings = timings if timings is not None else {}
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + (CHAT_DEADLINE_S if deadline_s is None else deadline_s)
+    t0 = time.perf_counter()
+    try:
+        with _stage(timings, "rules"):
+            rule = await _handle_rules(message, db)
+        _record_rules(message, bool(rule))
+        if rule:
+            timings["winner"] = "rules"
+            yield _clean_one_paragraph(rule, word_cap=65)
+            return
+
+        if not _llm.ready():
+            timings["winner"] = "llm_unavailable"
+            yield NEUTRAL_REPLY
+            return
+        if llm_limiter.saturated():
+            timings["winner"] = "overloaded"
+            yield NEUTRAL_REPLY
+            return
 
-    # 5) Neutral one-liner last
-    return "I can pull Toyota info from our inventory and trusted sources. What model or detail should I focus on?"
+        try:
+            web_ctx = await asyncio.wait_for(_search_context(message, timings), timeout=max(0.0, deadline - loop.time()))
+        except asyncio.TimeoutError:
+            web_ctx = None
+        if web_ctx:
+            stage, prompt = "web", _web_prompt(web_ctx, message)
+        else:
+            stage, prompt = "inventory", _inventory_prompt(await get_car_context(db, message), message)
+
+        para = _IncrementalParagraph(word_cap=70)
+        # The stream enforces the timeouts itself, so it can tell a stall from a client going away
+        chunks = _llm.stream(
+            prompt, first_chunk_s=min(LLM_STREAM_IDLE_S, max(0.0, deadline - loop.time())), idle_s=LLM_STREAM_IDLE_S
+        )
+        emitted = False
+        try:
+            while not para.done:
+                try:
+                    chunk = await chunks.__anext__()
+                except (StopAsyncIteration, asyncio.TimeoutError, LLMUnavailable, Overloaded):
+                    break
+                piece = para.feed(chunk)
+                if piece:
+                    if not emitted:
+                        timings["first_token"] = round((time.perf_counter() - t0) * 1000, 1)
+                        emitted = True
+                    yield piece
+            tail = para.flush()
+            if tail:
+                emitted = True
+                yield tail
+        finally:
+            await chunks.aclose()
+
+        if emitted:
+            timings["winner"] = stage
+        else:
+            timings["winner"] = "neutral"
+            yield NEUTRAL_REPLY
+    finally:
+        timings["total"] = round((time.perf_counter() - t0) * 1000, 1)
+        ANSWERS.inc(mode="stream", winner=timings.get("winner", "cancelled"))
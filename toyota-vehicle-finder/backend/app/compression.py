@@ -0,0 +1,175 @@
+"""Response compression negotiated from Accept-Encoding: zstd, br, or gzip.
+
+gzip is always available; brotli and zstandard are used when their packages are
+installed (both optional). Bodies under COMPRESSION_MIN_BYTES, Server-Sent Events and
+already-encoded responses pass through untouched. Whole-body responses get a
+Content-Length; streamed bodies are compressed chunk by chunk.
+"""
+
+import os
+import zlib
+from typing import Callable, Dict, List, Optional, Tuple
+
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import Headers, MutableHeaders
+
+try:  # optional
+    import brotli
+except ImportError:
+    brotli = None
+
+try:  # optional
+    import zstandard
+except ImportError:
+    zstandard = None
+
+COMPRESSION_MIN_BYTES = int(os.getenv("COMPRESSION_MIN_BYTES", "1024"))
+# Bodies this large are compressed on a worker thread so the event loop keeps serving.
+OFFLOAD_BYTES = 256 * 1024
+
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 4  # brotli's default (11) is far too slow for dynamic responses
+ZSTD_LEVEL = 3
+
+_SKIP_TYPES = ("text/event-stream", "image/", "video/", "audio/", "application/zip", "application/gzip",
+               "application/vnd.apache.parquet")
+
+
+class _Stream:
+    """Incremental compressor with a uniform compress()/finish() interface."""
+
+    def __init__(self, compress: Callable[[bytes], bytes], finish: Callable[[], bytes]):
+        self.compress = compress
+        self.finish = finish
+
+
+def _gzip_stream() -> _Stream:
+    c = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)  # wbits 31 = gzip container
+    return _Stream(c.compress, c.flush)
+
+
+def _brotli_stream() -> _Stream:
+    c = brotli.Compressor(quality=BROTLI_QUALITY)
+    return _Stream(c.process, c.finish)
+
+
+def _zstd_stream() -> _Stream:
+    c = zstandard.ZstdCompressor(level=ZSTD_LEVEL).compressobj()
+    return _Stream(c.compress, c.flush)
+
+
+def available_encodings() -> List[str]:
+    """Supported encodings in server preference order."""
+    out = []
+    if zstandard is not None:
+        out.append("zstd")
+    if brotli is not None:
+        out.append("br")
+    out.append("gzip")
+    return out
+
+
+_STREAMS: Dict[str, Callable[[], _Stream]] = {"gzip": _gzip_stream, "br": _brotli_stream, "zstd": _zstd_stream}
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    stream = _STREAMS[encoding]()
+    return stream.compress(body) + stream.finish()
+
+
+def choose_encoding(accept_encoding: str, supported: Optional[List[str]] = None) -> Optional[str]:
+    """Best supported encoding the client accepts (honouring q-values), or None for identity."""
+    supported = available_encodings() if supported is None else supported
+    accepted: Dict[str, float] = {}
+    for part in accept_encoding.split(","):
+        token, _, params = part.strip().partition(";")
+        token = token.strip().lower()
+        if not token:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        accepted[token] = q
+    best: Optional[Tuple[float, int, str]] = None
+    for rank, enc in enumerate(supported):
+        q = accepted.get(enc, accepted.get("*", 0.0))
+        if q > 0 and (best is None or (q, -rank) > (best[0], best[1])):
+            best = (q, -rank, enc)
+    return best[2] if best else None
+
+
+class CompressionMiddleware:
+    def __init__(self, app, minimum_size: int = COMPRESSION_MIN_BYTES):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = choose_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        state = {"start": None, "stream": None, "passthrough": False}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                state["start"] = message  # held until the first body chunk shows the size
+                return
+            if message["type"] != "http.response.body" or state["passthrough"]:
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more = message.get("more_body", False)
+
+            if state["stream"] is not None:
+                chunk = state["stream"].compress(body)
+                if not more:
+                    chunk += state["stream"].finish()
+                if chunk or not more:
+                    await send({"type": "http.response.body", "body": chunk, "more_body": more})
+                return
+
+            start = state["start"]
+            headers = MutableHeaders(raw=list(start["headers"]))
+            content_type = headers.get("content-type", "")
+            eligible = (
+                start["status"] not in (204, 304)
+                and "content-encoding" not in headers
+                and not content_type.startswith(_SKIP_TYPES)
+                and (more or len(body) >= self.minimum_size)
+            )
+            if not eligible:
+                state["passthrough"] = True
+                await send(start)
+                await send(message)
+                return
+
+            headers["Content-Encoding"] = encoding
+            headers.add_vary_header("Accept-Encoding")
+            if more:
+                # Streamed body: compress incrementally; the final length is unknown.
+                del headers["Content-Length"]
+                state["stream"] = _STREAMS[encoding]()
+                await send(dict(start, headers=headers.raw))
+                chunk = state["stream"].compress(body)
+                if chunk:
+                    await send({"type": "http.response.body", "body": chunk, "more_body": True})
+                return
+
+            if len(body) >= OFFLOAD_BYTES:
+                data = await run_in_threadpool(compress, body, encoding)
+            else:
+                data = compress(body, encoding)
+            headers["Content-Length"] = str(len(data))
+            await send(dict(start, headers=headers.raw))
+            await send({"type": "http.response.body", "body": data})
+
+        await self.app(scope, receive, send_wrapper)
@@ -0,0 +1,112 @@
+"""Bounded outbound concurrency for chatbot LLM and web-search calls.
+
+Blocking outbound calls run on a dedicated thread pool, never on the default executor
+that sync FastAPI endpoints share, so a chat burst cannot starve /cars and friends.
+Each kind of call has its own async limiter: at most N calls run, at most M wait, and
+a caller waits at most `max_wait_s` for a slot. Anything beyond that is rejected at
+once with Overloaded so the API can answer 503 or degrade instead of piling up.
+"""
+
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+
+class Overloaded(Exception):
+    """No slot became free in time (or the wait queue is full)."""
+
+
+class CallLimiter:
+    def __init__(self, name: str, max_concurrency: int, max_queue: int, max_wait_s: float, executor: ThreadPoolExecutor):
+        self.name = name
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.max_wait_s = max_wait_s
+        self._executor = executor
+        self._sem: Optional[asyncio.Semaphore] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self.in_flight = 0
+        self.queued = 0
+        self.rejected = 0
+        self.completed = 0
+
+    def _semaphore(self) -> asyncio.Semaphore:
+        # Created lazily so it binds to the running loop (matters on Python 3.9).
+        loop = asyncio.get_running_loop()
+        if self._sem is None or self._loop is not loop:
+            self._sem = asyncio.Semaphore(self.max_concurrency)
+            self._loop = loop
+            self.in_flight = 0
+        return self._sem
+
+    def saturated(self) -> bool:
+        """True when a new caller would be rejected immediately."""
+        return self.in_flight >= self.max_concurrency and self.queued >= self.max_queue
+
+    async def acquire(self) -> None:
+        sem = self._semaphore()
+        if sem.locked() and self.queued >= self.max_queue:
+            self.rejected += 1
+            raise Overloaded(f"{self.name}: queue full")
+        self.queued += 1
+        try:
+            await asyncio.wait_for(sem.acquire(), timeout=self.max_wait_s)
+        except asyncio.TimeoutError:
+            self.rejected += 1
+            raise Overloaded(f"{self.name}: no slot within {self.max_wait_s}s") from None
+        finally:
+            self.queued -= 1
+        self.in_flight += 1
+
+    def submit(self, fn: Callable[..., Any], *args: Any) -> "asyncio.Future[Any]":
+        """Run fn on the pool under a slot taken by acquire().
+
+        The slot is given back when the thread finishes, not when the caller stops
+        waiting, so abandoned calls still count against the limit.
+        """
+        loop = asyncio.get_running_loop()
+        sem = self._sem
+
+        def _release(_):
+            def _done():
+                self.in_flight -= 1
+                self.completed += 1
+                sem.release()
+            try:
+                loop.call_soon_threadsafe(_done)
+            except RuntimeError:  # loop already closed (shutdown)
+                pass
+
+        cf = self._executor.submit(fn, *args)
+        cf.add_done_callback(_release)
+        return asyncio.wrap_future(cf, loop=loop)
+
+    async def run(self, fn: Callable[..., Any], *args: Any) -> Any:
+        await self.acquire()
+        return await self.submit(fn, *args)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "in_flight": self.in_flight,
+            "queued": self.queued,
+            "max_concurrency": self.max_concurrency,
+            "max_queue": self.max_queue,
+            "rejected": self.rejected,
+            "completed": self.completed,
+        }
+
+
+_LLM_MAX = int(os.getenv("LLM_MAX_CONCURRENCY", "8"))
+_WEB_MAX = int(os.getenv("WEB_MAX_CONCURRENCY", "8"))
+_MAX_WAIT_S = float(os.getenv("OUTBOUND_MAX_QUEUE_WAIT_S", "2"))
+
+# One pool sized for both limiters, so every admitted call gets a thread right away.
+_executor = ThreadPoolExecutor(max_workers=_LLM_MAX + _WEB_MAX, thread_name_prefix="chat-outbound")
+
+llm_limiter = CallLimiter("llm", _LLM_MAX, int(os.getenv("LLM_MAX_QUEUE", "32")), _MAX_WAIT_S, _executor)
+web_limiter = CallLimiter("web_search", _WEB_MAX, int(os.getenv("WEB_MAX_QUEUE", "32")), _MAX_WAIT_S, _executor)
+
+
+def limiter_stats() -> Dict[str, Dict[str, Any]]:
+    return {lim.name: lim.stats() for lim in (llm_limiter, web_limiter)}
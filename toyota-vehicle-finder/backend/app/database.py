@@ -1,21 +1,84 @@
 """Database configuration and session management."""
 
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from typing import Dict, Optional
 import os
 
+# SQLite database file (the Docker image keeps it under /app/data)
+DATABASE_PATH = os.getenv("DATABASE_PATH", "./toyota_vehicles.db")
+
 # SQLite database URL
-SQLALCHEMY_DATABASE_URL = "sqlite:///./toyota_vehicles.db"
+SQLALCHEMY_DATABASE_URL = f"sqlite:///{DATABASE_PATH}"
+ASYNC_SQLALCHEMY_DATABASE_URL = f"sqlite+aiosqlite:///{DATABASE_PATH}"
 
-# Create engine
-engine = create_engine(
-    SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
-)
+# Pragmas applied to every new connection. WAL lets readers proceed while a write
+# is in progress; synchronous=NORMAL is durable across app crashes under WAL (only an
+# OS crash can lose the last transactions).
+SQLITE_PRAGMAS: Dict[str, str] = {
+    "journal_mode": os.getenv("SQLITE_JOURNAL_MODE", "WAL"),
+    "synchronous": os.getenv("SQLITE_SYNCHRONOUS", "NORMAL"),
+    "cache_size": os.getenv("SQLITE_CACHE_SIZE", "-16000"),  # negative = KiB, i.e. 16 MB
+    "mmap_size": os.getenv("SQLITE_MMAP_SIZE", str(128 * 1024 * 1024)),
+    "busy_timeout": os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"),
+    "temp_store": "MEMORY",
+}
+
+READ_POOL_SIZE = int(os.getenv("SQLITE_READ_POOL_SIZE", "8"))
+
+def _apply_pragmas(dbapi_connection, pragmas: Dict[str, str], readonly: bool):
+    cursor = dbapi_connection.cursor()
+    for name, value in pragmas.items():
+        cursor.execute(f"PRAGMA {name}={value}")
+    if readonly:
+        cursor.execute("PRAGMA query_only=ON")
+    cursor.close()
+
+def create_sqlite_engine(
+    url: str = SQLALCHEMY_DATABASE_URL,
+    readonly: bool = False,
+    pool_size: int = 5,
+    max_overflow: int = 10,
+    pragmas: Optional[Dict[str, str]] = None,
+):
+    """Create a sync or async (sqlite+aiosqlite) engine with the SQLite pragmas applied on connect.
+
+    `readonly` connections also set query_only, so a stray write fails loudly.
+    """
+    pragmas = SQLITE_PRAGMAS if pragmas is None else pragmas
+    if "+aiosqlite" in url:
+        # aiosqlite defaults to NullPool for files (a new connection + thread per session); pool them.
+        eng = create_async_engine(
+            url, poolclass=AsyncAdaptedQueuePool, pool_size=pool_size, max_overflow=max_overflow
+        )
+        target = eng.sync_engine
+    else:
+        eng = create_engine(
+            url, connect_args={"check_same_thread": False}, pool_size=pool_size, max_overflow=max_overflow
+        )
+        target = eng
+    event.listen(target, "connect", lambda conn, _record: _apply_pragmas(conn, pragmas, readonly))
+    return eng
+
+# Create engine (startup seeding, scripts)
+engine = create_sqlite_engine(SQLALCHEMY_DATABASE_URL)
 
 # Create SessionLocal class
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Async engines for request handlers: a pool of read-only connections for GET
+# endpoints, and a single writer connection so writes are serialized in-process
+# instead of contending for SQLite's write lock.
+async_read_engine = create_sqlite_engine(
+    ASYNC_SQLALCHEMY_DATABASE_URL, readonly=True, pool_size=READ_POOL_SIZE, max_overflow=READ_POOL_SIZE
+)
+async_engine = create_sqlite_engine(ASYNC_SQLALCHEMY_DATABASE_URL, pool_size=1, max_overflow=0)
+AsyncReadSessionLocal = async_sessionmaker(async_read_engine, autoflush=False, expire_on_commit=False)
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
 # Create Base class
 Base = declarative_base()
 
@@ -26,3 +89,13 @@ def get_db():
         yield db
     finally:
         db.close()
+
+async def get_async_db():
+    """Dependency to get an async database session on the (single) writer connection."""
+    async with AsyncSessionLocal() as db:
+        yield db
+
+async def get_read_db():
+    """Dependency to get a read-only async database session."""
+    async with AsyncReadSessionLocal() as db:
+        yield db
@@ -0,0 +1,275 @@
+"""Streaming bulk export of catalog and activity tables as CSV, NDJSON or Parquet.
+
+Usage (from backend/):
+    python -m app.exporter TABLE [--format csv|ndjson|parquet] [--since 2025-01-01T00:00:00]
+                                 [--out FILE] [--chunk-size 5000]
+
+Rows are read through one cursor in chunks (yield_per) and encoded chunk by chunk,
+so memory stays flat regardless of table size; the whole export reads one consistent
+snapshot. Activity tables take `since` for incremental extraction on their timestamp
+column (created_at / viewed_at) and come out in timestamp order, so the last row's
+timestamp is the next run's `since` (which is inclusive: rows at that exact time come
+again, dedupe on id). Parquet needs the optional pyarrow package.
+"""
+
+import argparse
+import csv
+import io
+import os
+import sys
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional
+
+import orjson
+from sqlalchemy import Boolean, DateTime, Float, Integer, Table, select
+from sqlalchemy.engine import Engine
+
+from .catalog import ensure_schema
+from .database import engine as default_engine
+from .models import Comparison, Favorite, Vehicle, ViewHistory
+
+try:  # optional
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+EXPORT_CHUNK_SIZE = int(os.getenv("EXPORT_CHUNK_SIZE", "5000"))
+
+# table name -> (table, timestamp column for `since`)
+TABLES: Dict[str, tuple] = {
+    "vehicles": (Vehicle.__table__, None),
+    "favorites": (Favorite.__table__, "created_at"),
+    "comparisons": (Comparison.__table__, "created_at"),
+    "view_history": (ViewHistory.__table__, "viewed_at"),
+}
+
+MEDIA_TYPES = {
+    "csv": "text/csv",  # Starlette adds the charset
+    "ndjson": "application/x-ndjson",
+    "parquet": "application/vnd.apache.parquet",
+}
+EXTENSIONS = {"csv": "csv", "ndjson": "ndjson", "parquet": "parquet"}
+
+
+def available_formats() -> List[str]:
+    return ["csv", "ndjson"] + (["parquet"] if pyarrow is not None else [])
+
+
+@dataclass
+class ExportStats:
+    rows: int = 0
+    bytes: int = 0
+    chunks: int = 0
+    elapsed_s: float = 0.0
+    last_timestamp: Optional[datetime] = None  # pass as `since` next time
+
+    @property
+    def rows_per_s(self) -> float:
+        return self.rows / self.elapsed_s if self.elapsed_s else 0.0
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "rows": self.rows,
+            "bytes": self.bytes,
+            "chunks": self.chunks,
+            "elapsed_s": round(self.elapsed_s, 3),
+            "rows_per_s": round(self.rows_per_s, 1),
+            "mb_per_s": round(self.bytes / 1e6 / self.elapsed_s, 2) if self.elapsed_s else 0.0,
+            "last_timestamp": self.last_timestamp.isoformat() if self.last_timestamp else None,
+        }
+
+
+def export_query(table_name: str, since: Optional[datetime] = None):
+    """SELECT for an export; raises ValueError for unknown tables or `since` on a table without timestamps."""
+    if table_name not in TABLES:
+        raise ValueError(f"table must be one of {', '.join(TABLES)}")
+    table, ts_column = TABLES[table_name]
+    query = select(table)
+    if ts_column is None:
+        if since is not None:
+            raise ValueError(f"{table_name} has no timestamp column; export it without since")
+        return query.order_by(table.c.id)
+    if since is not None:
+        query = query.where(table.c[ts_column] >= since)
+    # Served by the timestamp index in order (SQLite indexes end with the rowid)
+    return query.order_by(table.c[ts_column], table.c.id)
+
+
+def _csv_value(v: Any) -> Any:
+    return v.isoformat() if isinstance(v, datetime) else v
+
+
+def _encode_csv(columns: List[str], chunks: Iterable[List[Dict]]) -> Iterator[bytes]:
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    writer.writerow(columns)
+    for chunk in chunks:
+        writer.writerows([_csv_value(row[c]) for c in columns] for row in chunk)
+        yield buf.getvalue().encode("utf-8")
+        buf.seek(0)
+        buf.truncate()
+    if buf.tell():
+        yield buf.getvalue().encode("utf-8")
+
+
+def _encode_ndjson(chunks: Iterable[List[Dict]]) -> Iterator[bytes]:
+    for chunk in chunks:
+        yield b"".join(orjson.dumps(row) + b"\n" for row in chunk)
+
+
+def _arrow_schema(table: Table):
+    def arrow_type(column):
+        if isinstance(column.type, Integer):
+            return pyarrow.int64()
+        if isinstance(column.type, Float):
+            return pyarrow.float64()
+        if isinstance(column.type, Boolean):
+            return pyarrow.bool_()
+        if isinstance(column.type, DateTime):
+            return pyarrow.timestamp("us")
+        return pyarrow.string()
+
+    return pyarrow.schema([(c.name, arrow_type(c)) for c in table.columns])
+
+
+class _Sink(io.RawIOBase):
+    """Write-only file that hands buffered bytes back through drain()."""
+
+    def __init__(self):
+        self._parts: List[bytes] = []
+        self._pos = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, b) -> int:
+        self._parts.append(bytes(b))
+        self._pos += len(b)
+        return len(b)
+
+    def tell(self) -> int:
+        return self._pos
+
+    def drain(self) -> bytes:
+        data, self._parts = b"".join(self._parts), []
+        return data
+
+
+def _encode_parquet(table: Table, chunks: Iterable[List[Dict]]) -> Iterator[bytes]:
+    """One row group per chunk, emitted as soon as it is written."""
+    schema = _arrow_schema(table)
+    sink = _Sink()
+    writer = pyarrow.parquet.ParquetWriter(sink, schema, compression="snappy")
+    try:
+        for chunk in chunks:
+            writer.write_table(pyarrow.Table.from_pylist(chunk, schema=schema))
+            data = sink.drain()
+            if data:
+                yield data
+    finally:
+        writer.close()
+    yield sink.drain()
+
+
+def export_table(
+    table_name: str,
+    fmt: str,
+    since: Optional[datetime] = None,
+    engine: Optional[Engine] = None,
+    chunk_size: Optional[int] = None,
+    stats: Optional[ExportStats] = None,
+    progress: Optional[Callable[[ExportStats], None]] = None,
+) -> Iterator[bytes]:
+    """Encoded export of `table_name`, yielded chunk by chunk (raises ValueError for bad arguments)."""
+    if fmt not in available_formats():
+        hint = " (parquet needs pyarrow)" if fmt == "parquet" else ""
+        raise ValueError(f"format must be one of {', '.join(available_formats())}{hint}")
+    query = export_query(table_name, since)
+    table, ts_column = TABLES[table_name]
+    columns = [c.name for c in table.columns]
+    engine = engine or default_engine
+    chunk_size = chunk_size or EXPORT_CHUNK_SIZE
+    stats = stats if stats is not None else ExportStats()
+
+    def chunks() -> Iterator[List[Dict]]:
+        started = time.perf_counter()
+        # One transaction: every chunk comes from the same WAL snapshot
+        with engine.connect() as conn:
+            result = conn.execution_options(yield_per=chunk_size).execute(query)
+            for part in result.mappings().partitions():
+                rows = [dict(row) for row in part]
+                stats.rows += len(rows)
+                stats.chunks += 1
+                if ts_column is not None:
+                    stats.last_timestamp = rows[-1][ts_column]
+                stats.elapsed_s = time.perf_counter() - started
+                if progress is not None:
+                    progress(stats)
+                yield rows
+
+    def generate() -> Iterator[bytes]:
+        started = time.perf_counter()
+        if fmt == "csv":
+            encoded = _encode_csv(columns, chunks())
+        elif fmt == "ndjson":
+            encoded = _encode_ndjson(chunks())
+        else:
+            encoded = _encode_parquet(table, chunks())
+        for data in encoded:
+            stats.bytes += len(data)
+            yield data
+        stats.elapsed_s = time.perf_counter() - started
+
+    return generate()
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(description="Export a table as CSV, NDJSON or Parquet.")
+    ap.add_argument("table", choices=list(TABLES))
+    ap.add_argument("--format", default="ndjson", choices=list(MEDIA_TYPES))
+    ap.add_argument("--since", type=datetime.fromisoformat, help="only rows at or after this time (activity tables)")
+    ap.add_argument("--out", help="output file (default: TABLE.EXT; '-' for stdout)")
+    ap.add_argument("--chunk-size", type=int, default=EXPORT_CHUNK_SIZE)
+    args = ap.parse_args(argv)
+
+    last_report = [0.0]
+
+    def report(stats: ExportStats) -> None:
+        if stats.elapsed_s - last_report[0] >= 1.0:
+            last_report[0] = stats.elapsed_s
+            print(f"[export] {stats.rows:,} rows ({stats.rows_per_s:,.0f} rows/s)", file=sys.stderr)
+
+    # Older databases may lack the timestamp indexes that keep the ordered read a plain scan
+    with default_engine.begin() as conn:
+        ensure_schema(conn)
+
+    stats = ExportStats()
+    try:
+        data = export_table(args.table, args.format, args.since, chunk_size=args.chunk_size, stats=stats,
+                            progress=report)
+    except ValueError as e:
+        ap.error(str(e))
+    out_path = args.out or f"{args.table}.{EXTENSIONS[args.format]}"
+    out = sys.stdout.buffer if out_path == "-" else open(out_path, "wb")
+    try:
+        for part in data:
+            out.write(part)
+    finally:
+        if out is not sys.stdout.buffer:
+            out.close()
+
+    print(
+        f"[export] {stats.rows:,} rows, {stats.bytes / 1e6:,.1f} MB in {stats.elapsed_s:.1f}s "
+        f"({stats.rows_per_s:,.0f} rows/s) -> {out_path}",
+        file=sys.stderr,
+    )
+    if stats.last_timestamp:
+        print(f"[export] next incremental run: --since {stats.last_timestamp.isoformat()}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
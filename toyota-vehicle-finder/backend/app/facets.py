@@ -0,0 +1,39 @@
+"""Facet counts for the catalog filters (model, category, drivetrain, year) and value ranges.
+
+One GROUP BY per facet plus one pass for the ranges; the result is cached until the
+catalog changes (see cache.py) and rebuilt ahead of requests by the catalog warm-up job.
+"""
+
+from typing import Dict
+
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .cache import FACETS
+from .models import Vehicle
+
+FACET_COLUMNS = {
+    "model": Vehicle.model,
+    "category": Vehicle.category,
+    "drivetrain": Vehicle.drivetrain,
+    "year": Vehicle.year,
+}
+
+
+async def _load_facets(db: AsyncSession) -> Dict[str, object]:
+    out: Dict[str, object] = {}
+    for name, column in FACET_COLUMNS.items():
+        rows = await db.execute(
+            select(column, func.count()).where(column.isnot(None)).group_by(column).order_by(func.count().desc(), column)
+        )
+        out[name] = [{"value": str(value), "count": n} for value, n in rows]
+    total, price_min, price_max, mpg_min, mpg_max = (await db.execute(select(
+        func.count(), func.min(Vehicle.price), func.max(Vehicle.price),
+        func.min(Vehicle.mpg_combined), func.max(Vehicle.mpg_combined),
+    ))).one()
+    out.update(total=total, price={"min": price_min, "max": price_max}, mpg_combined={"min": mpg_min, "max": mpg_max})
+    return out
+
+
+async def catalog_facets(db: AsyncSession) -> Dict[str, object]:
+    return await FACETS.get_or_load("facets", lambda: _load_facets(db))
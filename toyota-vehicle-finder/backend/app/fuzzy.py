@@ -0,0 +1,169 @@
+"""Typo-tolerant term lookup: a trigram index with bounded edit distance.
+
+Terms are indexed by their padded character trigrams ("  co", " co", "cor", ...). A
+lookup counts the trigrams each term shares with the query, drops those whose count,
+length or similarity rules them out, and verifies the rest with an edit distance that
+counts adjacent transpositions ("hybird") as one edit and stops as soon as the bound
+is exceeded. The allowed distance grows with the word: exact for 1-3 characters, one
+edit up to 7, two beyond.
+
+catalog_index() builds one over the words of every model, trim and category name;
+it is cached until the catalog changes (see cache.py), so /cars can correct
+"carolla" to "corolla" before filtering.
+"""
+
+import re
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .cache import SEARCH_INDEX
+from .models import Vehicle
+
+_TOKEN = re.compile(r"[a-z0-9]+(?:-[a-z0-9]+)*")
+_TOKEN_ANY_CASE = re.compile(_TOKEN.pattern, re.IGNORECASE)
+_LETTER = re.compile(r"[a-z]")
+
+
+def normalize(term: str) -> str:
+    """Lowercase with separators removed ("C-HR" -> "chr", "rav 4" -> "rav4")."""
+    return re.sub(r"[^a-z0-9]", "", term.lower())
+
+
+def tokenize(text: str) -> List[str]:
+    return _TOKEN.findall(text.lower())
+
+
+def trigrams(word: str) -> Set[str]:
+    padded = f"  {word} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def default_max_distance(length: int) -> int:
+    if length <= 3:
+        return 0
+    return 1 if length <= 7 else 2
+
+
+def edit_distance(a: str, b: str, bound: int) -> int:
+    """Optimal-string-alignment distance, or bound + 1 as soon as it must exceed `bound`."""
+    if abs(len(a) - len(b)) > bound:
+        return bound + 1
+    prev2: Optional[List[int]] = None
+    prev = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        cur = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = a[i - 1] != b[j - 1]
+            cur[j] = min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + cost)
+            if prev2 is not None and i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                cur[j] = min(cur[j], prev2[j - 2] + 1)
+        if min(cur) > bound:
+            return bound + 1
+        prev2, prev = prev, cur
+    return prev[-1] if prev[-1] <= bound else bound + 1
+
+
+class TrigramIndex:
+    """Fuzzy lookup over a fixed set of terms (each returned in its original, lowercased form)."""
+
+    def __init__(self, terms: Iterable[str]):
+        self._display: Dict[str, str] = {}  # normalized key -> first term seen with it
+        for term in terms:
+            key = normalize(term)
+            if key:
+                self._display.setdefault(key, term.lower())
+        self._keys = sorted(self._display)
+        self._grams = [len(trigrams(k)) for k in self._keys]
+        self._postings: Dict[str, List[int]] = {}
+        for i, key in enumerate(self._keys):
+            for gram in trigrams(key):
+                self._postings.setdefault(gram, []).append(i)
+        # Substring checks over every term at C speed (keys never contain a newline)
+        self._joined = "\n".join(self._keys)
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def __contains__(self, term: str) -> bool:
+        return normalize(term) in self._display
+
+    def is_substring(self, term: str) -> bool:
+        """True if `term` occurs inside some indexed term (a prefix or fragment the user typed)."""
+        key = normalize(term)
+        return bool(key) and key in self._joined
+
+    def lookup(self, term: str, max_distance: Optional[int] = None, min_similarity: float = 0.0,
+               limit: int = 3) -> List[Tuple[str, int]]:
+        """Closest terms as (term, distance), nearest and most similar first."""
+        key = normalize(term)
+        if not key:
+            return []
+        bound = default_max_distance(len(key)) if max_distance is None else max_distance
+        if key in self._display:
+            return [(self._display[key], 0)]
+        if bound == 0:
+            return []
+        grams = trigrams(key)
+        # An edit touches at most 4 of the query's trigrams (3, or 4 for a transposition),
+        # so a term within `bound` edits shares at least this many; the rest never reach
+        # the edit distance.
+        needed = max(1, len(grams) - 4 * bound)
+        shared = Counter(i for gram in grams for i in self._postings.get(gram, ()))
+        hits = []
+        for i, n in shared.items():
+            if n < needed:
+                continue
+            candidate = self._keys[i]
+            if abs(len(candidate) - len(key)) > bound:
+                continue
+            similarity = n / (len(grams) + self._grams[i] - n)
+            if similarity < min_similarity:
+                continue
+            distance = edit_distance(key, candidate, bound)
+            if distance <= bound:
+                hits.append((distance, -similarity, candidate))
+        hits.sort()
+        return [(self._display[c], d) for d, _, c in hits[:limit]]
+
+    def correct(self, text: str, min_similarity: float = 0.0) -> str:
+        """`text` with each unknown word replaced by its closest indexed term.
+
+        Words that are indexed, or occur inside an indexed term (partial input such
+        as "tund"), are kept as typed. Input naming one term with different spacing or
+        punctuation ("rav 4") becomes that term. Everything else - punctuation, case,
+        spacing - is left as it was, and text with nothing to correct comes back unchanged.
+        """
+        whole = normalize(text)
+        if whole in self._display:
+            term = self._display[whole]
+            return text if term == text.strip().lower() else term
+        out, last = [], 0
+        for match in _TOKEN_ANY_CASE.finditer(text):
+            word = match.group().lower()
+            if word in self or self.is_substring(word):
+                continue
+            best = self.lookup(word, min_similarity=min_similarity, limit=1)
+            if best and best[0][0] != word:
+                out += [text[last:match.start()], best[0][0]]
+                last = match.end()
+        return "".join(out) + text[last:] if out else text
+
+
+def catalog_words(names: Iterable[str]) -> Set[str]:
+    """Words of model/trim/category names worth correcting towards (skips bare numbers like "#123")."""
+    return {w for name in names if name for w in tokenize(name) if _LETTER.search(w)}
+
+
+async def _load_catalog_index(db: AsyncSession) -> TrigramIndex:
+    names: List[str] = []
+    for column in (Vehicle.model, Vehicle.trim, Vehicle.category):
+        names.extend((await db.execute(select(column).distinct())).scalars())
+    return TrigramIndex(catalog_words(names) | {n.lower() for n in names if n and " " not in n})
+
+
+async def catalog_index(db: AsyncSession) -> TrigramIndex:
+    """Index over catalog vocabulary; rebuilt on first use after the catalog changes."""
+    return await SEARCH_INDEX.get_or_load("catalog", lambda: _load_catalog_index(db))
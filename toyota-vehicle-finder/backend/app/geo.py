@@ -0,0 +1,119 @@
+"""Dealer radius search: an SQLite R*Tree for candidates, haversine for the exact cut.
+
+Dealer coordinates are mirrored into the `dealers_rtree` virtual table by triggers on
+`dealers`, so every writer (seed, scripts, raw SQL) keeps it current. A query for
+"within R miles of (lat, lon)" turns the circle into a lat/lon bounding box, asks the
+R*Tree for the dealers whose points fall inside it, and drops the box corners with
+the great-circle distance. SQLite builds without the rtree module fall back to a
+bounding-box scan of `dealers` (indexed on latitude).
+"""
+
+import math
+from typing import List, Optional, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+EARTH_RADIUS_MILES = 3958.8
+MAX_RADIUS_MILES = 500
+
+_RTREE_DDL = [
+    "CREATE VIRTUAL TABLE dealers_rtree USING rtree(id, min_lat, max_lat, min_lon, max_lon)",
+    "CREATE TRIGGER IF NOT EXISTS dealers_rtree_ai AFTER INSERT ON dealers BEGIN"
+    " INSERT INTO dealers_rtree VALUES (new.id, new.latitude, new.latitude, new.longitude, new.longitude); END",
+    "CREATE TRIGGER IF NOT EXISTS dealers_rtree_au AFTER UPDATE OF latitude, longitude ON dealers BEGIN"
+    " UPDATE dealers_rtree SET min_lat = new.latitude, max_lat = new.latitude,"
+    " min_lon = new.longitude, max_lon = new.longitude WHERE id = new.id; END",
+    "CREATE TRIGGER IF NOT EXISTS dealers_rtree_ad AFTER DELETE ON dealers BEGIN"
+    " DELETE FROM dealers_rtree WHERE id = old.id; END",
+]
+_FALLBACK_DDL = "CREATE INDEX IF NOT EXISTS ix_dealers_lat_lon ON dealers (latitude, longitude)"
+
+_CANDIDATES_RTREE = text(
+    "SELECT d.id, d.latitude, d.longitude FROM dealers_rtree r JOIN dealers d ON d.id = r.id"
+    " WHERE r.max_lat >= :min_lat AND r.min_lat <= :max_lat AND r.max_lon >= :min_lon AND r.min_lon <= :max_lon"
+)
+_CANDIDATES_SCAN = text(
+    "SELECT id, latitude, longitude FROM dealers"
+    " WHERE latitude BETWEEN :min_lat AND :max_lat AND longitude BETWEEN :min_lon AND :max_lon"
+)
+
+_has_rtree: Optional[bool] = None  # whether this database has dealers_rtree (checked once per process)
+
+
+def parse_near(value: str) -> Tuple[float, float]:
+    """'lat,lon' -> (lat, lon); raises ValueError for anything else."""
+    try:
+        lat_s, lon_s = value.split(",")
+        lat, lon = float(lat_s), float(lon_s)
+    except ValueError:
+        raise ValueError("near must be 'lat,lon'") from None
+    if not (-90 <= lat <= 90 and -180 <= lon <= 180):
+        raise ValueError("near is out of range (lat -90..90, lon -180..180)")
+    return lat, lon
+
+
+def haversine_miles(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    p1, p2 = math.radians(lat1), math.radians(lat2)
+    dp, dl = p2 - p1, math.radians(lon2 - lon1)
+    a = math.sin(dp / 2) ** 2 + math.cos(p1) * math.cos(p2) * math.sin(dl / 2) ** 2
+    return 2 * EARTH_RADIUS_MILES * math.asin(min(1.0, math.sqrt(a)))
+
+
+def bounding_box(lat: float, lon: float, radius_miles: float) -> Tuple[float, float, float, float]:
+    """(min_lat, max_lat, min_lon, max_lon) enclosing the circle.
+
+    Near the poles or across the antimeridian the longitude span is widened to the
+    full range rather than split in two; the haversine pass removes the extra rows.
+    """
+    dlat = math.degrees(radius_miles / EARTH_RADIUS_MILES)
+    min_lat, max_lat = lat - dlat, lat + dlat
+    if min_lat <= -90 or max_lat >= 90:
+        return max(min_lat, -90.0), min(max_lat, 90.0), -180.0, 180.0
+    dlon = math.degrees(math.asin(min(1.0, math.sin(math.radians(dlat)) / math.cos(math.radians(lat)))))
+    min_lon, max_lon = lon - dlon, lon + dlon
+    if min_lon < -180 or max_lon > 180:
+        return min_lat, max_lat, -180.0, 180.0
+    return min_lat, max_lat, min_lon, max_lon
+
+
+def ensure_spatial_index(conn: Connection) -> bool:
+    """Create dealers_rtree and its triggers (backfilled from dealers) if missing.
+
+    Returns False when SQLite lacks the rtree module; a plain lat/lon index is created instead.
+    """
+    exists = conn.exec_driver_sql("SELECT 1 FROM sqlite_master WHERE name = 'dealers_rtree'").first()
+    if exists is None:
+        try:
+            conn.exec_driver_sql(_RTREE_DDL[0])
+        except OperationalError:
+            conn.exec_driver_sql(_FALLBACK_DDL)
+            return False
+        conn.exec_driver_sql(
+            "INSERT INTO dealers_rtree SELECT id, latitude, latitude, longitude, longitude FROM dealers"
+        )
+    for ddl in _RTREE_DDL[1:]:
+        conn.exec_driver_sql(ddl)
+    return True
+
+
+async def dealers_within(db: AsyncSession, lat: float, lon: float, radius_miles: float) -> List[Tuple[int, float]]:
+    """(dealer id, distance in miles) for dealers within the radius, nearest first."""
+    global _has_rtree
+    if _has_rtree is None:
+        found = await db.execute(text("SELECT 1 FROM sqlite_master WHERE name = 'dealers_rtree'"))
+        _has_rtree = found.first() is not None
+    min_lat, max_lat, min_lon, max_lon = bounding_box(lat, lon, radius_miles)
+    rows = await db.execute(
+        _CANDIDATES_RTREE if _has_rtree else _CANDIDATES_SCAN,
+        {"min_lat": min_lat, "max_lat": max_lat, "min_lon": min_lon, "max_lon": max_lon},
+    )
+    hits = []
+    for dealer_id, dlat, dlon in rows:
+        miles = haversine_miles(lat, lon, dlat, dlon)
+        if miles <= radius_miles:
+            hits.append((dealer_id, miles))
+    hits.sort(key=lambda hit: hit[1])
+    return hits
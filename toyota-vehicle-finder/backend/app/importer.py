@@ -0,0 +1,212 @@
+"""Streaming bulk import of vehicle inventory from CSV or JSON Lines files.
+
+Usage (from backend/):
+    python -m app.importer FILE [--format csv|jsonl] [--batch-size 5000] [--rejects rejects.jsonl]
+
+Records are read one at a time, validated against schemas.VehicleCreate a batch at a
+time, and upserted on (model, year, trim) with one transaction per batch, so memory
+stays flat regardless of file size. Invalid rows are skipped and reported; the
+catalog version is bumped once at the end so caches invalidate a single time.
+
+CSV files need a header row with the VehicleCreate field names. In JSON Lines files
+`features` may be a list; it is stored as a JSON string like the seed data.
+"""
+
+import argparse
+import contextlib
+import csv
+import json
+import os
+import sys
+import time
+from dataclasses import dataclass, field
+from typing import IO, Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from pydantic import TypeAdapter, ValidationError
+from sqlalchemy.engine import Engine
+
+from . import schemas
+from .catalog import ensure_schema, record_change, upsert_vehicles
+from .database import engine as default_engine
+
+IMPORT_BATCH_SIZE = int(os.getenv("IMPORT_BATCH_SIZE", "5000"))
+FORMATS = ("csv", "jsonl")
+MAX_REJECTS_KEPT = 100  # rejects returned in the stats; the report file gets all of them
+
+_batch_adapter = TypeAdapter(List[schemas.VehicleCreate])
+
+
+@dataclass
+class ImportStats:
+    read: int = 0
+    imported: int = 0
+    rejected: int = 0
+    batches: int = 0
+    elapsed_s: float = 0.0
+    catalog_version: Optional[int] = None
+    rejects: List[Dict[str, Any]] = field(default_factory=list)
+
+    @property
+    def rows_per_s(self) -> float:
+        return self.read / self.elapsed_s if self.elapsed_s else 0.0
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "read": self.read,
+            "imported": self.imported,
+            "rejected": self.rejected,
+            "batches": self.batches,
+            "elapsed_s": round(self.elapsed_s, 3),
+            "rows_per_s": round(self.rows_per_s, 1),
+            "catalog_version": self.catalog_version,
+            "rejects": self.rejects,
+        }
+
+
+def detect_format(filename: str) -> str:
+    name = filename.lower()
+    if name.endswith(".csv"):
+        return "csv"
+    if name.endswith((".jsonl", ".ndjson")):
+        return "jsonl"
+    raise ValueError(f"Cannot tell the format of {filename!r}; use .csv or .jsonl, or pass the format explicitly")
+
+
+def iter_records(stream: IO[str], fmt: str) -> Iterator[Tuple[int, Any, Optional[str]]]:
+    """Yield (line number, record, parse error) for each record in the stream."""
+    if fmt == "csv":
+        reader = csv.DictReader(stream)
+        for row in reader:
+            # Blank cells count as missing, so required columns fail validation instead of coercing "".
+            yield reader.line_num, {k: v for k, v in row.items() if k is not None and v != ""}, None
+    elif fmt == "jsonl":
+        for line_no, line in enumerate(stream, 1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError as e:
+                yield line_no, line.rstrip("\n"), f"invalid JSON: {e.msg}"
+                continue
+            if isinstance(record, dict) and isinstance(record.get("features"), list):
+                record["features"] = json.dumps(record["features"])
+            yield line_no, record, None
+    else:
+        raise ValueError(f"Unknown import format {fmt!r}; expected one of {', '.join(FORMATS)}")
+
+
+def _error_text(errors: List[Dict[str, Any]]) -> str:
+    return "; ".join(f"{'.'.join(str(p) for p in e['loc']) or 'record'}: {e['msg']}" for e in errors)
+
+
+def _validate_batch(batch: List[Tuple[int, Any]]) -> Tuple[List[Dict[str, Any]], List[Tuple[int, Any, str]]]:
+    """Validate a batch in one pass; a batch with bad rows gets a second pass over the rest."""
+    records = [record for _, record in batch]
+    try:
+        return [v.model_dump() for v in _batch_adapter.validate_python(records)], []
+    except ValidationError as exc:
+        by_index: Dict[int, List[Dict[str, Any]]] = {}
+        for err in exc.errors(include_url=False):
+            by_index.setdefault(err["loc"][0], []).append(dict(err, loc=err["loc"][1:]))
+    # Errors never depend on neighbouring rows, so the rest of the batch validates cleanly.
+    rest = [record for i, record in enumerate(records) if i not in by_index]
+    good = [v.model_dump() for v in _batch_adapter.validate_python(rest)]
+    bad = [(batch[i][0], records[i], _error_text(errs)) for i, errs in sorted(by_index.items())]
+    return good, bad
+
+
+def import_vehicles(
+    stream: IO[str],
+    fmt: str,
+    engine: Optional[Engine] = None,
+    batch_size: Optional[int] = None,
+    progress: Optional[Callable[[ImportStats], None]] = None,
+    rejects_out: Optional[IO[str]] = None,
+) -> ImportStats:
+    """Import every record in `stream`, returning counts, throughput and the first rejects.
+
+    `progress` is called after each batch; `rejects_out` receives one JSON line per
+    rejected record ({"line", "error", "record"}).
+    """
+    engine = engine or default_engine
+    batch_size = batch_size or IMPORT_BATCH_SIZE
+    stats = ImportStats()
+    started = time.perf_counter()
+
+    with engine.begin() as conn:
+        ensure_schema(conn)
+
+    def reject(line_no: int, record: Any, error: str) -> None:
+        stats.rejected += 1
+        entry = {"line": line_no, "error": error, "record": record}
+        if len(stats.rejects) < MAX_REJECTS_KEPT:
+            stats.rejects.append(entry)
+        if rejects_out is not None:
+            rejects_out.write(json.dumps(entry, default=str) + "\n")
+
+    def flush(batch: List[Tuple[int, Any]]) -> None:
+        good, bad = _validate_batch(batch)
+        for line_no, record, error in bad:
+            reject(line_no, record, error)
+        if good:
+            with engine.begin() as conn:
+                upsert_vehicles(conn, good)
+        stats.imported += len(good)
+        stats.batches += 1
+        stats.elapsed_s = time.perf_counter() - started
+        if progress is not None:
+            progress(stats)
+
+    batch: List[Tuple[int, Any]] = []
+    for line_no, record, error in iter_records(stream, fmt):
+        stats.read += 1
+        if error:
+            reject(line_no, record, error)
+            continue
+        batch.append((line_no, record))
+        if len(batch) >= batch_size:
+            flush(batch)
+            batch = []
+    if batch:
+        flush(batch)
+
+    if stats.imported:
+        with engine.begin() as conn:
+            stats.catalog_version = record_change(conn, "import")
+    stats.elapsed_s = time.perf_counter() - started
+    return stats
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(description="Import vehicles from a CSV or JSON Lines file.")
+    ap.add_argument("path")
+    ap.add_argument("--format", choices=FORMATS, help="default: from the file extension")
+    ap.add_argument("--batch-size", type=int, default=IMPORT_BATCH_SIZE)
+    ap.add_argument("--rejects", help="write rejected rows to this JSON Lines file")
+    args = ap.parse_args(argv)
+
+    fmt = args.format or detect_format(args.path)
+    last_report = [0.0]
+
+    def report(stats: ImportStats) -> None:
+        if stats.elapsed_s - last_report[0] >= 1.0:
+            last_report[0] = stats.elapsed_s
+            print(
+                f"[import] {stats.read:,} read, {stats.imported:,} imported, {stats.rejected:,} rejected "
+                f"({stats.rows_per_s:,.0f} rows/s)",
+                file=sys.stderr,
+            )
+
+    with open(args.path, newline="", encoding="utf-8") as f, (
+        open(args.rejects, "w", encoding="utf-8") if args.rejects else contextlib.nullcontext()
+    ) as rejects_out:
+        stats = import_vehicles(f, fmt, batch_size=args.batch_size, progress=report, rejects_out=rejects_out)
+
+    summary = stats.as_dict()
+    summary["rejects"] = summary["rejects"][:10]
+    print(json.dumps(summary, indent=2, default=str))
+    return 0 if stats.imported or not stats.read else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,164 @@
+"""Relevance-selected, size-budgeted inventory context for chatbot prompts.
+
+Instead of one line per vehicle, trims are grouped per model and only the models the
+user mentioned get trim-level detail. The remaining catalog is summarized one line per
+model, ordered by what the question is about (price, MPG, towing, ...), and the whole
+block is cut at a character budget (roughly 4 characters per token).
+"""
+
+import os
+from typing import Iterable, List, Optional, Set
+
+from sqlalchemy import func, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .models import Vehicle
+
+INVENTORY_CONTEXT_MAX_CHARS = int(os.getenv("INVENTORY_CONTEXT_MAX_CHARS", "2400"))
+
+# Intent -> keywords in the user's message
+_INTENT_KEYWORDS = {
+    "price": ["price", "cost", "cheap", "afford", "budget", "msrp", "expensive", "$"],
+    "efficiency": ["mpg", "fuel", "effici", "mileage", "hybrid", "gas", "economy"],
+    "towing": ["tow", "trailer", "haul", "boat"],
+    "seating": ["seat", "family", "third row", "3rd row", "passenger", "kids"],
+    "cargo": ["cargo", "trunk", "space", "storage"],
+    "safety": ["safe", "crash", "rating"],
+}
+
+
+def detect_intents(message: str) -> Set[str]:
+    t = message.lower()
+    return {intent for intent, kws in _INTENT_KEYWORDS.items() if any(k in t for k in kws)}
+
+
+def _money(v: Optional[float]) -> str:
+    return f"${v:,.0f}" if v is not None else "n/a"
+
+
+def _extras(intents: Set[str], towing, seating, cargo, safety) -> str:
+    parts = []
+    if "towing" in intents and towing:
+        parts.append(f"tows {int(towing):,} lbs")
+    if "seating" in intents and seating:
+        parts.append(f"{int(seating)} seats")
+    if "cargo" in intents and cargo:
+        parts.append(f"{cargo:g} cu ft cargo")
+    if "safety" in intents and safety:
+        parts.append(f"safety {safety:g}")
+    return (", " + ", ".join(parts)) if parts else ""
+
+
+def _summary_order(intents: Set[str]):
+    if "efficiency" in intents:
+        return func.max(Vehicle.mpg_combined).desc()
+    if "towing" in intents:
+        return func.max(Vehicle.towing_capacity).desc()
+    if "seating" in intents:
+        return func.max(Vehicle.seating).desc()
+    if "cargo" in intents:
+        return func.max(Vehicle.cargo_volume).desc()
+    if "safety" in intents:
+        return func.max(Vehicle.safety_rating).desc()
+    if "price" in intents:
+        return func.min(Vehicle.price).asc()
+    return Vehicle.model.asc()
+
+
+def _trim_order(intents: Set[str]):
+    if "efficiency" in intents:
+        return func.max(Vehicle.mpg_combined).desc()
+    if "towing" in intents:
+        return func.max(Vehicle.towing_capacity).desc()
+    return func.min(Vehicle.price).asc()
+
+
+async def _model_lines(db: AsyncSession, models: List[str], intents: Set[str], row_cap: int) -> List[str]:
+    """Trim-level detail for the models named in the message, one line per model."""
+    result = await db.execute(
+        select(
+            Vehicle.model,
+            Vehicle.year,
+            Vehicle.trim,
+            func.min(Vehicle.price),
+            func.max(Vehicle.mpg_combined),
+            func.max(Vehicle.towing_capacity),
+            func.max(Vehicle.seating),
+            func.max(Vehicle.cargo_volume),
+            func.max(Vehicle.safety_rating),
+        )
+        .where(or_(*[Vehicle.model.ilike(f"%{m}%") for m in models]))
+        .group_by(Vehicle.model, Vehicle.year, Vehicle.trim)
+        .order_by(Vehicle.model, _trim_order(intents))
+        .limit(row_cap)
+    )
+    grouped = {}
+    for model, year, trim, price, mpg, towing, seating, cargo, safety in result.all():
+        entry = f"{year} {trim} {_money(price)}" + (f" {mpg} MPG" if mpg is not None else "")
+        entry += _extras(intents, towing, seating, cargo, safety)
+        grouped.setdefault(model, []).append(entry)
+    return [f"- {model}: " + "; ".join(entries) for model, entries in grouped.items()]
+
+
+async def _summary_lines(db: AsyncSession, exclude: Iterable[str], intents: Set[str], row_cap: int) -> List[str]:
+    """One aggregate line per model for the rest of the catalog."""
+    query = select(
+        Vehicle.model,
+        func.min(Vehicle.category),
+        func.count(func.distinct(Vehicle.trim)),
+        func.min(Vehicle.price),
+        func.max(Vehicle.price),
+        func.max(Vehicle.mpg_combined),
+        func.max(Vehicle.towing_capacity),
+        func.max(Vehicle.seating),
+        func.max(Vehicle.cargo_volume),
+        func.max(Vehicle.safety_rating),
+    )
+    for m in exclude:
+        query = query.where(~Vehicle.model.ilike(f"%{m}%"))
+    rows = (await db.execute(query.group_by(Vehicle.model).order_by(_summary_order(intents)).limit(row_cap))).all()
+    lines = []
+    for model, category, n_trims, lo, hi, mpg, towing, seating, cargo, safety in rows:
+        price = _money(lo) if lo == hi else f"{_money(lo)}–{_money(hi)}"
+        line = f"- {model} ({category}, {n_trims} trim{'s' if n_trims != 1 else ''}): {price}"
+        if mpg is not None:
+            line += f", up to {mpg} MPG"
+        lines.append(line + _extras(intents, towing, seating, cargo, safety))
+    return lines
+
+
+async def build_inventory_context(
+    db: AsyncSession,
+    models: List[str],
+    intents: Set[str],
+    max_chars: Optional[int] = None,
+) -> str:
+    """Inventory block for an LLM prompt, never longer than `max_chars` (plus a short footer)."""
+    budget = INVENTORY_CONTEXT_MAX_CHARS if max_chars is None else max_chars
+    # No line is shorter than ~20 chars, so this bounds the rows fetched by the budget.
+    row_cap = max(budget // 20, 1)
+
+    lines: List[str] = []
+    if models:
+        lines.append("Models asked about (trims):")
+        lines.extend(await _model_lines(db, models, intents, row_cap))
+        lines.append("Other models:")
+    lines.extend(await _summary_lines(db, models, intents, row_cap))
+
+    out: List[str] = []
+    used = 0
+    for i, line in enumerate(lines):
+        room = budget - used - 1
+        if len(line) > room:
+            if room > 40:
+                # A long trim line still carries its first entries.
+                out.append(line[: room - 1] + "…")
+                i += 1
+            if i < len(lines):
+                out.append(f"(+{len(lines) - i} more lines omitted)")
+            break
+        out.append(line)
+        used += len(line) + 1
+    if out and out[-1] == "Other models:":
+        out.pop()
+    return "\n".join(out) if out else "(none)"
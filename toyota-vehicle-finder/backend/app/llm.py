@@ -0,0 +1,383 @@
+"""LLM backends for the chatbot: Gemini, a local stub, and a circuit breaker around them.
+
+Select the backend with LLM_PROVIDER ("gemini", the default, or "stub"). The stub needs
+no key or network and takes LLM_STUB_LATENCY_MS / LLM_STUB_FAILURE_RATE / LLM_STUB_SEED,
+which makes /chat usable for offline load tests and failure drills.
+"""
+
+import asyncio
+import hashlib
+import os
+import random
+import threading
+import time
+from typing import AsyncIterator, Callable, Dict, Iterator, Optional
+
+from .concurrency import CallLimiter, Overloaded, llm_limiter
+
+# Use a model your key supports (confirmed via list_models())
+MODEL_NAME = "models/gemini-2.5-flash"  # alternatives: "models/gemini-2.5-pro", "models/gemini-pro-latest"
+
+GEN_CFG = {
+    "temperature": 0.3,
+    "top_p": 0.9,
+    "max_output_tokens": 120,  # brevity
+}
+
+
+class LLMUnavailable(Exception):
+    """The backend is not configured or the circuit breaker is open; skip the LLM stage."""
+
+
+# -----------------------------------------------------------------------------
+# Providers
+# -----------------------------------------------------------------------------
+class LLMProvider:
+    """Blocking text-generation backend. Called from worker threads."""
+
+    name = "base"
+
+    def available(self) -> bool:
+        return True
+
+    def warm_up(self) -> None:
+        """Do one-time setup ahead of the first call (optional)."""
+
+    def generate(self, prompt: str) -> Optional[str]:
+        raise NotImplementedError
+
+    def stream(self, prompt: str) -> Iterator[str]:
+        """Yield raw text chunks, keeping whitespace between them."""
+        text = self.generate(prompt)
+        if text:
+            yield text
+
+
+def _extract_text(resp) -> Optional[str]:
+    text = getattr(resp, "text", None)
+    if text:
+        return text.strip()
+
+    pf = getattr(resp, "prompt_feedback", None)
+    if pf:
+        print("[gemini] prompt_feedback:", pf)
+
+    cands = getattr(resp, "candidates", None) or []
+    if not cands:
+        print("[gemini] no candidates returned")
+        return None
+
+    for idx, c in enumerate(cands):
+        fr = getattr(c, "finish_reason", None)
+        fb = getattr(c, "finish_message", None)
+        print(f"[gemini] candidate[{idx}] finish_reason={fr} finish_message={fb}")
+        content = getattr(c, "content", None)
+        parts = getattr(content, "parts", None) if content else None
+        if parts:
+            chunks = []
+            for p in parts:
+                t = getattr(p, "text", None)
+                if t:
+                    chunks.append(t)
+            if chunks:
+                return " ".join(chunks).strip()
+    return None
+
+
+def _chunk_text(chunk) -> str:
+    # Unlike _extract_text, keep surrounding whitespace: it separates words across chunks.
+    try:
+        return chunk.text or ""
+    except Exception:
+        return ""
+
+
+class GeminiProvider(LLMProvider):
+    """Google Gemini. The SDK is configured on first use, and only when a key is set."""
+
+    name = "gemini"
+
+    def __init__(self, api_key: str, model_name: str = MODEL_NAME, timeout_s: Optional[float] = None):
+        self.api_key = api_key
+        self.model_name = model_name
+        self.timeout_s = timeout_s  # HTTP timeout for streams, so a stalled one frees its pump thread
+        self._model = None
+        self._safety = None
+        self._lock = threading.Lock()
+
+    def available(self) -> bool:
+        return bool(self.api_key)
+
+    def warm_up(self) -> None:
+        if self.available():
+            self._get_model()
+
+    def _get_model(self):
+        with self._lock:
+            if self._model is None:
+                import google.generativeai as genai
+                from google.generativeai.types import HarmCategory, HarmBlockThreshold
+
+                genai.configure(api_key=self.api_key)
+                # Loosen safety for benign car-shopping queries to reduce empty responses
+                self._safety = {
+                    HarmCategory.HARM_CATEGORY_HARASSMENT: HarmBlockThreshold.BLOCK_NONE,
+                    HarmCategory.HARM_CATEGORY_HATE_SPEECH: HarmBlockThreshold.BLOCK_NONE,
+                    HarmCategory.HARM_CATEGORY_SEXUALLY_EXPLICIT: HarmBlockThreshold.BLOCK_NONE,
+                    HarmCategory.HARM_CATEGORY_DANGEROUS_CONTENT: HarmBlockThreshold.BLOCK_NONE,
+                }
+                self._model = genai.GenerativeModel(self.model_name)
+            return self._model
+
+    def generate(self, prompt: str) -> Optional[str]:
+        model = self._get_model()
+        resp = model.generate_content(prompt, generation_config=GEN_CFG, safety_settings=self._safety)
+        return _extract_text(resp)
+
+    def stream(self, prompt: str) -> Iterator[str]:
+        model = self._get_model()
+        request_options = {"timeout": self.timeout_s} if self.timeout_s else None
+        for chunk in model.generate_content(
+            prompt, generation_config=GEN_CFG, safety_settings=self._safety, stream=True,
+            request_options=request_options,
+        ):
+            text = _chunk_text(chunk)
+            if text:
+                yield text
+
+
+class StubProvider(LLMProvider):
+    """Deterministic local backend with configurable latency and failure injection."""
+
+    name = "stub"
+
+    def __init__(self, latency_s: float = 0.05, failure_rate: float = 0.0, seed: Optional[int] = None):
+        self.latency_s = latency_s
+        self.failure_rate = failure_rate
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def _maybe_fail(self) -> None:
+        with self._lock:
+            roll = self._rng.random()
+        if roll < self.failure_rate:
+            raise RuntimeError("stub LLM injected failure")
+
+    @staticmethod
+    def _reply(prompt: str) -> str:
+        user = prompt.rsplit("USER:", 1)[-1].strip().splitlines()[0] if "USER:" in prompt else ""
+        digest = hashlib.sha1(prompt.encode("utf-8")).hexdigest()[:8]
+        return f"Stub answer ({digest}) for: {user[:120]}"
+
+    def generate(self, prompt: str) -> Optional[str]:
+        time.sleep(self.latency_s)
+        self._maybe_fail()
+        return self._reply(prompt)
+
+    def stream(self, prompt: str) -> Iterator[str]:
+        words = self._reply(prompt).split()
+        step = self.latency_s / max(len(words), 1)
+        time.sleep(step)
+        self._maybe_fail()
+        for i, w in enumerate(words):
+            yield w if i == 0 else " " + w
+            time.sleep(step)
+
+
+# -----------------------------------------------------------------------------
+# Circuit breaker
+# -----------------------------------------------------------------------------
+class CircuitBreaker:
+    """Open after `failure_threshold` consecutive failures; allow one trial call after `cooldown_s`."""
+
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+    def __init__(self, failure_threshold: int = 3, cooldown_s: float = 30.0, clock: Callable[[], float] = time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.cooldown_s = cooldown_s
+        self._clock = clock
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+        self.times_opened = 0
+        self.rejected = 0
+
+    @property
+    def state(self) -> str:
+        if self._state == self.OPEN and self._clock() - self._opened_at >= self.cooldown_s:
+            return self.HALF_OPEN
+        return self._state
+
+    def allow(self) -> bool:
+        state = self.state
+        if state == self.CLOSED:
+            return True
+        if state == self.HALF_OPEN and not self._trial_in_flight:
+            self._state = self.HALF_OPEN
+            self._trial_in_flight = True
+            return True
+        self.rejected += 1
+        return False
+
+    def release(self) -> None:
+        """Give back a half-open trial slot without recording an outcome (e.g. caller cancelled)."""
+        self._trial_in_flight = False
+
+    def record_success(self) -> None:
+        self._state = self.CLOSED
+        self._failures = 0
+        self._trial_in_flight = False
+
+    def record_failure(self) -> None:
+        self._failures += 1
+        if self._state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+            if self._state != self.OPEN:
+                self.times_opened += 1
+            self._state = self.OPEN
+            self._opened_at = self._clock()
+        self._trial_in_flight = False
+
+    def stats(self) -> Dict[str, object]:
+        return {
+            "state": self.state,
+            "consecutive_failures": self._failures,
+            "times_opened": self.times_opened,
+            "rejected": self.rejected,
+        }
+
+
+# -----------------------------------------------------------------------------
+# Guarded client used by the chatbot
+# -----------------------------------------------------------------------------
+class GuardedLLM:
+    """Async front for a provider: runs calls on the bounded outbound pool under a timeout and a breaker."""
+
+    def __init__(self, provider: LLMProvider, breaker: CircuitBreaker, limiter: CallLimiter, timeout_s: float = 10.0):
+        self.provider = provider
+        self.breaker = breaker
+        self.limiter = limiter
+        self.timeout_s = timeout_s
+
+    def ready(self) -> bool:
+        """Cheap pre-check: is an LLM stage worth starting at all right now?"""
+        return self.provider.available() and self.breaker.state != CircuitBreaker.OPEN
+
+    def _admit(self) -> None:
+        if not self.provider.available():
+            raise LLMUnavailable(f"{self.provider.name} is not configured")
+        if not self.breaker.allow():
+            raise LLMUnavailable("circuit open")
+
+    async def generate(self, prompt: str) -> Optional[str]:
+        self._admit()
+        try:
+            await self.limiter.acquire()
+            text = await asyncio.wait_for(self.limiter.submit(self.provider.generate, prompt), timeout=self.timeout_s)
+        except (asyncio.CancelledError, Overloaded):
+            # Caller lost a race, hit its deadline, or we are shedding load; not the backend's fault.
+            self.breaker.release()
+            raise
+        except Exception:
+            self.breaker.record_failure()
+            raise
+        self.breaker.record_success()
+        return text
+
+    async def stream(
+        self, prompt: str, first_chunk_s: Optional[float] = None, idle_s: Optional[float] = None
+    ) -> AsyncIterator[str]:
+        """Yield raw chunks from provider.stream, pumped from an outbound pool thread.
+
+        Raises asyncio.TimeoutError when the first chunk takes longer than `first_chunk_s`
+        or a later one longer than `idle_s`; that, like a provider error, counts toward
+        tripping the breaker. A consumer that cancels or closes the stream (an SSE client
+        going away, the word cap being reached) only gives back the breaker slot, as in
+        generate().
+        """
+        self._admit()
+        try:
+            await self.limiter.acquire()
+        except Overloaded:
+            self.breaker.release()
+            raise
+        loop = asyncio.get_running_loop()
+        queue: "asyncio.Queue[object]" = asyncio.Queue()
+        stop = threading.Event()
+        end = object()
+        outcome: Dict[str, Optional[BaseException]] = {}
+
+        def _pump():
+            try:
+                for text in self.provider.stream(prompt):
+                    if stop.is_set():
+                        break
+                    loop.call_soon_threadsafe(queue.put_nowait, text)
+                outcome["error"] = None
+            except Exception as e:
+                outcome["error"] = e
+            finally:
+                loop.call_soon_threadsafe(queue.put_nowait, end)
+
+        pump = self.limiter.submit(_pump)
+        timed_out = False
+        timeout = first_chunk_s
+        try:
+            while True:
+                try:
+                    item = await asyncio.wait_for(queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    timed_out = True
+                    raise
+                if item is end:
+                    break
+                timeout = idle_s
+                yield item
+        finally:
+            stop.set()
+            pump.cancel()
+            if "error" not in outcome:
+                if timed_out:
+                    self.breaker.record_failure()
+                else:
+                    self.breaker.release()  # the consumer went away; not the backend's fault
+            elif outcome["error"] is None:
+                self.breaker.record_success()
+            else:
+                self.breaker.record_failure()
+                err = outcome["error"]
+                print(f"[llm] {self.provider.name} stream error:", type(err).__name__, str(err))
+
+    def stats(self) -> Dict[str, object]:
+        return {
+            "provider": self.provider.name,
+            "available": self.provider.available(),
+            "breaker": self.breaker.stats(),
+            "limiter": self.limiter.stats(),
+        }
+
+
+def provider_from_env() -> LLMProvider:
+    kind = os.getenv("LLM_PROVIDER", "gemini").lower()
+    if kind == "stub":
+        seed = os.getenv("LLM_STUB_SEED")
+        return StubProvider(
+            latency_s=float(os.getenv("LLM_STUB_LATENCY_MS", "50")) / 1000,
+            failure_rate=float(os.getenv("LLM_STUB_FAILURE_RATE", "0")),
+            seed=int(seed) if seed else None,
+        )
+    if kind != "gemini":
+        raise ValueError(f"Unknown LLM_PROVIDER: {kind!r}")
+    return GeminiProvider(api_key=os.getenv("GEMINI_API_KEY", ""), timeout_s=float(os.getenv("LLM_TIMEOUT_S", "10")))
+
+
+def llm_from_env() -> GuardedLLM:
+    return GuardedLLM(
+        provider_from_env(),
+        CircuitBreaker(
+            failure_threshold=int(os.getenv("LLM_BREAKER_FAILURES", "3")),
+            cooldown_s=float(os.getenv("LLM_BREAKER_COOLDOWN_S", "30")),
+        ),
+        llm_limiter,
+        timeout_s=float(os.getenv("LLM_TIMEOUT_S", "10")),
+    )
@@ -1,26 +1,89 @@
 """FastAPI main application with Toyota vehicle endpoints."""
 
-from fastapi import FastAPI, Depends, HTTPException, Query
+from fastapi import FastAPI, Depends, File, Header, HTTPException, Query, Response, UploadFile, WebSocket
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
-from sqlalchemy.orm import Session
-from typing import List, Optional
+from fastapi.responses import ORJSONResponse, StreamingResponse
+from sqlalchemy import insert, select, text
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+from typing import Dict, List, Optional
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta
+import asyncio
+import hmac
+import io
 import json
+import os
 
-from . import models, schemas
-from .database import engine, get_db
+from . import (
+    activity, cache, exporter, facets, fuzzy, geo, inventory_context, matching, metrics, models, pricing, ratelimit,
+    realtime, schemas, sqlprofile,
+)
+from .catalog import record_change
+from .compression import CompressionMiddleware
+from .database import (
+    AsyncReadSessionLocal, AsyncSessionLocal, SessionLocal, async_engine, async_read_engine, engine, get_async_db,
+    get_read_db,
+)
 from .mock_data import populate_database
-from .chatbot import ChatMessage, ChatResponse, generate_chat_response
+from .concurrency import Overloaded, limiter_stats
+from .importer import FORMATS, detect_format, import_vehicles
+from .scheduler import SCHEDULER_ENABLED, scheduler
+
+# Shared secret for /admin endpoints (sent as X-Admin-Token); unset disables them
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")
 
-# Create database tables
-models.Base.metadata.create_all(bind=engine)
+# Warm the chatbot stack up in the background at startup instead of on the first /chat
+CHAT_WARMUP = os.getenv("CHAT_WARMUP", "1") == "1"
+
+# How often the trending table is rebuilt from view history
+TRENDING_REFRESH_S = float(os.getenv("TRENDING_REFRESH_S", "300"))
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Seed the database and start the catalog watcher and job scheduler; stop them on shutdown."""
+    db = SessionLocal()
+    try:
+        populate_database(db)
+    finally:
+        db.close()
+    # Baseline catalog version, then follow the change feed for writes by other workers
+    await cache.watcher.poll()
+    watcher = None
+    if cache.CATALOG_POLL_INTERVAL_S > 0:
+        watcher = asyncio.create_task(cache.watcher.run())
+    if CHAT_WARMUP:
+        app.state.chat_warmup = asyncio.get_running_loop().run_in_executor(None, _warm_up_chatbot)
+    if SCHEDULER_ENABLED:
+        scheduler.start()
+    realtime.hub.start()
+    yield
+    await realtime.hub.stop()
+    await scheduler.stop()
+    if watcher is not None:
+        watcher.cancel()
+        # Let a poll in flight unwind before its connection's pool is disposed
+        await asyncio.gather(watcher, return_exceptions=True)
+    # Each pooled aiosqlite connection owns a worker thread
+    await async_engine.dispose()
+    await async_read_engine.dispose()
 
 # Initialize FastAPI app
 app = FastAPI(
+    lifespan=lifespan,
     title="Toyota Vehicle Finder API",
     description="API for searching and comparing Toyota vehicles",
-    version="1.0.0"
+    version="1.0.0",
+    # orjson encodes large /cars payloads several times faster than the stdlib encoder
+    default_response_class=ORJSONResponse,
 )
 
+# Per-session/IP token buckets and SLO-based shedding of history traffic (see ratelimit.py);
+# added first so it sits inside CORS and its 429/503 answers carry CORS headers
+app.add_middleware(ratelimit.RateLimitMiddleware)
+
 # Configure CORS
 app.add_middleware(
     CORSMiddleware,
@@ -30,14 +93,84 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-@app.on_event("startup")
-async def startup_event():
-    """Initialize database with mock data on startup."""
-    db = SessionLocal()
+# gzip (plus br/zstd when installed) for responses over COMPRESSION_MIN_BYTES; SSE is left alone
+app.add_middleware(CompressionMiddleware)
+
+# Prometheus metrics: per-route HTTP latency/status/in-flight, SQL per request, outbound gauges
+app.add_middleware(metrics.MetricsMiddleware)
+metrics.instrument_engine(engine, "sync")
+metrics.instrument_engine(async_read_engine, "read")
+metrics.instrument_engine(async_engine, "write")
+# Opt-in SQL profiler (SQL_PROFILE=1): X-SQL-Profile header and N+1 logging per request
+for _engine in (engine, async_read_engine, async_engine):
+    sqlprofile.instrument_engine(_engine)
+if sqlprofile.SQL_PROFILE:
+    app.add_middleware(sqlprofile.SQLProfileMiddleware)
+for _field in ("in_flight", "queued"):
+    metrics.GaugeFunc(
+        f"outbound_calls_{_field}",
+        f"Outbound chatbot calls {_field.replace('_', ' ')}, by kind.",
+        ["kind"],
+        lambda field=_field: {(name,): s[field] for name, s in limiter_stats().items()},
+    )
+metrics.CounterFunc(
+    "outbound_calls_rejected_total",
+    "Outbound chatbot calls shed because no slot was free in time.",
+    ["kind"],
+    lambda: {(name,): s["rejected"] for name, s in limiter_stats().items()},
+)
+
+def _chatbot():
+    """Import the chatbot stack on first use.
+
+    It loads .env, the HTTP client and the LLM backend, none of which the catalog
+    endpoints need, so workers that only serve /cars never pay for it.
+    """
+    from . import chatbot
+    return chatbot
+
+def _warm_up_chatbot():
     try:
-        populate_database(db)
-    finally:
-        db.close()
+        _chatbot().warm_up()
+    except Exception as e:
+        print("[chat] warm-up failed:", type(e).__name__, str(e))
+
+# -----------------------------------------------------------------------------
+# Background jobs (see scheduler.py)
+# -----------------------------------------------------------------------------
+async def _warm_catalog():
+    """Rebuild what the first requests after a catalog change would otherwise compute."""
+    async with AsyncReadSessionLocal() as db:
+        key = (None,) * 7  # unfiltered /cars
+        listing = await cache.LISTINGS.get_or_load(key, lambda: _query_vehicles(db, *key))
+        await facets.catalog_facets(db)
+        await fuzzy.catalog_index(db)
+        await matching.match_index(db)
+        # The chatbot's context for questions naming no model or intent
+        await cache.INVENTORY_CONTEXT.get_or_load(
+            ((), frozenset()), lambda: inventory_context.build_inventory_context(db, [], set())
+        )
+    return {"vehicles": len(listing)}
+
+async def _refresh_trending():
+    async with AsyncReadSessionLocal() as read_db, AsyncSessionLocal() as write_db:
+        return await activity.refresh_trending(read_db, write_db)
+
+async def _compact_view_history():
+    async with AsyncSessionLocal() as db:
+        return await activity.compact_view_history(db)
+
+async def _optimize_db():
+    """Let SQLite refresh planner statistics for tables whose contents shifted."""
+    async with AsyncSessionLocal() as db:
+        await db.execute(text("PRAGMA optimize"))
+        await db.commit()
+
+scheduler.add("catalog_warmup", _warm_catalog, on_catalog_change=True, jitter_s=1)
+scheduler.add("trending", _refresh_trending, interval_s=TRENDING_REFRESH_S, jitter_s=TRENDING_REFRESH_S / 10,
+              single_instance=True)
+scheduler.add("compact_view_history", _compact_view_history, interval_s=3600, jitter_s=300, single_instance=True)
+scheduler.add("optimize_db", _optimize_db, interval_s=6 * 3600, jitter_s=600, single_instance=True)
 
 @app.get("/")
 def read_root():
@@ -49,7 +182,7 @@ def read_root():
     }
 
 @app.get("/cars", response_model=List[schemas.Vehicle])
-def get_vehicles(
+async def get_vehicles(
     model: Optional[str] = None,
     min_price: Optional[float] = None,
     max_price: Optional[float] = None,
@@ -57,53 +190,179 @@ def get_vehicles(
     min_mpg: Optional[int] = None,
     category: Optional[str] = None,
     search_query: Optional[str] = None,
-    db: Session = Depends(get_db)
+    near: Optional[str] = Query(None, description="lat,lon: only vehicles in stock at dealers within `radius`"),
+    radius: float = Query(50, gt=0, le=geo.MAX_RADIUS_MILES, description="Search radius in miles"),
+    db: AsyncSession = Depends(get_read_db)
 ):
-    """Get all vehicles with optional filters."""
-    query = db.query(models.Vehicle)
+    """Get all vehicles with optional filters (model and search_query tolerate typos)."""
+    if model or search_query:
+        index = await fuzzy.catalog_index(db)
+        model = index.correct(model) if model else model
+        search_query = index.correct(search_query) if search_query else search_query
+    key = (model, min_price, max_price, drivetrain, min_mpg, category, search_query)
+    if near:
+        # Stock moves without touching the catalog change feed, so location searches bypass the cache
+        dealers = await geo.dealers_within(db, *_parse_near(near), radius)
+        return await _query_vehicles(db, *key, dealer_ids=[dealer_id for dealer_id, _ in dealers])
+    return await cache.LISTINGS.get_or_load(key, lambda: _query_vehicles(db, *key))
+
+def _parse_near(near: str):
+    try:
+        return geo.parse_near(near)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+async def _query_vehicles(
+    db: AsyncSession, model, min_price, max_price, drivetrain, min_mpg, category, search_query,
+    dealer_ids: Optional[List[int]] = None,
+):
+    query = select(models.Vehicle)
+    
+    if dealer_ids is not None:
+        if not dealer_ids:
+            return []
+        query = query.where(models.Vehicle.id.in_(
+            select(models.Stock.vehicle_id).where(models.Stock.dealer_id.in_(dealer_ids))
+        ))
     
     if model:
-        query = query.filter(models.Vehicle.model.ilike(f"%{model}%"))
+        query = query.where(models.Vehicle.model.ilike(f"%{model}%"))
     if min_price:
-        query = query.filter(models.Vehicle.price >= min_price)
+        query = query.where(models.Vehicle.price >= min_price)
     if max_price:
-        query = query.filter(models.Vehicle.price <= max_price)
+        query = query.where(models.Vehicle.price <= max_price)
     if drivetrain:
-        query = query.filter(models.Vehicle.drivetrain == drivetrain)
+        query = query.where(models.Vehicle.drivetrain == drivetrain)
     if min_mpg:
-        query = query.filter(models.Vehicle.mpg_combined >= min_mpg)
+        query = query.where(models.Vehicle.mpg_combined >= min_mpg)
     if category:
-        query = query.filter(models.Vehicle.category == category)
+        query = query.where(models.Vehicle.category == category)
     if search_query:
-        query = query.filter(
+        query = query.where(
             (models.Vehicle.model.ilike(f"%{search_query}%")) |
             (models.Vehicle.trim.ilike(f"%{search_query}%")) |
             (models.Vehicle.category.ilike(f"%{search_query}%"))
         )
     
-    vehicles = query.all()
-    return vehicles
+    return (await db.execute(query)).scalars().all()
+
+# Declared before /cars/{vehicle_id} so "facets", "trending", "match" and "price-drops" are not taken for an id
+@app.get("/cars/facets", response_model=schemas.Facets)
+async def get_facets(db: AsyncSession = Depends(get_read_db)):
+    """Filter values with vehicle counts, plus price and MPG ranges."""
+    return await facets.catalog_facets(db)
+
+@app.get("/cars/trending", response_model=List[schemas.TrendingVehicle])
+async def get_trending(limit: int = Query(10, ge=1, le=100), db: AsyncSession = Depends(get_read_db)):
+    """Most-viewed vehicles over the last day and week (refreshed every TRENDING_REFRESH_S)."""
+    return await activity.trending(db, limit)
+
+@app.post("/cars/match", response_model=schemas.MatchResponse)
+async def match_vehicles(request: schemas.MatchRequest, db: AsyncSession = Depends(get_read_db)):
+    """Vehicles meeting the quiz's hard constraints, ranked by the weighted criteria (best first)."""
+    index = await matching.match_index(db)
+    rows = index.candidates(
+        request.max_price, request.min_seating, request.min_towing, request.min_mpg,
+        request.all_wheel_drive, request.category,
+    )
+    return {"candidates": len(rows), "results": index.top(rows, request.weights.model_dump(), request.limit)}
+
+@app.get("/cars/price-drops", response_model=List[schemas.PriceDrop])
+async def get_price_drops(
+    since: Optional[datetime] = Query(None, description="Default: 7 days ago (UTC)"),
+    min_drop: float = Query(0, ge=0, description="Smallest drop in dollars"),
+    limit: int = Query(50, ge=1, le=500),
+    db: AsyncSession = Depends(get_read_db),
+):
+    """Vehicles whose price fell since `since`, biggest drop first."""
+    since = since or datetime.utcnow() - timedelta(days=7)
+    return await pricing.price_drops(db, since, limit, min_drop)
 
 @app.get("/cars/{vehicle_id}", response_model=schemas.Vehicle)
-def get_vehicle(vehicle_id: int, db: Session = Depends(get_db)):
+async def get_vehicle(vehicle_id: int, db: AsyncSession = Depends(get_read_db)):
     """Get a specific vehicle by ID."""
-    vehicle = db.query(models.Vehicle).filter(models.Vehicle.id == vehicle_id).first()
+    vehicle = await cache.VEHICLES.get_or_load(
+        vehicle_id, lambda: db.get(models.Vehicle, vehicle_id), vehicle_ids=[vehicle_id]
+    )
     if not vehicle:
         raise HTTPException(status_code=404, detail="Vehicle not found")
     return vehicle
 
+@app.get("/cars/{vehicle_id}/price-history", response_model=schemas.PriceHistoryResponse)
+async def get_price_history(
+    vehicle_id: int,
+    since: Optional[datetime] = Query(None, description="Default: 90 days before `until`"),
+    until: Optional[datetime] = Query(None, description="Default: now (UTC)"),
+    points: int = Query(200, ge=2, le=pricing.MAX_POINTS, description="Downsample to at most this many points"),
+    db: AsyncSession = Depends(get_read_db),
+):
+    """Price changes of a vehicle, downsampled to `points` buckets for long ranges."""
+    if await db.get(models.Vehicle, vehicle_id) is None:
+        raise HTTPException(status_code=404, detail="Vehicle not found")
+    until = until or datetime.utcnow()
+    since = since or until - timedelta(days=90)
+    if pricing.to_ms(since) > pricing.to_ms(until):
+        raise HTTPException(status_code=400, detail="since must not be after until")
+    return await pricing.price_history(db, vehicle_id, since, until, points)
+
+@app.get("/cars/{vehicle_id}/stock", response_model=List[schemas.StockUnit])
+async def get_vehicle_stock(
+    vehicle_id: int,
+    near: Optional[str] = Query(None, description="lat,lon: only dealers within `radius`, nearest first"),
+    radius: float = Query(50, gt=0, le=geo.MAX_RADIUS_MILES, description="Search radius in miles"),
+    db: AsyncSession = Depends(get_read_db),
+):
+    """Units of a vehicle on dealer lots: nearest first when `near` is given, else cheapest first."""
+    query = (
+        select(models.Stock)
+        .where(models.Stock.vehicle_id == vehicle_id)
+        .options(selectinload(models.Stock.dealer))
+    )
+    if not near:
+        return (await db.execute(query.order_by(models.Stock.price))).scalars().all()
+    distances = dict(await geo.dealers_within(db, *_parse_near(near), radius))
+    if not distances:
+        return []
+    units = (await db.execute(query.where(models.Stock.dealer_id.in_(distances)))).scalars().all()
+    units = sorted(units, key=lambda u: (distances[u.dealer_id], u.price))
+    return [
+        schemas.StockUnit(id=u.id, vin=u.vin, price=u.price, dealer=_dealer_at(u.dealer, distances[u.dealer_id]))
+        for u in units
+    ]
+
+def _dealer_at(dealer: models.Dealer, miles: float) -> schemas.Dealer:
+    return schemas.Dealer.model_validate(dealer).model_copy(update={"distance_miles": round(miles, 1)})
+
+@app.get("/dealers", response_model=List[schemas.Dealer])
+async def get_dealers(
+    near: Optional[str] = Query(None, description="lat,lon: only dealers within `radius`, nearest first"),
+    radius: float = Query(50, gt=0, le=geo.MAX_RADIUS_MILES, description="Search radius in miles"),
+    db: AsyncSession = Depends(get_read_db),
+):
+    """List dealers, or those within `radius` miles of `near`."""
+    if not near:
+        return (await db.execute(select(models.Dealer).order_by(models.Dealer.name))).scalars().all()
+    hits = await geo.dealers_within(db, *_parse_near(near), radius)
+    if not hits:
+        return []
+    rows = (await db.execute(
+        select(models.Dealer).where(models.Dealer.id.in_([dealer_id for dealer_id, _ in hits]))
+    )).scalars().all()
+    by_id = {d.id: d for d in rows}
+    return [_dealer_at(by_id[dealer_id], miles) for dealer_id, miles in hits]
+
 @app.post("/compare", response_model=schemas.ComparisonResponse)
-def compare_vehicles(
+async def compare_vehicles(
     request: schemas.ComparisonRequest,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Compare multiple vehicles."""
-    # Get vehicles
-    vehicles = []
-    for vehicle_id in request.vehicle_ids:
-        vehicle = db.query(models.Vehicle).filter(models.Vehicle.id == vehicle_id).first()
-        if vehicle:
-            vehicles.append(vehicle)
+    # Get vehicles (one query, kept in request order)
+    rows = (await db.execute(
+        select(models.Vehicle).where(models.Vehicle.id.in_(request.vehicle_ids))
+    )).scalars().all()
+    by_id = {v.id: v for v in rows}
+    vehicles = [by_id[vehicle_id] for vehicle_id in request.vehicle_ids if vehicle_id in by_id]
     
     if not vehicles:
         raise HTTPException(status_code=404, detail="No vehicles found")
@@ -122,15 +381,12 @@ def compare_vehicles(
         "Safety Rating": [v.safety_rating for v in vehicles],
     }
     
-    # Save comparison to database
-    for position, vehicle_id in enumerate(request.vehicle_ids, 1):
-        comparison = models.Comparison(
-            session_id=request.session_id,
-            vehicle_id=vehicle_id,
-            position=position
-        )
-        db.add(comparison)
-    db.commit()
+    # Save comparison to database (one executemany, not an INSERT per vehicle)
+    await db.execute(insert(models.Comparison), [
+        {"session_id": request.session_id, "vehicle_id": vehicle_id, "position": position}
+        for position, vehicle_id in enumerate(request.vehicle_ids, 1)
+    ])
+    await db.commit()
     
     return schemas.ComparisonResponse(
         vehicles=vehicles,
@@ -215,28 +471,27 @@ def calculate_lease(request: schemas.LeaseCalculatorRequest):
     )
 
 @app.get("/favorites/{user_id}", response_model=List[schemas.Favorite])
-def get_favorites(user_id: str, db: Session = Depends(get_db)):
+async def get_favorites(user_id: str, db: AsyncSession = Depends(get_read_db)):
     """Get user's favorite vehicles."""
-    favorites = db.query(models.Favorite).filter(
-        models.Favorite.user_id == user_id
-    ).all()
-    
-    # Load vehicle details
-    for favorite in favorites:
-        favorite.vehicle = db.query(models.Vehicle).filter(
-            models.Vehicle.id == favorite.vehicle_id
-        ).first()
+    # Vehicle details are loaded with one extra IN query, not one query per favorite
+    favorites = (await db.execute(
+        select(models.Favorite)
+        .where(models.Favorite.user_id == user_id)
+        .options(selectinload(models.Favorite.vehicle))
+    )).scalars().all()
     
     return favorites
 
 @app.post("/favorites", response_model=schemas.Favorite)
-def add_favorite(favorite: schemas.FavoriteCreate, db: Session = Depends(get_db)):
+async def add_favorite(favorite: schemas.FavoriteCreate, db: AsyncSession = Depends(get_async_db)):
     """Add a vehicle to favorites."""
     # Check if already favorited
-    existing = db.query(models.Favorite).filter(
-        models.Favorite.user_id == favorite.user_id,
-        models.Favorite.vehicle_id == favorite.vehicle_id
-    ).first()
+    existing = (await db.execute(
+        select(models.Favorite).where(
+            models.Favorite.user_id == favorite.user_id,
+            models.Favorite.vehicle_id == favorite.vehicle_id
+        )
+    )).scalars().first()
     
     if existing:
         raise HTTPException(status_code=400, detail="Vehicle already in favorites")
@@ -244,56 +499,209 @@ def add_favorite(favorite: schemas.FavoriteCreate, db: Session = Depends(get_db)
     # Add favorite
     db_favorite = models.Favorite(**favorite.dict())
     db.add(db_favorite)
-    db.commit()
-    db.refresh(db_favorite)
+    await db.commit()
     
     # Load vehicle details
-    db_favorite.vehicle = db.query(models.Vehicle).filter(
-        models.Vehicle.id == db_favorite.vehicle_id
-    ).first()
+    await db.refresh(db_favorite, attribute_names=["vehicle"])
     
     return db_favorite
 
 @app.delete("/favorites/{user_id}/{vehicle_id}")
-def remove_favorite(user_id: str, vehicle_id: int, db: Session = Depends(get_db)):
+async def remove_favorite(user_id: str, vehicle_id: int, db: AsyncSession = Depends(get_async_db)):
     """Remove a vehicle from favorites."""
-    favorite = db.query(models.Favorite).filter(
-        models.Favorite.user_id == user_id,
-        models.Favorite.vehicle_id == vehicle_id
-    ).first()
+    favorite = (await db.execute(
+        select(models.Favorite).where(
+            models.Favorite.user_id == user_id,
+            models.Favorite.vehicle_id == vehicle_id
+        )
+    )).scalars().first()
     
     if not favorite:
         raise HTTPException(status_code=404, detail="Favorite not found")
     
-    db.delete(favorite)
-    db.commit()
+    await db.delete(favorite)
+    await db.commit()
     
     return {"message": "Favorite removed successfully"}
 
 @app.post("/history")
-def add_view_history(history: schemas.ViewHistoryCreate, db: Session = Depends(get_db)):
-    """Add vehicle view to history."""
-    db_history = models.ViewHistory(**history.dict())
-    db.add(db_history)
-    db.commit()
-    return {"message": "View recorded"}
+async def add_view_history(
+    history: schemas.ViewHistoryCreate,
+    db: AsyncSession = Depends(get_async_db),
+    idempotency_key: Optional[str] = Header(None, max_length=128),
+):
+    """Add vehicle view to history; repeats within the dedup window or of an Idempotency-Key are dropped."""
+    recorded = await activity.record_view(db, history.user_id, history.vehicle_id, idempotency_key)
+    return {"message": "View recorded" if recorded else "Duplicate view ignored", "recorded": recorded}
 
 @app.get("/history/{user_id}", response_model=List[schemas.ViewHistory])
-def get_view_history(user_id: str, limit: int = 10, db: Session = Depends(get_db)):
+async def get_view_history(user_id: str, limit: int = 10, db: AsyncSession = Depends(get_read_db)):
     """Get user's view history."""
-    history = db.query(models.ViewHistory).filter(
-        models.ViewHistory.user_id == user_id
-    ).order_by(models.ViewHistory.viewed_at.desc()).limit(limit).all()
+    history = (await db.execute(
+        select(models.ViewHistory)
+        .where(models.ViewHistory.user_id == user_id)
+        .order_by(models.ViewHistory.viewed_at.desc())
+        .limit(limit)
+    )).scalars().all()
     return history
 
-@app.post("/chat", response_model=ChatResponse)
-async def chat_with_bot(message: ChatMessage, db: Session = Depends(get_db)):
+def _server_timing(timings: Dict[str, object]) -> str:
+    """Format per-stage durations (ms) and the winning stage as a Server-Timing header value."""
+    parts = [f"{name};dur={ms}" for name, ms in timings.items() if isinstance(ms, (int, float))]
+    if "winner" in timings:
+        parts.append(f'winner;desc="{timings["winner"]}"')
+    return ", ".join(parts)
+
+@app.post("/chat", response_model=schemas.ChatResponse)
+async def chat_with_bot(message: schemas.ChatMessage, response: Response, db: AsyncSession = Depends(get_read_db)):
     """Chat with the AI assistant."""
-    response = await generate_chat_response(message.message, db)
-    return ChatResponse(response=response)
+    timings: Dict[str, object] = {}  # stage -> ms, plus "winner": the stage that answered
+    try:
+        reply = await _chatbot().generate_chat_response(message.message, db, timings=timings)
+    except Overloaded:
+        raise HTTPException(
+            status_code=503,
+            detail="The assistant is busy right now. Please try again in a moment.",
+            headers={"Retry-After": "2"},
+        )
+    response.headers["Server-Timing"] = _server_timing(timings)
+    return schemas.ChatResponse(response=reply)
+
+def _sse(event: str, data: dict) -> str:
+    """Encode one Server-Sent Event."""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+@app.post("/chat/stream")
+async def chat_with_bot_stream(message: schemas.ChatMessage, db: AsyncSession = Depends(get_read_db)):
+    """Chat with the AI assistant, streaming the answer as Server-Sent Events.
+
+    Emits `delta` events ({"text": ...}) followed by one `done` event carrying stage timings.
+    """
+    async def events():
+        timings: Dict[str, object] = {}
+        async for piece in _chatbot().stream_chat_response(message.message, db, timings=timings):
+            yield _sse("delta", {"text": piece})
+        yield _sse("done", {"timings": timings})
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@app.websocket("/ws/catalog")
+async def catalog_updates(websocket: WebSocket):
+    """Push catalog diffs (changed vehicle ids and fields, catalog version); see realtime.py for the protocol."""
+    await realtime.hub.serve(websocket)
+
+@app.get("/chat/stats")
+def chat_stats():
+    """Request-coalescing counters, LLM backend / circuit-breaker state and outbound call gauges."""
+    chatbot = _chatbot()
+    return {"singleflight": chatbot.singleflight_stats(), "llm": chatbot.llm_stats(), "outbound": chatbot.outbound_stats()}
 
-# Import SessionLocal for startup event
-from .database import SessionLocal
+@app.get("/metrics", include_in_schema=False)
+def metrics_endpoint():
+    """Prometheus metrics for this worker process."""
+    return Response(metrics.render(), media_type=metrics.CONTENT_TYPE)
+
+def require_admin(x_admin_token: Optional[str] = Header(None)):
+    """Dependency guarding /admin endpoints with the ADMIN_TOKEN shared secret."""
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Admin endpoints are disabled (ADMIN_TOKEN is not set)")
+    if not x_admin_token or not hmac.compare_digest(x_admin_token, ADMIN_TOKEN):
+        raise HTTPException(status_code=401, detail="Invalid admin token")
+
+@app.post("/admin/import", dependencies=[Depends(require_admin)])
+async def admin_import(
+    file: UploadFile = File(...),
+    format: Optional[str] = Query(None, description="csv or jsonl (default: from the file name)"),
+    batch_size: Optional[int] = Query(None, ge=1, le=100000),
+):
+    """Bulk-upsert vehicles from an uploaded CSV or JSON Lines file.
+
+    Returns row counts, throughput and the first rejected rows with their errors.
+    """
+    try:
+        fmt = format or detect_format(file.filename or "")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if fmt not in FORMATS:
+        raise HTTPException(status_code=400, detail=f"format must be one of {', '.join(FORMATS)}")
+    # The upload is already spooled to disk; the import reads it incrementally in a worker thread.
+    stream = io.TextIOWrapper(file.file, encoding="utf-8", newline="")
+    try:
+        stats = await run_in_threadpool(import_vehicles, stream, fmt, batch_size=batch_size)
+    except UnicodeDecodeError:
+        raise HTTPException(status_code=400, detail="File must be UTF-8 encoded")
+    finally:
+        stream.detach()
+    # Bulk change: drop this worker's caches now; the others follow the change feed
+    cache.invalidate()
+    return stats.as_dict()
+
+@app.get("/admin/export/{table}", dependencies=[Depends(require_admin)])
+def admin_export(
+    table: str,
+    format: str = Query("ndjson", description="csv, ndjson or parquet (parquet needs pyarrow)"),
+    since: Optional[datetime] = Query(None, description="Only rows created/viewed at or after this time"),
+    chunk_size: Optional[int] = Query(None, ge=1, le=100000),
+):
+    """Stream a whole table (vehicles, favorites, comparisons, view_history) as a file download.
+
+    Rows are read in chunks from one cursor, so memory use does not grow with the table.
+    Activity tables come out in timestamp order: pass the last row's timestamp as `since`
+    to fetch only what is new.
+    """
+    try:
+        body = exporter.export_table(table, format, since, chunk_size=chunk_size)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    filename = f"{table}.{exporter.EXTENSIONS[format]}"
+    # A sync generator: Starlette pulls each chunk in the threadpool
+    return StreamingResponse(
+        body,
+        media_type=exporter.MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+@app.get("/admin/jobs", dependencies=[Depends(require_admin)])
+async def admin_jobs(db: AsyncSession = Depends(get_read_db)):
+    """Background jobs with this worker's run counts and timings, and who holds shared job leases."""
+    return {"enabled": SCHEDULER_ENABLED, "jobs": await scheduler.status(db)}
+
+@app.post("/admin/jobs/{name}/run", status_code=202, dependencies=[Depends(require_admin)])
+def admin_run_job(name: str):
+    """Run a job now in this worker instead of waiting for its next turn."""
+    if not SCHEDULER_ENABLED:
+        raise HTTPException(status_code=409, detail="The scheduler is disabled (SCHEDULER_ENABLED=0)")
+    try:
+        scheduler.trigger(name)
+    except KeyError:
+        raise HTTPException(status_code=404, detail="Unknown job")
+    return {"triggered": name}
+
+@app.patch("/admin/cars/{vehicle_id}", response_model=schemas.Vehicle, dependencies=[Depends(require_admin)])
+async def admin_update_vehicle(
+    vehicle_id: int,
+    changes: schemas.VehicleUpdate,
+    db: AsyncSession = Depends(get_async_db),
+):
+    """Edit one vehicle's fields; every worker's caches drop it via the change feed."""
+    vehicle = await db.get(models.Vehicle, vehicle_id)
+    if not vehicle:
+        raise HTTPException(status_code=404, detail="Vehicle not found")
+    for field, value in changes.model_dump(exclude_unset=True).items():
+        setattr(vehicle, field, value)
+    try:
+        await db.flush()
+        await db.run_sync(lambda s: record_change(s.connection(), "admin", [vehicle_id]))
+        await db.commit()
+    except IntegrityError:
+        await db.rollback()
+        raise HTTPException(status_code=409, detail="Another vehicle already has this model, year and trim")
+    cache.invalidate([vehicle_id])
+    return vehicle
 
 if __name__ == "__main__":
     import uvicorn
@@ -0,0 +1,108 @@
+"""Weighted multi-criteria "best match" ranking for the shopper quiz.
+
+The catalog is held as a feature matrix (one row per vehicle, one column per
+criterion) normalized once to [0, 1] with higher = better, so price is inverted:
+the cheapest vehicle scores 1. It is rebuilt only when the catalog changes (see
+cache.py). A query masks out vehicles failing the hard constraints, takes the dot
+product of the remaining rows with the normalized weights, and picks the top k with
+argpartition - O(n) for the scores and the selection, then O(k log k) to order the
+winners - so latency is flat in k.
+
+Each result carries its per-criterion contributions (weight x normalized value), which
+sum to the score.
+"""
+
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .cache import MATCH_INDEX
+from .models import Vehicle
+
+CRITERIA = ("price", "mpg_combined", "seating", "cargo_volume", "towing_capacity", "safety_rating")
+LOWER_IS_BETTER = {"price"}
+ALL_WHEEL_DRIVE = {"AWD", "4WD"}
+
+
+class MatchIndex:
+    """Normalized features of every vehicle, for vectorized scoring."""
+
+    def __init__(self, vehicles: Sequence[Vehicle]):
+        self.vehicles = list(vehicles)
+        n = len(self.vehicles)
+        # Raw values for the constraints (NaN where missing, which fails every comparison)
+        self.raw = {
+            name: np.array([getattr(v, name) for v in self.vehicles], dtype=np.float64)
+            for name in CRITERIA
+        }
+        self.ids = np.array([v.id for v in self.vehicles], dtype=np.int64)
+        self.all_wheel_drive = np.array([v.drivetrain in ALL_WHEEL_DRIVE for v in self.vehicles], dtype=bool)
+        self.category = np.array([(v.category or "").lower() for v in self.vehicles], dtype=object)
+        self.features = np.zeros((n, len(CRITERIA)), dtype=np.float64)
+        for j, name in enumerate(CRITERIA):
+            col = self.raw[name]
+            if n == 0 or np.isnan(col).all():
+                continue
+            lo, hi = np.nanmin(col), np.nanmax(col)
+            norm = (col - lo) / (hi - lo) if hi > lo else np.ones(n)
+            if name in LOWER_IS_BETTER:
+                norm = 1.0 - norm
+            self.features[:, j] = np.nan_to_num(norm, nan=0.0)
+
+    def __len__(self) -> int:
+        return len(self.vehicles)
+
+    def candidates(
+        self,
+        max_price: Optional[float] = None,
+        min_seating: Optional[int] = None,
+        min_towing: Optional[int] = None,
+        min_mpg: Optional[int] = None,
+        all_wheel_drive: bool = False,
+        category: Optional[str] = None,
+    ) -> np.ndarray:
+        """Row positions of vehicles meeting every hard constraint."""
+        mask = np.ones(len(self), dtype=bool)
+        if max_price is not None:
+            mask &= self.raw["price"] <= max_price
+        if min_seating is not None:
+            mask &= self.raw["seating"] >= min_seating
+        if min_towing is not None:
+            mask &= self.raw["towing_capacity"] >= min_towing
+        if min_mpg is not None:
+            mask &= self.raw["mpg_combined"] >= min_mpg
+        if all_wheel_drive:
+            mask &= self.all_wheel_drive
+        if category:
+            mask &= self.category == category.lower()
+        return np.flatnonzero(mask)
+
+    def top(self, rows: np.ndarray, weights: Dict[str, float], k: int) -> List[Dict[str, object]]:
+        """The k best of `rows` by weighted score, ordered by score, then id."""
+        w = np.array([max(float(weights.get(name, 0.0)), 0.0) for name in CRITERIA])
+        w = w / w.sum() if w.sum() > 0 else np.full(len(CRITERIA), 1.0 / len(CRITERIA))
+        scores = self.features[rows] @ w
+        if k < len(rows):
+            # argpartition picks arbitrarily among rows tied at the k-th score, so take
+            # every row scoring at least that much and let the id tie-break decide
+            kth = scores[np.argpartition(-scores, k - 1)[k - 1]]
+            best = np.flatnonzero(scores >= kth)
+        else:
+            best = np.arange(len(rows))
+        best = best[np.lexsort((self.ids[rows[best]], -scores[best]))][:k]
+        winners = rows[best]
+        contributions = np.round(self.features[winners] * w, 4).tolist()
+        return [
+            {"vehicle": self.vehicles[row], "score": score, "breakdown": dict(zip(CRITERIA, parts))}
+            for row, score, parts in zip(winners.tolist(), np.round(scores[best], 4).tolist(), contributions)
+        ]
+
+async def _load_match_index(db: AsyncSession) -> MatchIndex:
+    return MatchIndex((await db.execute(select(Vehicle).order_by(Vehicle.id))).scalars().all())
+
+
+async def match_index(db: AsyncSession) -> MatchIndex:
+    """Index over the whole catalog; rebuilt on first use after the catalog changes."""
+    return await MATCH_INDEX.get_or_load("catalog", lambda: _load_match_index(db))
@@ -0,0 +1,310 @@
+"""In-process metrics exposed in the Prometheus text format at /metrics.
+
+A small registry (counters, gauges, histograms, all with labels) so the API needs no
+metrics dependency. Values are per process: with several uvicorn workers a scrape sees
+whichever worker answered, so run one worker per container when scraping.
+
+Besides the primitives this module provides the HTTP middleware (per-route latency,
+status counts, in-flight requests) and SQLAlchemy instrumentation (statements and DB
+time per request, attributed to the route through a context variable).
+"""
+
+import threading
+import time
+from contextvars import ContextVar
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from sqlalchemy import event
+from starlette.routing import Match
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+Labels = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _fmt_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _fmt_value(v: float) -> str:
+    if v == float("inf"):
+        return "+Inf"
+    return repr(float(v)) if not float(v).is_integer() else str(int(v))
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: Dict[str, "_Metric"] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric: "_Metric") -> None:
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Metric {metric.name!r} is already registered")
+            self._metrics[metric.name] = metric
+
+    def unregister(self, name: str) -> None:
+        with self._lock:
+            self._metrics.pop(name, None)
+
+    def get(self, name: str) -> Optional["_Metric"]:
+        return self._metrics.get(name)
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines: List[str] = []
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, help: str, labelnames: Iterable[str] = (), registry: Registry = REGISTRY):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        registry.register(self)
+
+    def _key(self, labels: Dict[str, object]) -> Labels:
+        if len(labels) != len(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[n]) for n in self.labelnames)
+
+    def render(self) -> Iterator[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values: Dict[Labels, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+    def render(self) -> Iterator[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, v in items:
+            yield f"{self.name}{_fmt_labels(self.labelnames, key)} {_fmt_value(v)}"
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def set(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def dec(self, amount: float = 1.0, **labels) -> None:
+        self.inc(-amount, **labels)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: Iterable[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS,
+                 registry: Registry = REGISTRY):
+        super().__init__(name, help, labelnames, registry)
+        self.buckets = tuple(sorted(buckets))
+        self._values: Dict[Labels, List[float]] = {}  # per-bucket counts (last = +Inf), then sum
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        i = 0
+        while i < len(self.buckets) and value > self.buckets[i]:
+            i += 1
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [0.0] * (len(self.buckets) + 2)
+            state[i] += 1
+            state[-1] += value
+
+    def count(self, **labels) -> int:
+        state = self._values.get(self._key(labels))
+        return int(sum(state[:-1])) if state else 0
+
+    def render(self) -> Iterator[str]:
+        with self._lock:
+            items = sorted((k, list(v)) for k, v in self._values.items())
+        for key, state in items:
+            cumulative = 0.0
+            for bound, n in zip(self.buckets + (float("inf"),), state[:-1]):
+                cumulative += n
+                le = 'le="' + _fmt_value(bound) + '"'
+                yield f"{self.name}_bucket{_fmt_labels(self.labelnames, key, le)} {_fmt_value(cumulative)}"
+            yield f"{self.name}_sum{_fmt_labels(self.labelnames, key)} {_fmt_value(state[-1])}"
+            yield f"{self.name}_count{_fmt_labels(self.labelnames, key)} {_fmt_value(cumulative)}"
+
+
+class _FuncMetric(_Metric):
+    """Values read from `fn` at scrape time: {label values tuple: value}."""
+
+    def __init__(self, name: str, help: str, labelnames: Iterable[str], fn: Callable[[], Dict[Labels, float]],
+                 registry: Registry = REGISTRY):
+        super().__init__(name, help, labelnames, registry)
+        self._fn = fn
+
+    def render(self) -> Iterator[str]:
+        for key, v in sorted(self._fn().items()):
+            yield f"{self.name}{_fmt_labels(self.labelnames, key)} {_fmt_value(v)}"
+
+
+class GaugeFunc(_FuncMetric):
+    kind = "gauge"
+
+
+class CounterFunc(_FuncMetric):
+    kind = "counter"
+
+
+def render() -> str:
+    return REGISTRY.render()
+
+
+# -----------------------------------------------------------------------------
+# HTTP
+# -----------------------------------------------------------------------------
+HTTP_REQUESTS = Counter("http_requests_total", "HTTP requests by route and status.", ["method", "route", "status"])
+HTTP_LATENCY = Histogram("http_request_duration_seconds", "Time to the end of the response body.", ["method", "route"])
+HTTP_IN_FLIGHT = Gauge("http_requests_in_flight", "Requests currently being served.", ["method", "route"])
+
+DB_STATEMENTS = Counter("db_statements_total", "SQL statements executed.", ["engine"])
+DB_STATEMENT_LATENCY = Histogram("db_statement_duration_seconds", "SQL statement execution time.", ["engine"])
+DB_REQUEST_STATEMENTS = Histogram(
+    "db_statements_per_request", "SQL statements issued while serving one request.", ["route"], buckets=COUNT_BUCKETS
+)
+DB_REQUEST_TIME = Histogram("db_time_per_request_seconds", "Time spent in SQL while serving one request.", ["route"])
+
+
+class RequestDB:
+    """SQL activity of the request being served (see request_db())."""
+
+    __slots__ = ("statements", "seconds")
+
+    def __init__(self):
+        self.statements = 0
+        self.seconds = 0.0
+
+
+_request_db: ContextVar[Optional[RequestDB]] = ContextVar("request_db", default=None)
+
+
+def request_db() -> Optional[RequestDB]:
+    return _request_db.get()
+
+
+def match_route(scope) -> Tuple[str, Dict[str, object]]:
+    """The matched route's path template (e.g. /cars/{vehicle_id}) and its path parameters."""
+    app = scope.get("app")
+    router = getattr(app, "router", None)
+    partial = None
+    for route in getattr(router, "routes", ()):
+        match, child = route.matches(scope)
+        if match == Match.FULL:
+            return getattr(route, "path", "unmatched"), child.get("path_params", {})
+        if match == Match.PARTIAL and partial is None:
+            partial = getattr(route, "path", None), child.get("path_params", {})
+    return partial or ("unmatched", {})
+
+
+def route_template(scope) -> str:
+    """The matched route's path template, so IDs don't explode label cardinality."""
+    return match_route(scope)[0]
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording latency, status and in-flight counts per route.
+
+    Pure ASGI rather than BaseHTTPMiddleware so streamed (SSE) responses are timed to
+    their last byte and pass through unbuffered.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        route = route_template(scope)
+        status = {"code": 500}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        db = RequestDB()
+        token = _request_db.set(db)
+        HTTP_IN_FLIGHT.inc(method=method, route=route)
+        t0 = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - t0
+            _request_db.reset(token)
+            HTTP_IN_FLIGHT.dec(method=method, route=route)
+            HTTP_REQUESTS.inc(method=method, route=route, status=status["code"])
+            HTTP_LATENCY.observe(elapsed, method=method, route=route)
+            if db.statements:
+                DB_REQUEST_STATEMENTS.observe(db.statements, route=route)
+                DB_REQUEST_TIME.observe(db.seconds, route=route)
+
+
+# -----------------------------------------------------------------------------
+# Database
+# -----------------------------------------------------------------------------
+def instrument_engine(engine, name: str) -> None:
+    """Count and time every statement on `engine` (sync or async), per engine and per request."""
+    target = getattr(engine, "sync_engine", engine)
+
+    @event.listens_for(target, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("metrics_t0", []).append(time.perf_counter())
+
+    @event.listens_for(target, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["metrics_t0"].pop()
+        DB_STATEMENTS.inc(engine=name)
+        DB_STATEMENT_LATENCY.observe(elapsed, engine=name)
+        db = _request_db.get()
+        if db is not None:
+            db.statements += 1
+            db.seconds += elapsed
+
+    @event.listens_for(target, "handle_error")
+    def _error(context):
+        stack = context.connection.info.get("metrics_t0") if context.connection is not None else None
+        if stack:
+            stack.pop()
@@ -1,6 +1,8 @@
 """Mock Toyota vehicle data for the database."""
 
+import hashlib
 import json
+import random
 
 TOYOTA_VEHICLES = [
     {
@@ -307,20 +309,94 @@ TOYOTA_VEHICLES = [
     }
 ]
 
+# Dealerships around Dallas-Fort Worth and other Texas metros
+TOYOTA_DEALERS = [
+    {"name": "Toyota of Richardson", "address": "1221 N Central Expy", "city": "Richardson", "state": "TX", "latitude": 32.9618, "longitude": -96.7346},
+    {"name": "Toyota of Dallas", "address": "2610 Forest Ln", "city": "Dallas", "state": "TX", "latitude": 32.9102, "longitude": -96.8867},
+    {"name": "Toyota of Plano", "address": "6501 Dallas Pkwy", "city": "Plano", "state": "TX", "latitude": 33.0690, "longitude": -96.8262},
+    {"name": "Toyota of Irving", "address": "1999 W Airport Fwy", "city": "Irving", "state": "TX", "latitude": 32.8330, "longitude": -96.9740},
+    {"name": "Toyota of Arlington", "address": "1200 E Lamar Blvd", "city": "Arlington", "state": "TX", "latitude": 32.7573, "longitude": -97.0920},
+    {"name": "Toyota of Fort Worth", "address": "4801 SW Loop 820", "city": "Fort Worth", "state": "TX", "latitude": 32.6820, "longitude": -97.3960},
+    {"name": "Toyota of McKinney", "address": "1880 N Central Expy", "city": "McKinney", "state": "TX", "latitude": 33.2150, "longitude": -96.6550},
+    {"name": "Toyota of Denton", "address": "4201 S Interstate 35 E", "city": "Denton", "state": "TX", "latitude": 33.1770, "longitude": -97.0990},
+    {"name": "Toyota of Waco", "address": "2915 W Loop 340", "city": "Waco", "state": "TX", "latitude": 31.4980, "longitude": -97.1680},
+    {"name": "Toyota of Austin", "address": "9600 N Interstate 35", "city": "Austin", "state": "TX", "latitude": 30.3720, "longitude": -97.6900},
+    {"name": "Toyota of Houston", "address": "13001 Gulf Fwy", "city": "Houston", "state": "TX", "latitude": 29.6190, "longitude": -95.2380},
+    {"name": "Toyota of San Antonio", "address": "11950 IH-10 W", "city": "San Antonio", "state": "TX", "latitude": 29.5830, "longitude": -98.6000},
+]
+
+SEED_HASH_KEY = "seed_hash"
+
+def seed_hash(vehicles=None, dealers=None):
+    """Content hash of the seed rows; a stored copy lets startup skip unchanged seeds."""
+    rows = {
+        "vehicles": TOYOTA_VEHICLES if vehicles is None else vehicles,
+        "dealers": TOYOTA_DEALERS if dealers is None else dealers,
+    }
+    payload = json.dumps(rows, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+def seed_stock(vehicle_ids, dealer_ids):
+    """Deterministic lot inventory: 0-3 units of each seed vehicle per dealer.
+
+    `vehicle_ids` and `dealer_ids` are the database ids of TOYOTA_VEHICLES and
+    TOYOTA_DEALERS, in list order. VINs are synthetic but stable across runs.
+    """
+    rows = []
+    for d, dealer_id in enumerate(dealer_ids):
+        rng = random.Random(d)
+        for v, vehicle_id in enumerate(vehicle_ids):
+            for unit in range(rng.choice([0, 0, 1, 1, 2, 3])):
+                rows.append({
+                    "vin": f"4T1{d:04d}{v:05d}{unit:05d}",
+                    "dealer_id": dealer_id,
+                    "vehicle_id": vehicle_id,
+                    "price": TOYOTA_VEHICLES[v]["price"] + rng.choice([-1000, -500, 0, 0, 500, 1500]),
+                })
+    return rows
+
 def populate_database(db):
-    from . import models
+    """Create missing tables and upsert the seed vehicles, dealers and their stock.
 
-    KEY = ("model", "year", "trim")  # unique key for a vehicle
+    Vehicles are keyed on (model, year, trim), dealers on name and stock on VIN.
+    Runs under SQLite's write lock (BEGIN IMMEDIATE), so when several workers start
+    together one creates and seeds and the rest wait, see the stored hash and skip.
+    Returns True if rows were written.
+    """
+    from .catalog import (
+        ensure_schema, get_meta, record_change, set_meta, upsert_dealers, upsert_stock, upsert_vehicles,
+    )
+    from .models import Dealer, Vehicle
+    from sqlalchemy import select, tuple_
 
-    for data in TOYOTA_VEHICLES:
-        q = {k: data[k] for k in KEY}
-        row = db.query(models.Vehicle).filter_by(**q).first()
-        if row:
-            # update all columns, including image_url
-            for k, v in data.items():
-                setattr(row, k, v)
-        else:
-            db.add(models.Vehicle(**data))
-    db.commit()
-    return True
+    digest = seed_hash()
 
+    conn = db.connection()
+    conn.exec_driver_sql("BEGIN IMMEDIATE")
+    try:
+        ensure_schema(conn)
+        if get_meta(conn, SEED_HASH_KEY) == digest:
+            db.commit()  # keeps any tables/indexes ensure_schema just added
+            return False
+
+        upsert_vehicles(conn, TOYOTA_VEHICLES)
+        upsert_dealers(conn, TOYOTA_DEALERS)
+        keys = [(v["model"], v["year"], v["trim"]) for v in TOYOTA_VEHICLES]
+        vehicle_ids = {
+            (model, year, trim): vid
+            for model, year, trim, vid in conn.execute(
+                select(Vehicle.model, Vehicle.year, Vehicle.trim, Vehicle.id)
+                .where(tuple_(Vehicle.model, Vehicle.year, Vehicle.trim).in_(keys))
+            )
+        }
+        dealer_ids = dict(conn.execute(select(Dealer.name, Dealer.id)).all())
+        upsert_stock(conn, seed_stock(
+            [vehicle_ids[k] for k in keys], [dealer_ids[d["name"]] for d in TOYOTA_DEALERS]
+        ))
+        set_meta(conn, SEED_HASH_KEY, digest)
+        record_change(conn, "seed")
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    return True
@@ -1,6 +1,6 @@
 """SQLAlchemy database models."""
 
-from sqlalchemy import Column, Integer, String, Float, Boolean, DateTime, ForeignKey, Text
+from sqlalchemy import Column, Integer, String, Float, Boolean, DateTime, ForeignKey, Index, Text
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from .database import Base
@@ -8,6 +8,10 @@ from .database import Base
 class Vehicle(Base):
     """Toyota vehicle model."""
     __tablename__ = "vehicles"
+    __table_args__ = (
+        # One row per model/year/trim; the seed upsert conflicts on it.
+        Index("uq_vehicles_model_year_trim", "model", "year", "trim", unique=True),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     model = Column(String, index=True)
@@ -31,6 +35,7 @@ class Vehicle(Base):
     # Relationships
     favorites = relationship("Favorite", back_populates="vehicle", cascade="all, delete-orphan")
     comparisons = relationship("Comparison", back_populates="vehicle", cascade="all, delete-orphan")
+    stock = relationship("Stock", back_populates="vehicle", cascade="all, delete-orphan")
 
 class Favorite(Base):
     """User favorites model."""
@@ -39,7 +44,7 @@ class Favorite(Base):
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(String, index=True)  # Session ID or user identifier
     vehicle_id = Column(Integer, ForeignKey("vehicles.id"))
-    created_at = Column(DateTime, default=datetime.utcnow)
+    created_at = Column(DateTime, default=datetime.utcnow, index=True)
     
     # Relationships
     vehicle = relationship("Vehicle", back_populates="favorites")
@@ -52,7 +57,7 @@ class Comparison(Base):
     session_id = Column(String, index=True)
     vehicle_id = Column(Integer, ForeignKey("vehicles.id"))
     position = Column(Integer)  # Position in comparison (1, 2, or 3)
-    created_at = Column(DateTime, default=datetime.utcnow)
+    created_at = Column(DateTime, default=datetime.utcnow, index=True)
     
     # Relationships
     vehicle = relationship("Vehicle", back_populates="comparisons")
@@ -64,4 +69,91 @@ class ViewHistory(Base):
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(String, index=True)
     vehicle_id = Column(Integer, ForeignKey("vehicles.id"))
-    viewed_at = Column(DateTime, default=datetime.utcnow)
+    viewed_at = Column(DateTime, default=datetime.utcnow, index=True)
+
+class PriceHistory(Base):
+    """Append-only price time series, one row per change, written by triggers on vehicles (see pricing.py).
+
+    WITHOUT ROWID, so rows are stored clustered by (vehicle_id, changed_at) and one
+    vehicle's history is a single range read.
+    """
+    __tablename__ = "price_history"
+    __table_args__ = (
+        # Recent changes across all vehicles (price drops) without scanning the history
+        Index("ix_price_history_changed_at_vehicle", "changed_at", "vehicle_id"),
+        {"sqlite_with_rowid": False},
+    )
+    
+    vehicle_id = Column(Integer, ForeignKey("vehicles.id"), primary_key=True)
+    changed_at = Column(Integer, primary_key=True)  # Unix epoch milliseconds
+    price = Column(Float)
+    previous_price = Column(Float, nullable=True)  # None for a vehicle's first price
+
+class Dealer(Base):
+    """Toyota dealership; its location is mirrored into the dealers_rtree spatial index (see geo.py)."""
+    __tablename__ = "dealers"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    name = Column(String, unique=True)
+    address = Column(String)
+    city = Column(String)
+    state = Column(String)
+    latitude = Column(Float)
+    longitude = Column(Float)
+    
+    # Relationships
+    stock = relationship("Stock", back_populates="dealer", cascade="all, delete-orphan")
+
+class Stock(Base):
+    """One unit (VIN) of a vehicle on a dealer's lot."""
+    __tablename__ = "stock"
+    __table_args__ = (
+        # Radius search: dealer ids from the spatial index -> vehicle ids, index-only
+        Index("ix_stock_dealer_vehicle", "dealer_id", "vehicle_id"),
+    )
+    
+    id = Column(Integer, primary_key=True, index=True)
+    vin = Column(String, unique=True)
+    dealer_id = Column(Integer, ForeignKey("dealers.id"))
+    vehicle_id = Column(Integer, ForeignKey("vehicles.id"), index=True)
+    price = Column(Float)  # dealer asking price for this unit
+    
+    # Relationships
+    dealer = relationship("Dealer", back_populates="stock")
+    vehicle = relationship("Vehicle", back_populates="stock")
+
+class CatalogMeta(Base):
+    """Key/value bookkeeping for the catalog (e.g. hash of the last applied seed)."""
+    __tablename__ = "catalog_meta"
+    
+    key = Column(String, primary_key=True)
+    value = Column(String)
+
+class CatalogChange(Base):
+    """Catalog change feed: one row per write, polled by every worker to invalidate its caches."""
+    __tablename__ = "catalog_changes"
+    
+    id = Column(Integer, primary_key=True)
+    version = Column(Integer, index=True)  # catalog_version after the write
+    vehicle_id = Column(Integer, nullable=True)  # None = bulk change (seed, import)
+    source = Column(String)  # seed, import, admin
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+class VehicleTrending(Base):
+    """Recent view counts per vehicle, rebuilt periodically by the trending job (see activity.py)."""
+    __tablename__ = "vehicle_trending"
+    
+    vehicle_id = Column(Integer, ForeignKey("vehicles.id"), primary_key=True)
+    views_24h = Column(Integer)
+    views_7d = Column(Integer)
+    score = Column(Float, index=True)
+    computed_at = Column(DateTime)
+
+class JobLock(Base):
+    """Lease on a background job, so only one worker runs it at a time (see scheduler.py)."""
+    __tablename__ = "job_locks"
+    
+    name = Column(String, primary_key=True)
+    owner = Column(String)  # host:pid of the worker holding (or last holding) the lease
+    locked_until = Column(Integer)  # epoch ms; 0 once released
+    last_run_at = Column(Integer)  # epoch ms of the last start by any worker
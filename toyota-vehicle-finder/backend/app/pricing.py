@@ -0,0 +1,152 @@
+"""Vehicle price history: trigger-maintained time series with range and delta queries.
+
+Triggers on `vehicles` append a row to `price_history` whenever a vehicle is inserted
+or its price changes, so the seed upsert, the importer, admin edits and ad-hoc SQL
+are all recorded without any of them knowing about it. Times are Unix epoch
+milliseconds; two changes to one vehicle within the same millisecond collapse into
+one row that keeps the earlier previous_price.
+
+Both queries are index range reads: one vehicle's history is a slice of the
+(vehicle_id, changed_at) primary key, recent drops a slice of the
+(changed_at, vehicle_id) index. Long histories are downsampled in SQL to at most
+`points` buckets (last price plus low/high per bucket).
+"""
+
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+from sqlalchemy import Float, Integer, func, select, text
+from sqlalchemy.engine import Connection
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .models import PriceHistory, Vehicle
+
+MAX_POINTS = 1000
+
+_NOW_MS = "CAST((julianday('now') - 2440587.5) * 86400000 AS INTEGER)"
+
+_TRIGGERS = {
+    "price_history_ai": (
+        "CREATE TRIGGER price_history_ai AFTER INSERT ON vehicles BEGIN"
+        f" INSERT INTO price_history (vehicle_id, changed_at, price, previous_price) VALUES (new.id, {_NOW_MS}, new.price, NULL)"
+        " ON CONFLICT (vehicle_id, changed_at) DO UPDATE SET price = excluded.price; END"
+    ),
+    "price_history_au": (
+        "CREATE TRIGGER price_history_au AFTER UPDATE OF price ON vehicles WHEN old.price IS NOT new.price BEGIN"
+        f" INSERT INTO price_history (vehicle_id, changed_at, price, previous_price) VALUES (new.id, {_NOW_MS}, new.price, old.price)"
+        " ON CONFLICT (vehicle_id, changed_at) DO UPDATE SET price = excluded.price; END"
+    ),
+}
+
+# Per bucket: low/high in one grouped pass over the key range, then the last price
+# through a primary-key lookup of the bucket's latest change.
+_DOWNSAMPLED = text(
+    "SELECT b.last_at, p.price, b.low, b.high FROM ("
+    " SELECT MAX(changed_at) AS last_at, MIN(price) AS low, MAX(price) AS high FROM price_history"
+    " WHERE vehicle_id = :vehicle_id AND changed_at BETWEEN :since AND :until"
+    " GROUP BY (changed_at - :since) / :width"
+    ") b JOIN price_history p ON p.vehicle_id = :vehicle_id AND p.changed_at = b.last_at"
+    " ORDER BY b.last_at"
+)
+
+# For each vehicle changed since :since, the price it had when the range started: the
+# previous_price of its first change in range, or that change's own price for a
+# vehicle listed since (SQLite takes bare columns from the row holding MIN()).
+# INDEXED BY: left alone, the planner walks the whole primary key to avoid a sort.
+_FIRST_IN_RANGE = text(
+    "SELECT vehicle_id, COALESCE(previous_price, price) AS was, MIN(changed_at) AS first_change"
+    " FROM price_history INDEXED BY ix_price_history_changed_at_vehicle"
+    " WHERE changed_at >= :since GROUP BY vehicle_id"
+).columns(vehicle_id=Integer, was=Float, first_change=Integer)
+
+
+def to_ms(dt: datetime) -> int:
+    """Epoch milliseconds; naive datetimes are taken as UTC (like the rest of the API)."""
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return int(dt.timestamp() * 1000)
+
+
+def from_ms(ms: int) -> datetime:
+    return datetime.fromtimestamp(ms / 1000, tz=timezone.utc).replace(tzinfo=None)
+
+
+def ensure_price_history(conn: Connection) -> None:
+    """Create the price triggers if missing; the first time, record every vehicle's current price."""
+    existing = {row[0] for row in conn.exec_driver_sql("SELECT name FROM sqlite_master WHERE type = 'trigger'")}
+    if all(name in existing for name in _TRIGGERS):
+        return
+    conn.exec_driver_sql(
+        "INSERT INTO price_history (vehicle_id, changed_at, price, previous_price)"
+        f" SELECT id, {_NOW_MS}, price, NULL FROM vehicles"
+        " WHERE id NOT IN (SELECT vehicle_id FROM price_history)"
+    )
+    for name, ddl in _TRIGGERS.items():
+        if name not in existing:
+            conn.exec_driver_sql(ddl)
+
+
+async def price_history(
+    db: AsyncSession, vehicle_id: int, since: datetime, until: datetime, points: int
+) -> Dict[str, object]:
+    """Price changes of one vehicle in [since, until], at most `points` of them."""
+    since_ms, until_ms = to_ms(since), to_ms(until)
+    in_range = (
+        PriceHistory.vehicle_id == vehicle_id,
+        PriceHistory.changed_at >= since_ms,
+        PriceHistory.changed_at <= until_ms,
+    )
+    # Price in effect when the range starts: the last change before it
+    start_price = (await db.execute(
+        select(PriceHistory.price)
+        .where(PriceHistory.vehicle_id == vehicle_id, PriceHistory.changed_at < since_ms)
+        .order_by(PriceHistory.changed_at.desc())
+        .limit(1)
+    )).scalar()
+    count = (await db.execute(select(func.count()).where(*in_range))).scalar()
+
+    if count <= points:
+        rows = (await db.execute(
+            select(PriceHistory.changed_at, PriceHistory.price, PriceHistory.price, PriceHistory.price)
+            .where(*in_range)
+            .order_by(PriceHistory.changed_at)
+        )).all()
+    else:
+        width = -(-(until_ms - since_ms + 1) // points)  # ceil
+        rows = (await db.execute(_DOWNSAMPLED, {
+            "vehicle_id": vehicle_id, "since": since_ms, "until": until_ms, "width": width,
+        })).all()
+    return {
+        "vehicle_id": vehicle_id,
+        "since": from_ms(since_ms),
+        "until": from_ms(until_ms),
+        "start_price": start_price,
+        "downsampled": count > points,
+        "points": [
+            {"changed_at": from_ms(at), "price": price, "low": low, "high": high}
+            for at, price, low, high in rows
+        ],
+    }
+
+
+async def price_drops(db: AsyncSession, since: datetime, limit: int, min_drop: float = 0) -> List[Dict[str, object]]:
+    """Vehicles now cheaper than before their first price change since `since`, biggest drop first."""
+    first = _FIRST_IN_RANGE.bindparams(since=to_ms(since)).subquery("first_in_range")
+    drop = (first.c.was - Vehicle.price).label("drop")
+    rows = (await db.execute(
+        select(Vehicle, first.c.was, drop)
+        .join(first, first.c.vehicle_id == Vehicle.id)
+        .where(first.c.was - Vehicle.price > min_drop)
+        .order_by(drop.desc())
+        .limit(limit)
+    )).all()
+    return [
+        {
+            "vehicle": vehicle,
+            "previous_price": was,
+            "price": vehicle.price,
+            "drop": round(amount, 2),
+            "drop_pct": round(100 * amount / was, 1) if was else None,
+        }
+        for vehicle, was, amount in rows
+    ]
@@ -0,0 +1,261 @@
+"""Per-client rate limiting (token buckets) and load shedding by latency SLO.
+
+Every limited route has a budget: requests per minute plus a burst allowance, counted
+per session (the client's X-Session-Id header, or the `user_id` in the path) and per
+IP. The IP budget is looser, since several shoppers can share an address, and it also
+catches clients that invent a new session id per request. /chat costs LLM calls, so it
+gets the tightest budget; /chat and /chat/stream share one. A request over budget is
+answered 429 with Retry-After before it reaches the endpoint.
+
+A bucket is three floats (tokens, last refill, when it is full again) and a check is
+O(1): refill by elapsed time, take one token. Buckets live in LRU order; one idle long
+enough to have refilled completely is indistinguishable from a new one and is dropped,
+and at most RATE_LIMIT_MAX_BUCKETS are kept, so memory stays bounded however many
+clients appear.
+
+Load shedding: latency of the SLO-tracked routes (catalog reads and writes, not the
+LLM-bound or streaming ones) is averaged; while the average exceeds
+LOAD_SHED_LATENCY_MS, low-priority requests (view-history writes and reads - the
+analytics traffic) are answered 503 so the requests shoppers wait on keep their
+latency. Shedding stops once the average falls below 80% of the target.
+
+State is per worker: with N workers a client spread across them gets up to N times
+its budget.
+"""
+
+import math
+import os
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from starlette.responses import JSONResponse
+
+from . import metrics
+
+RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "1") == "1"
+RATE_LIMIT_MAX_BUCKETS = int(os.getenv("RATE_LIMIT_MAX_BUCKETS", "100000"))
+# Take the client IP from X-Forwarded-For (last hop) - only behind a proxy that sets it
+RATE_LIMIT_TRUST_FORWARDED = os.getenv("RATE_LIMIT_TRUST_FORWARDED", "0") == "1"
+LOAD_SHED_LATENCY_MS = float(os.getenv("LOAD_SHED_LATENCY_MS", "250"))  # 0 disables shedding
+LOAD_SHED_ALPHA = 0.05  # weight of each request in the latency average
+LOAD_SHED_STALE_S = 10.0  # an average with no newer samples than this is ignored
+MAX_SESSION_ID_LEN = 64
+
+RATE_LIMITED = metrics.Counter("rate_limited_total", "Requests answered 429 by route and exhausted budget.",
+                               ["route", "scope"])
+LOAD_SHED = metrics.Counter("load_shed_total", "Low-priority requests answered 503 while over the latency SLO.",
+                            ["route"])
+
+
+class Budget:
+    """Rate limits for a group of routes (requests per minute, burst size)."""
+
+    def __init__(
+        self,
+        name: str,
+        per_minute: float,
+        burst: int,
+        ip_per_minute: float,
+        ip_burst: int,
+        priority: str = "normal",
+        slo: bool = True,
+    ):
+        self.name = name
+        self.rate = per_minute / 60.0
+        self.burst = burst
+        self.ip_rate = ip_per_minute / 60.0
+        self.ip_burst = ip_burst
+        self.priority = priority  # "low": shed first when over the latency SLO
+        self.slo = slo  # its latency counts toward the SLO
+
+
+CATALOG = Budget("catalog", per_minute=300, burst=60, ip_per_minute=1200, ip_burst=200)
+WRITES = Budget("writes", per_minute=60, burst=20, ip_per_minute=600, ip_burst=100)
+CHAT = Budget("chat", per_minute=10, burst=5, ip_per_minute=30, ip_burst=10, slo=False)
+HISTORY = Budget("history", per_minute=60, burst=20, ip_per_minute=600, ip_burst=100, priority="low")
+
+# (method, route template) -> budget; unlisted GETs use CATALOG, other unlisted routes
+# (/, /metrics, /admin/*) are not limited
+BUDGETS: Dict[Tuple[str, str], Budget] = {
+    ("POST", "/chat"): CHAT,
+    ("POST", "/chat/stream"): CHAT,
+    ("GET", "/chat/stats"): CATALOG,
+    ("POST", "/history"): HISTORY,
+    ("GET", "/history/{user_id}"): HISTORY,
+    ("POST", "/favorites"): WRITES,
+    ("DELETE", "/favorites/{user_id}/{vehicle_id}"): WRITES,
+    ("POST", "/compare"): WRITES,
+    ("POST", "/finance"): CATALOG,
+    ("POST", "/lease"): CATALOG,
+    ("POST", "/cars/match"): CATALOG,
+}
+UNLIMITED = {"/", "/metrics", "unmatched"}
+
+
+def budget_for(method: str, route: str) -> Optional[Budget]:
+    budget = BUDGETS.get((method, route))
+    if budget is None and method in ("GET", "HEAD") and route not in UNLIMITED and not route.startswith("/admin/"):
+        return CATALOG
+    return budget
+
+
+class TokenBuckets:
+    """Token buckets keyed by (budget, scope, client id), least recently used first."""
+
+    def __init__(self, max_buckets: int = RATE_LIMIT_MAX_BUCKETS):
+        self.max_buckets = max_buckets
+        # key -> [tokens, updated_at, full_at]
+        self._buckets: "OrderedDict[Tuple[str, str, str], List[float]]" = OrderedDict()
+        self.evicted = 0  # dropped before refilling, to stay under max_buckets
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+    def take(self, limits: Sequence[Tuple[Tuple[str, str, str], float, int]], now: float) -> Tuple[float, int]:
+        """Take one token from each (key, rate, burst) bucket, or from none.
+
+        Returns (0, -1) when granted, else the seconds until every bucket has a token
+        and the index of the first empty one.
+        """
+        buckets = []
+        wait, empty = 0.0, -1
+        for i, (key, rate, burst) in enumerate(limits):
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = self._buckets[key] = [float(burst), now, now]
+            else:
+                self._buckets.move_to_end(key)
+                bucket[0] = min(float(burst), bucket[0] + (now - bucket[1]) * rate)
+                bucket[1] = now
+            if bucket[0] < 1.0:
+                wait = max(wait, (1.0 - bucket[0]) / rate)
+                if empty < 0:
+                    empty = i
+            buckets.append((bucket, rate, burst))
+        if empty < 0:
+            for bucket, rate, burst in buckets:
+                bucket[0] -= 1.0
+                bucket[2] = now + (burst - bucket[0]) / rate
+        self._evict(now)
+        return wait, empty
+
+    def _evict(self, now: float) -> None:
+        # Each bucket is popped at most once per insertion, so this is amortized O(1)
+        buckets = self._buckets
+        while buckets:
+            key, bucket = next(iter(buckets.items()))
+            if bucket[2] > now and len(buckets) <= self.max_buckets:
+                break
+            if bucket[2] > now:
+                self.evicted += 1
+            buckets.popitem(last=False)
+
+
+class LatencySLO:
+    """Moving average of SLO-tracked request latency, with hysteresis for shedding."""
+
+    def __init__(self, target_ms: float = LOAD_SHED_LATENCY_MS):
+        self.target_ms = target_ms
+        self.average_ms = 0.0
+        self.updated_at: Optional[float] = None
+        self.shedding = False
+
+    def observe(self, seconds: float, now: float) -> None:
+        ms = seconds * 1000
+        if self.updated_at is None or now - self.updated_at > LOAD_SHED_STALE_S:
+            self.average_ms = ms
+        else:
+            self.average_ms += LOAD_SHED_ALPHA * (ms - self.average_ms)
+        self.updated_at = now
+        if self.average_ms > self.target_ms:
+            self.shedding = True
+        elif self.average_ms < 0.8 * self.target_ms:
+            self.shedding = False
+
+    def should_shed(self, now: float) -> bool:
+        if self.target_ms <= 0 or self.updated_at is None or now - self.updated_at > LOAD_SHED_STALE_S:
+            return False
+        return self.shedding
+
+
+buckets = TokenBuckets()
+slo = LatencySLO()
+
+
+def _client(scope, path_params: Dict[str, object]) -> Tuple[Optional[str], str]:
+    """(session id or None, client IP) for a request."""
+    session = forwarded = None
+    for name, value in scope["headers"]:
+        if name == b"x-session-id":
+            session = value.decode("latin-1").strip()
+        elif name == b"x-forwarded-for":
+            forwarded = value.decode("latin-1")
+    if not session:
+        session = path_params.get("user_id")
+    if session is not None and (not session or len(session) > MAX_SESSION_ID_LEN):
+        session = None
+    if RATE_LIMIT_TRUST_FORWARDED and forwarded:
+        ip = forwarded.rsplit(",", 1)[-1].strip()
+    else:
+        ip = scope["client"][0] if scope.get("client") else "unknown"
+    return session, ip
+
+
+class RateLimitMiddleware:
+    """ASGI middleware applying the route budgets and shedding low-priority requests.
+
+    Added inside CORSMiddleware so 429/503 answers carry CORS headers and preflights
+    are not counted.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not RATE_LIMIT_ENABLED:
+            await self.app(scope, receive, send)
+            return
+        route, path_params = metrics.match_route(scope)
+        budget = budget_for(scope["method"], route)
+        if budget is None:
+            await self.app(scope, receive, send)
+            return
+
+        now = time.monotonic()
+        if budget.priority == "low" and slo.should_shed(now):
+            LOAD_SHED.inc(route=route)
+            response = JSONResponse({"detail": "Server busy; try again shortly."}, status_code=503,
+                                    headers={"Retry-After": "5"})
+            await response(scope, receive, send)
+            return
+
+        session, ip = _client(scope, path_params)
+        limits = [(("ip", budget.name, ip), budget.ip_rate, budget.ip_burst)]
+        if session is not None:
+            limits.append((("session", budget.name, session), budget.rate, budget.burst))
+        wait, empty = buckets.take(limits, now)
+        if empty >= 0:
+            RATE_LIMITED.inc(route=route, scope=limits[empty][0][0])
+            response = JSONResponse({"detail": "Too many requests; slow down."}, status_code=429,
+                                    headers={"Retry-After": str(max(1, math.ceil(wait)))})
+            await response(scope, receive, send)
+            return
+
+        if not budget.slo:
+            await self.app(scope, receive, send)
+            return
+        t0 = time.perf_counter()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            slo.observe(time.perf_counter() - t0, time.monotonic())
+
+
+metrics.GaugeFunc("rate_limit_buckets", "Token buckets held in this worker.", [], lambda: {(): len(buckets)})
+metrics.CounterFunc("rate_limit_buckets_evicted_total", "Buckets dropped before refilling to stay under the cap.",
+                    [], lambda: {(): buckets.evicted})
+metrics.GaugeFunc("load_shed_latency_ms", "Moving average latency of SLO-tracked requests.", [],
+                  lambda: {(): round(slo.average_ms, 2)})
+metrics.GaugeFunc("load_shedding", "1 while low-priority requests are being shed.", [],
+                  lambda: {(): int(slo.should_shed(time.monotonic()))})
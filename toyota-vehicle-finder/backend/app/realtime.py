@@ -0,0 +1,252 @@
+"""Push catalog changes to browsers over the /ws/catalog WebSocket.
+
+Each worker runs one CatalogHub. It listens to cache invalidations - local writes and
+those the change feed reports from other workers (see cache.py) - and, while clients
+are connected, keeps a snapshot of every vehicle's fields. On a change it reads the
+changed vehicles and the catalog version in one query, diffs them against the
+snapshot and fans one compact message out to the clients subscribed to those
+vehicles; no client ever causes a query of its own. Bursts of changes are coalesced
+into one diff.
+
+Messages (server -> client):
+    {"type": "hello", "version": 41}
+    {"type": "diff", "version": 42, "updated": {"7": {"price": 25990.0}},
+     "added": {"913": {...all fields...}}, "removed": [12]}
+    {"type": "reset", "version": 43}   # too much changed, or this client fell behind: refetch
+
+Client -> server: {"subscribe": [1, 2]}, {"unsubscribe": [2]} or {"subscribe": "all"}.
+A client receives every change until it subscribes to specific vehicles.
+
+Every connection has a bounded send queue (WS_SEND_QUEUE messages). A client that
+cannot keep up has its backlog replaced by a single reset instead of growing memory.
+"""
+
+import asyncio
+import os
+from typing import Dict, List, Optional, Set, Tuple
+
+import orjson
+from sqlalchemy import select
+from starlette.websockets import WebSocket, WebSocketDisconnect
+
+from . import cache, metrics
+from .catalog import catalog_version
+from .database import AsyncReadSessionLocal
+from .models import Vehicle
+
+WS_SEND_QUEUE = int(os.getenv("WS_SEND_QUEUE", "32"))
+WS_MAX_CLIENTS = int(os.getenv("WS_MAX_CLIENTS", "1000"))
+WS_MAX_SUBSCRIPTIONS = 1000  # vehicle ids per client
+MAX_DIFF_VEHICLES = 500  # larger changes (imports) are sent as a reset
+
+_TABLE = Vehicle.__table__
+_FIELDS = [c.name for c in _TABLE.columns if c.name != "id"]
+
+WS_MESSAGES = metrics.Counter("ws_messages_total", "WebSocket messages queued to clients by type.", ["type"])
+WS_OVERFLOWS = metrics.Counter("ws_send_overflows_total", "Clients reset because their send queue was full.")
+
+
+class Client:
+    def __init__(self, websocket: WebSocket):
+        self.websocket = websocket
+        self.queue: "asyncio.Queue[str]" = asyncio.Queue(maxsize=WS_SEND_QUEUE)
+        self.vehicle_ids: Optional[Set[int]] = None  # None = every vehicle
+
+    def send(self, frame: str, kind: str, version: Optional[int]) -> None:
+        """Queue a frame without blocking; on overflow the backlog becomes one reset."""
+        try:
+            self.queue.put_nowait(frame)
+            WS_MESSAGES.inc(type=kind)
+        except asyncio.QueueFull:
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(_frame({"type": "reset", "version": version}))
+            WS_OVERFLOWS.inc()
+            WS_MESSAGES.inc(type="reset")
+
+    async def sender(self) -> None:
+        try:
+            while True:
+                await self.websocket.send_text(await self.queue.get())
+        except (WebSocketDisconnect, RuntimeError, OSError):
+            pass  # the receive loop sees the disconnect and cleans up
+
+
+def _frame(message: Dict) -> str:
+    # Text frames, so browsers get a string for JSON.parse rather than a Blob
+    return orjson.dumps(message, option=orjson.OPT_NON_STR_KEYS).decode()
+
+
+def _row(mapping) -> Tuple:
+    return tuple(mapping[f] for f in _FIELDS)
+
+
+class CatalogHub:
+    def __init__(self, session_factory=AsyncReadSessionLocal):
+        self.session_factory = session_factory
+        self.clients: Set[Client] = set()
+        self._snapshot: Optional[Dict[int, Tuple]] = None  # vehicle id -> field values
+        self._version: Optional[int] = None
+        self._pending: Set[int] = set()
+        self._pending_all = False
+        self._wake: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self.diffs = 0
+        cache.on_invalidate(self._changed)
+
+    def start(self) -> None:
+        self._loop = asyncio.get_running_loop()
+        self._wake = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+        self._task = self._loop = None
+        self._snapshot = None
+
+    def _changed(self, vehicle_ids: Optional[List[int]]) -> None:
+        if self._loop is None or not self.clients:
+            return
+        if vehicle_ids is None:
+            self._pending_all = True
+        else:
+            self._pending.update(vehicle_ids)
+        self._loop.call_soon_threadsafe(self._wake.set)
+
+    async def _run(self) -> None:
+        while True:
+            await self._wake.wait()
+            self._wake.clear()
+            ids, everything = self._pending, self._pending_all
+            self._pending, self._pending_all = set(), False
+            try:
+                await self._publish(None if everything else ids)
+            except Exception as e:  # the next change (or reconnect) resynchronizes
+                print("[ws] catalog diff failed:", type(e).__name__, str(e))
+                self._snapshot = None
+                self._broadcast({"type": "reset", "version": self._version})
+
+    async def _load(self, vehicle_ids: Optional[Set[int]]) -> Tuple[int, Dict[int, Tuple]]:
+        query = select(_TABLE)
+        if vehicle_ids is not None:
+            query = query.where(_TABLE.c.id.in_(vehicle_ids))
+        async with self.session_factory() as db:
+            version = await db.run_sync(lambda s: catalog_version(s.connection()))
+            rows = (await db.execute(query)).mappings().all()
+        return version, {row["id"]: _row(row) for row in rows}
+
+    async def _publish(self, vehicle_ids: Optional[Set[int]]) -> None:
+        """Diff the changed vehicles (None: all) against the snapshot and fan the result out."""
+        if self._snapshot is None:
+            self._version, self._snapshot = await self._load(None)
+            return
+        version, current = await self._load(vehicle_ids)
+        self._version = version
+        scope = set(current) | (set(self._snapshot) if vehicle_ids is None else vehicle_ids)
+        updated: Dict[int, Dict] = {}
+        added: Dict[int, Dict] = {}
+        removed: List[int] = []
+        for vid in scope:
+            old, new = self._snapshot.get(vid), current.get(vid)
+            if new is None:
+                if old is not None:
+                    removed.append(vid)
+                    del self._snapshot[vid]
+            elif old is None:
+                added[vid] = dict(zip(_FIELDS, new))
+                self._snapshot[vid] = new
+            elif old != new:
+                updated[vid] = {f: v for f, o, v in zip(_FIELDS, old, new) if o != v}
+                self._snapshot[vid] = new
+        changed = len(updated) + len(added) + len(removed)
+        if not changed:
+            return
+        self.diffs += 1
+        if changed > MAX_DIFF_VEHICLES:
+            self._broadcast({"type": "reset", "version": version})
+            return
+        diff = {"type": "diff", "version": version, "updated": updated, "added": added, "removed": sorted(removed)}
+        everyone = _frame(diff)  # encoded once for all unfiltered clients
+        for client in list(self.clients):
+            if client.vehicle_ids is None:
+                client.send(everyone, "diff", version)
+                continue
+            mine = {
+                "type": "diff",
+                "version": version,
+                "updated": {vid: f for vid, f in updated.items() if vid in client.vehicle_ids},
+                "added": {vid: f for vid, f in added.items() if vid in client.vehicle_ids},
+                "removed": [vid for vid in diff["removed"] if vid in client.vehicle_ids],
+            }
+            if mine["updated"] or mine["added"] or mine["removed"]:
+                client.send(_frame(mine), "diff", version)
+
+    def _broadcast(self, message: Dict) -> None:
+        frame = _frame(message)
+        for client in list(self.clients):
+            client.send(frame, message["type"], message.get("version"))
+
+    async def serve(self, websocket: WebSocket) -> None:
+        """Handle one connection until it closes."""
+        if self._loop is None or len(self.clients) >= WS_MAX_CLIENTS:
+            await websocket.close(code=1013)  # try again later
+            return
+        await websocket.accept()
+        client = Client(websocket)
+        self.clients.add(client)
+        sender = asyncio.create_task(client.sender())
+        try:
+            if self._snapshot is None:
+                self._version, self._snapshot = await self._load(None)
+            client.send(_frame({"type": "hello", "version": self._version}), "hello", self._version)
+            while True:
+                frame = await websocket.receive()
+                if frame["type"] == "websocket.disconnect":
+                    break
+                try:
+                    message = orjson.loads(frame.get("text") or frame.get("bytes") or b"")
+                except orjson.JSONDecodeError:
+                    client.send(_frame({"type": "error", "detail": "expected JSON"}), "error", self._version)
+                    continue
+                error = self._subscribe(client, message)
+                if error:
+                    client.send(_frame({"type": "error", "detail": error}), "error", self._version)
+        except (WebSocketDisconnect, RuntimeError):
+            pass
+        finally:
+            self.clients.discard(client)
+            sender.cancel()
+            if not self.clients:
+                self._snapshot = None  # nobody listening: stop tracking until the next client
+
+    @staticmethod
+    def _subscribe(client: Client, message) -> Optional[str]:
+        if not isinstance(message, dict):
+            return "expected an object"
+        if message.get("subscribe") == "all":
+            client.vehicle_ids = None
+            return None
+        for action in ("subscribe", "unsubscribe"):
+            ids = message.get(action)
+            if ids is None:
+                continue
+            if not isinstance(ids, list) or not all(isinstance(i, int) for i in ids):
+                return f"{action} takes a list of vehicle ids"
+            if action == "subscribe":
+                client.vehicle_ids = (client.vehicle_ids or set()) | set(ids)
+                if len(client.vehicle_ids) > WS_MAX_SUBSCRIPTIONS:
+                    client.vehicle_ids = None
+                    return f"more than {WS_MAX_SUBSCRIPTIONS} subscriptions; receiving all changes"
+            elif client.vehicle_ids is not None:
+                client.vehicle_ids -= set(ids)
+            return None
+        return "expected subscribe or unsubscribe"
+
+
+hub = CatalogHub()
+
+metrics.GaugeFunc("ws_connections", "Open /ws/catalog connections in this worker.", [],
+                  lambda: {(): len(hub.clients)})
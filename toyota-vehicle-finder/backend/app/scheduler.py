@@ -0,0 +1,263 @@
+"""In-process scheduler for background precomputation and maintenance jobs.
+
+Each worker runs the scheduler on its event loop (started from the app lifespan). A
+job runs periodically (every `interval_s`, give or take `jitter_s` so workers do not
+fire in lockstep), after catalog changes (`on_catalog_change`: once the burst of
+invalidations settles, see cache.on_invalidate), or both. Every job also runs once
+shortly after startup.
+
+Jobs that build per-worker state (cache warm-up) run in every worker. Jobs that write
+shared results (`single_instance`) take a lease in the `job_locks` table first: one
+upsert that succeeds only if no other worker holds the lease and, for periodic runs,
+nobody started the job within the last interval - so with N workers it still runs
+about once per interval. A lease expires after the job's timeout, so a killed worker
+does not block the job for good.
+
+Status (runs, failures, last duration and error, next run) is per worker; the lease
+rows show who ran the shared jobs last.
+"""
+
+import asyncio
+import os
+import random
+import socket
+import time
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from sqlalchemy import select, text
+
+from . import cache, metrics
+from .database import AsyncSessionLocal
+from .models import JobLock
+
+SCHEDULER_ENABLED = os.getenv("SCHEDULER_ENABLED", "1") == "1"
+# Wait after a catalog change before running change jobs, so one import or edit
+# (seen locally and again through the change feed) triggers one run
+CHANGE_DEBOUNCE_S = float(os.getenv("SCHEDULER_CHANGE_DEBOUNCE_S", "2"))
+
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}"
+
+JOB_DURATION = metrics.Histogram(
+    "job_duration_seconds", "Background job run time.", ["job"],
+    buckets=(0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0, 60.0, 300.0),
+)
+
+_ACQUIRE = text(
+    "INSERT INTO job_locks (name, owner, locked_until, last_run_at) VALUES (:name, :owner, :until, :now)"
+    " ON CONFLICT (name) DO UPDATE SET owner = excluded.owner, locked_until = excluded.locked_until,"
+    " last_run_at = excluded.last_run_at"
+    " WHERE job_locks.locked_until < :now AND COALESCE(job_locks.last_run_at, 0) <= :now - :min_gap"
+)
+_RELEASE = text("UPDATE job_locks SET locked_until = 0 WHERE name = :name AND owner = :owner")
+
+
+def _now_ms() -> int:
+    return int(time.time() * 1000)
+
+
+class Job:
+    """A registered job with its schedule and this worker's run status."""
+
+    def __init__(
+        self,
+        name: str,
+        func: Callable[[], Awaitable[Any]],
+        interval_s: Optional[float] = None,
+        on_catalog_change: bool = False,
+        jitter_s: float = 0.0,
+        single_instance: bool = False,
+        timeout_s: float = 300.0,
+    ):
+        if interval_s is not None and jitter_s >= interval_s:
+            raise ValueError(f"job {name}: jitter_s must be smaller than interval_s")
+        self.name = name
+        self.func = func
+        self.interval_s = interval_s
+        self.on_catalog_change = on_catalog_change
+        self.jitter_s = jitter_s
+        self.single_instance = single_instance
+        self.timeout_s = timeout_s
+        self.runs = 0
+        self.failures = 0
+        self.skipped = 0  # lease held by another worker, or it ran there recently
+        self.running = False
+        self.last_started: Optional[datetime] = None
+        self.last_duration_ms: Optional[float] = None
+        self.last_error: Optional[str] = None
+        self.last_result: Any = None
+        self.next_run: Optional[datetime] = None
+        self._wake: Optional[asyncio.Event] = None  # created on the serving loop by Scheduler.start()
+        self._forced = False
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "interval_s": self.interval_s,
+            "on_catalog_change": self.on_catalog_change,
+            "single_instance": self.single_instance,
+            "running": self.running,
+            "runs": self.runs,
+            "failures": self.failures,
+            "skipped": self.skipped,
+            "last_started": self.last_started,
+            "last_duration_ms": self.last_duration_ms,
+            "last_error": self.last_error,
+            "last_result": self.last_result,
+            "next_run": self.next_run,
+        }
+
+
+class Scheduler:
+    def __init__(self, session_factory=AsyncSessionLocal):
+        self.session_factory = session_factory
+        self.jobs: Dict[str, Job] = {}
+        self._tasks: List[asyncio.Task] = []
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def add(self, name: str, func: Callable[[], Awaitable[Any]], **schedule) -> Job:
+        """Register `func` (a coroutine function) under `name`; see Job for the schedule options."""
+        if name in self.jobs:
+            raise ValueError(f"job {name!r} is already registered")
+        job = self.jobs[name] = Job(name, func, **schedule)
+        return job
+
+    def start(self) -> None:
+        self._loop = asyncio.get_running_loop()
+        for job in self.jobs.values():
+            job._wake = asyncio.Event()
+        self._tasks = [asyncio.create_task(self._loop_job(job), name=f"job:{job.name}") for job in self.jobs.values()]
+        cache.on_invalidate(self._catalog_changed)
+
+    async def stop(self) -> None:
+        cache.off_invalidate(self._catalog_changed)
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self._loop = None
+
+    def trigger(self, name: str) -> None:
+        """Run a job now (ignoring the interval between runs of a shared job); KeyError if unknown."""
+        job = self.jobs[name]
+        if self._loop is not None:
+            job._forced = True
+            self._loop.call_soon_threadsafe(job._wake.set)
+
+    def _catalog_changed(self, vehicle_ids: Optional[List[int]]) -> None:
+        if self._loop is None:
+            return
+        for job in self.jobs.values():
+            if job.on_catalog_change:
+                self._loop.call_soon_threadsafe(job._wake.set)
+
+    async def _loop_job(self, job: Job) -> None:
+        delay: Optional[float] = random.uniform(0, job.jitter_s)  # first run soon after startup
+        while True:
+            job.next_run = datetime.utcfromtimestamp(time.time() + delay) if delay is not None else None
+            try:
+                await asyncio.wait_for(job._wake.wait(), delay)
+                woken = True
+                if not job._forced:
+                    await asyncio.sleep(CHANGE_DEBOUNCE_S + random.uniform(0, job.jitter_s))
+            except asyncio.TimeoutError:
+                woken = False
+            job._forced = False
+            job._wake.clear()
+            await self.run(job, periodic=not woken)
+            delay = None
+            if job.interval_s is not None:
+                delay = job.interval_s + random.uniform(-job.jitter_s, job.jitter_s)
+
+    async def run(self, job: Job, periodic: bool = False) -> bool:
+        """Run `job` once (after taking its lease if it is single-instance); False if skipped.
+
+        Errors - including failing to take or give back the lease, e.g. "database is
+        locked" - are recorded on the job and never propagate, so the job's loop keeps
+        its schedule.
+        """
+        if job.single_instance:
+            try:
+                acquired = await self._acquire(job, periodic)
+            except Exception as e:
+                job.runs += 1
+                self._failed(job, e)
+                return False
+            if not acquired:
+                job.skipped += 1
+                return False
+        job.running = True
+        job.last_started = datetime.utcnow()
+        started = time.perf_counter()
+        try:
+            job.last_result = await asyncio.wait_for(job.func(), job.timeout_s)
+            job.last_error = None
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self._failed(job, e)
+        finally:
+            elapsed = time.perf_counter() - started
+            job.running = False
+            job.runs += 1
+            job.last_duration_ms = round(elapsed * 1000, 1)
+            JOB_DURATION.observe(elapsed, job=job.name)
+            if job.single_instance:
+                try:
+                    await asyncio.shield(self._release(job))
+                except Exception as e:  # the lease expires after timeout_s anyway
+                    print(f"[jobs] {job.name}: releasing the lease failed:", type(e).__name__, str(e))
+        return True
+
+    @staticmethod
+    def _failed(job: Job, e: Exception) -> None:
+        job.failures += 1
+        job.last_error = f"{type(e).__name__}: {e}"
+        print(f"[jobs] {job.name} failed:", job.last_error)
+
+    async def _acquire(self, job: Job, periodic: bool) -> bool:
+        now = _now_ms()
+        min_gap = int((job.interval_s - job.jitter_s) * 1000) if periodic and job.interval_s else 0
+        async with self.session_factory() as db:
+            result = await db.execute(_ACQUIRE, {
+                "name": job.name, "owner": WORKER_ID, "now": now,
+                "until": now + int(job.timeout_s * 1000), "min_gap": min_gap,
+            })
+            await db.commit()
+        return result.rowcount == 1
+
+    async def _release(self, job: Job) -> None:
+        async with self.session_factory() as db:
+            await db.execute(_RELEASE, {"name": job.name, "owner": WORKER_ID})
+            await db.commit()
+
+    async def status(self, db) -> List[Dict[str, Any]]:
+        """Every job's status in this worker, plus the shared lease for single-instance jobs."""
+        leases = {lock.name: lock for lock in (await db.execute(select(JobLock))).scalars()}
+        now = _now_ms()
+        out = []
+        for job in self.jobs.values():
+            status = job.status()
+            lease = leases.get(job.name)
+            if job.single_instance and lease is not None:
+                status["lease"] = {
+                    "owner": lease.owner,
+                    "held": (lease.locked_until or 0) > now,
+                    "last_run_at": datetime.utcfromtimestamp(lease.last_run_at / 1000) if lease.last_run_at else None,
+                }
+            out.append(status)
+        return out
+
+
+scheduler = Scheduler()
+
+metrics.CounterFunc(
+    "job_runs_total",
+    "Background job runs in this worker by result (skipped: another worker had the lease or ran it recently).",
+    ["job", "result"],
+    lambda: {
+        k: v for job in scheduler.jobs.values()
+        for k, v in (((job.name, "ok"), job.runs - job.failures), ((job.name, "error"), job.failures),
+                     ((job.name, "skipped"), job.skipped))
+    },
+)
@@ -29,6 +29,26 @@ class VehicleCreate(VehicleBase):
     """Schema for creating a vehicle."""
     pass
 
+class VehicleUpdate(BaseModel):
+    """Schema for a partial vehicle edit (only the fields sent are changed)."""
+    model: Optional[str] = None
+    year: Optional[int] = None
+    trim: Optional[str] = None
+    price: Optional[float] = None
+    drivetrain: Optional[str] = None
+    mpg_city: Optional[int] = None
+    mpg_highway: Optional[int] = None
+    mpg_combined: Optional[int] = None
+    engine: Optional[str] = None
+    transmission: Optional[str] = None
+    seating: Optional[int] = None
+    cargo_volume: Optional[float] = None
+    towing_capacity: Optional[int] = None
+    safety_rating: Optional[float] = None
+    image_url: Optional[str] = None
+    category: Optional[str] = None
+    features: Optional[str] = None
+
 class Vehicle(VehicleBase):
     """Vehicle schema with ID."""
     id: int
@@ -46,6 +66,118 @@ class VehicleFilter(BaseModel):
     min_mpg: Optional[int] = None
     category: Optional[str] = None
     search_query: Optional[str] = None
+    near: Optional[str] = None  # "lat,lon"
+    radius: Optional[float] = None  # miles
+
+# Price history schemas
+class PricePoint(BaseModel):
+    """One price change, or the last price of a downsampled bucket with its low/high."""
+    changed_at: datetime
+    price: float
+    low: float
+    high: float
+
+class PriceHistoryResponse(BaseModel):
+    """Price changes of a vehicle within a time range."""
+    vehicle_id: int
+    since: datetime
+    until: datetime
+    start_price: Optional[float] = None  # price in effect at `since`
+    downsampled: bool
+    points: List[PricePoint]
+
+class PriceDrop(BaseModel):
+    """A vehicle that is cheaper now than before a time."""
+    vehicle: Vehicle
+    previous_price: float
+    price: float
+    drop: float
+    drop_pct: Optional[float] = None
+
+# Facet / trending schemas
+class FacetValue(BaseModel):
+    """One value of a filter and how many vehicles have it."""
+    value: str
+    count: int
+
+class ValueRange(BaseModel):
+    min: Optional[float] = None
+    max: Optional[float] = None
+
+class Facets(BaseModel):
+    """Filter values with vehicle counts, most common first, and value ranges."""
+    total: int
+    model: List[FacetValue]
+    category: List[FacetValue]
+    drivetrain: List[FacetValue]
+    year: List[FacetValue]
+    price: ValueRange
+    mpg_combined: ValueRange
+
+class TrendingVehicle(BaseModel):
+    """A vehicle with its recent view counts (as of the last trending refresh)."""
+    vehicle: Vehicle
+    views_24h: int
+    views_7d: int
+    score: float
+    computed_at: datetime
+
+# Best-match schemas
+class MatchWeights(BaseModel):
+    """How much each criterion matters (relative; all zero = equal weights)."""
+    price: float = Field(1, ge=0)  # cheaper is better
+    mpg_combined: float = Field(1, ge=0)
+    seating: float = Field(1, ge=0)
+    cargo_volume: float = Field(1, ge=0)
+    towing_capacity: float = Field(1, ge=0)
+    safety_rating: float = Field(1, ge=0)
+
+class MatchRequest(BaseModel):
+    """Quiz answers: hard constraints, criterion weights and how many matches to return."""
+    max_price: Optional[float] = Field(None, gt=0)
+    min_seating: Optional[int] = Field(None, ge=1)
+    min_towing: Optional[int] = Field(None, ge=0)
+    min_mpg: Optional[int] = Field(None, ge=0)
+    all_wheel_drive: bool = False  # AWD or 4WD
+    category: Optional[str] = None
+    weights: MatchWeights = MatchWeights()
+    limit: int = Field(10, ge=1, le=100)
+
+class MatchResult(BaseModel):
+    """A vehicle with its score in [0, 1] and each criterion's share of it."""
+    vehicle: Vehicle
+    score: float
+    breakdown: Dict[str, float]
+
+class MatchResponse(BaseModel):
+    """Best matches, plus how many vehicles met the constraints."""
+    candidates: int
+    results: List[MatchResult]
+
+# Dealer / stock schemas
+class Dealer(BaseModel):
+    """Dealership, with its distance when searched by location."""
+    id: int
+    name: str
+    address: str
+    city: str
+    state: str
+    latitude: float
+    longitude: float
+    distance_miles: Optional[float] = None
+    
+    class Config:
+        from_attributes = True
+
+class StockUnit(BaseModel):
+    """One unit of a vehicle on a dealer's lot."""
+    id: int
+    vin: str
+    price: float
+    dealer: Dealer
+    
+    class Config:
+        from_attributes = True
 
 # Favorite schemas
 class FavoriteBase(BaseModel):
@@ -149,3 +281,13 @@ class ViewHistory(ViewHistoryCreate):
     
     class Config:
         from_attributes = True
+
+# Chat schemas
+class ChatMessage(BaseModel):
+    """Chat request from the assistant widget."""
+    message: str
+    context: str = ""
+
+class ChatResponse(BaseModel):
+    """Chat reply (one short paragraph)."""
+    response: str
@@ -0,0 +1,70 @@
+"""Single-flight coalescing of identical in-flight async calls."""
+
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable, TypeVar
+
+T = TypeVar("T")
+
+
+def normalize_key(text: str) -> str:
+    """Case- and whitespace-insensitive form of a query or prompt."""
+    return " ".join(text.lower().split())
+
+
+class _Call:
+    __slots__ = ("task", "waiters")
+
+    def __init__(self, task: "asyncio.Future[Any]"):
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight:
+    """Share one in-flight call among concurrent callers asking for the same key.
+
+    The first caller starts the call as its own task; later callers with the same key
+    await that task instead of starting another. Results and exceptions reach every
+    waiter. Cancelling one waiter never cancels the call for the others: the shared
+    task is only cancelled when its last waiter goes away. Keys are forgotten as soon
+    as the call finishes, so nothing is cached beyond the in-flight window.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._calls: Dict[Hashable, _Call] = {}
+        self.calls = 0  # underlying calls actually started
+        self.deduplicated = 0  # requests served by another caller's call
+
+    def _forget(self, key: Hashable, call: _Call) -> None:
+        if self._calls.get(key) is call:
+            del self._calls[key]
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[T]]) -> T:
+        call = self._calls.get(key)
+        if call is None:
+            call = _Call(asyncio.ensure_future(fn()))
+            self._calls[key] = call
+            call.task.add_done_callback(lambda _t, k=key, c=call: self._forget(k, c))
+            self.calls += 1
+        else:
+            self.deduplicated += 1
+
+        call.waiters += 1
+        try:
+            return await asyncio.shield(call.task)
+        except asyncio.CancelledError:
+            if call.waiters == 1 and not call.task.done():
+                # Forget it now: a caller arriving before the task finishes unwinding must
+                # start a fresh call, not join one that is being cancelled
+                self._forget(key, call)
+                call.task.cancel()
+            raise
+        finally:
+            call.waiters -= 1
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "calls": self.calls,
+            "deduplicated": self.deduplicated,
+            "in_flight": len(self._calls),
+        }
@@ -0,0 +1,177 @@
+"""Opt-in per-request SQL profiler with N+1 detection.
+
+Enable with SQL_PROFILE=1. Every statement a request runs is recorded with its
+duration and normalized shape (literals and bound values replaced, IN lists collapsed).
+A shape repeated at least SQL_PROFILE_N_PLUS_ONE times within one request is flagged
+as a likely N+1 query. Each response carries a summary header:
+
+    X-SQL-Profile: statements=3; time_ms=1.42; n_plus_one=0
+
+and requests with N+1 shapes (or every request, with SQL_PROFILE_LOG=all) are logged
+with their statements. Streamed responses send headers before their queries finish,
+so for those only the log line is complete.
+
+For tests, capture() and assert_max_statements() record statements regardless of
+SQL_PROFILE: those run by HTTP requests (any thread, so TestClient calls count) and by
+code called directly inside the block, but not by background tasks such as the catalog
+watcher or the job scheduler, e.g.:
+
+    with assert_max_statements(2):
+        client.get("/favorites/u1")
+"""
+
+import os
+import re
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, List, Optional, Tuple
+
+from sqlalchemy import event
+
+from .metrics import request_db, route_template
+
+SQL_PROFILE = os.getenv("SQL_PROFILE", "0") == "1"
+SQL_PROFILE_LOG = os.getenv("SQL_PROFILE_LOG", "n_plus_one")  # "n_plus_one" or "all"
+N_PLUS_ONE_THRESHOLD = int(os.getenv("SQL_PROFILE_N_PLUS_ONE", "3"))
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r"\b\d+(?:\.\d+)?\b")
+_IN_LIST = re.compile(r"\bIN\s*\((?:\s*\?\s*,)*\s*\?\s*\)", re.IGNORECASE)
+_POSTCOMPILE = re.compile(r"\(\s*__\[POSTCOMPILE_\w+\]\s*\)")
+_SPACE = re.compile(r"\s+")
+
+
+def normalize_sql(statement: str) -> str:
+    """Statement shape: same query with different values -> same string."""
+    shape = _STRING.sub("?", statement)
+    shape = _NUMBER.sub("?", shape)
+    shape = _POSTCOMPILE.sub("(?)", shape)
+    shape = _IN_LIST.sub("IN (?)", shape)
+    return _SPACE.sub(" ", shape).strip()
+
+
+class SQLProfile:
+    """Statements recorded for one request (or one capture() block)."""
+
+    def __init__(self):
+        self.statements: List[Tuple[str, float]] = []  # (shape, ms)
+        self._lock = threading.Lock()
+
+    def record(self, statement: str, ms: float) -> None:
+        with self._lock:
+            self.statements.append((normalize_sql(statement), ms))
+
+    @property
+    def count(self) -> int:
+        return len(self.statements)
+
+    @property
+    def total_ms(self) -> float:
+        return sum(ms for _, ms in self.statements)
+
+    def n_plus_one(self, threshold: Optional[int] = None) -> List[Tuple[str, int]]:
+        """Shapes executed at least `threshold` times, most repeated first."""
+        limit = N_PLUS_ONE_THRESHOLD if threshold is None else threshold
+        counts = Counter(shape for shape, _ in self.statements)
+        return [(shape, n) for shape, n in counts.most_common() if n >= limit]
+
+    def header(self) -> str:
+        return f"statements={self.count}; time_ms={self.total_ms:.2f}; n_plus_one={len(self.n_plus_one())}"
+
+    def report(self) -> str:
+        lines = [f"{self.count} statements, {self.total_ms:.2f} ms"]
+        for shape, n in self.n_plus_one():
+            lines.append(f"  N+1 ({n}x): {shape}")
+        for shape, ms in self.statements:
+            lines.append(f"  {ms:8.2f} ms  {shape}")
+        return "\n".join(lines)
+
+
+_current: ContextVar[Optional[SQLProfile]] = ContextVar("sql_profile", default=None)
+_captures: List[SQLProfile] = []
+_capturing: ContextVar[bool] = ContextVar("sql_capturing", default=False)  # set inside capture() blocks
+
+
+def instrument_engine(engine) -> None:
+    """Feed statements on `engine` (sync or async) to the active request profile and captures."""
+    target = getattr(engine, "sync_engine", engine)
+
+    @event.listens_for(target, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        if _current.get() is not None or _captures:
+            conn.info.setdefault("sqlprofile_t0", []).append(time.perf_counter())
+
+    @event.listens_for(target, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        stack = conn.info.get("sqlprofile_t0")
+        if not stack:
+            return
+        ms = (time.perf_counter() - stack.pop()) * 1000
+        profile = _current.get()
+        if profile is not None:
+            profile.record(statement, ms)
+        if _captures and (_capturing.get() or request_db() is not None):
+            for captured in list(_captures):
+                captured.record(statement, ms)
+
+    @event.listens_for(target, "handle_error")
+    def _error(context):
+        stack = context.connection.info.get("sqlprofile_t0") if context.connection is not None else None
+        if stack:
+            stack.pop()
+
+
+@contextmanager
+def capture() -> Iterator[SQLProfile]:
+    """Record the statements HTTP requests and this context run while the block is active."""
+    profile = SQLProfile()
+    _captures.append(profile)
+    token = _capturing.set(True)
+    try:
+        yield profile
+    finally:
+        _capturing.reset(token)
+        _captures.remove(profile)
+
+
+@contextmanager
+def assert_max_statements(limit: int, allow_n_plus_one: bool = False) -> Iterator[SQLProfile]:
+    """Fail if the block runs more than `limit` statements (or, by default, any N+1 shape)."""
+    with capture() as profile:
+        yield profile
+    if profile.count > limit:
+        raise AssertionError(f"expected at most {limit} SQL statements, got {profile.report()}")
+    if not allow_n_plus_one and profile.n_plus_one():
+        raise AssertionError(f"N+1 query pattern: {profile.report()}")
+
+
+class SQLProfileMiddleware:
+    """ASGI middleware that profiles each HTTP request (installed when SQL_PROFILE=1)."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        profile = SQLProfile()
+        token = _current.set(profile)
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", []))
+                headers.append((b"x-sql-profile", profile.header().encode("latin-1")))
+                message = dict(message, headers=headers)
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _current.reset(token)
+            if SQL_PROFILE_LOG == "all" or profile.n_plus_one():
+                print(f"[sql] {scope['method']} {route_template(scope)}: {profile.report()}")
@@ -0,0 +1 @@
+# Local benchmarks for the Toyota Vehicle Finder backend (run from backend/: python -m benchmarks.<name>)
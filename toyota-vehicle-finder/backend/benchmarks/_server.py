@@ -0,0 +1,64 @@
+"""Run a backend checkout under uvicorn in a throwaway working directory."""
+
+import contextlib
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+@contextlib.contextmanager
+def serve(app_dir: str = BACKEND, env: dict = None, workers: int = 1, db_path: str = None):
+    """Yield the base URL of a uvicorn server for `app_dir` (a backend/ directory).
+
+    The server runs in a temp dir holding a copy of the seed database (or `db_path`),
+    so the tracked toyota_vehicles.db is never written.
+    """
+    port = _free_port()
+    with tempfile.TemporaryDirectory() as tmp:
+        shutil.copy(db_path or os.path.join(app_dir, "toyota_vehicles.db"), os.path.join(tmp, "toyota_vehicles.db"))
+        run_env = dict(os.environ)
+        run_env.update({
+            "PYTHONPATH": os.path.abspath(app_dir),
+            "LLM_PROVIDER": "stub",
+            "CHAT_WARMUP": "0",
+            "PYTHONWARNINGS": "ignore",
+        })
+        run_env.update(env or {})
+        proc = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port),
+             "--workers", str(workers), "--log-level", "warning", "--no-access-log"],
+            cwd=tmp, env=run_env, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True,
+        )
+        url = f"http://127.0.0.1:{port}"
+        try:
+            deadline = time.time() + 60
+            while True:
+                if proc.poll() is not None:
+                    raise RuntimeError(f"server exited early:\n{proc.stderr.read()}")
+                try:
+                    urllib.request.urlopen(url + "/", timeout=1).read()
+                    break
+                except OSError:
+                    if time.time() > deadline:
+                        raise RuntimeError("server did not become ready")
+                    time.sleep(0.1)
+            yield url
+        finally:
+            proc.terminate()
+            try:
+                proc.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                proc.kill()
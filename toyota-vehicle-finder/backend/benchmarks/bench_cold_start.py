@@ -0,0 +1,95 @@
+"""Worker cold-start cost: importing app.main, running startup, and the first /chat.
+
+Usage (from backend/):
+    python -m benchmarks.bench_cold_start [--runs 5] [--top 10]
+
+Every phase runs in a fresh interpreter (cwd is a temp dir holding a copy of the
+seed database, so the tracked toyota_vehicles.db is never written). Reports the
+median of each phase plus the slowest modules from `python -X importtime`.
+"""
+
+import argparse
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PROBE = r"""
+import json, time
+t0 = time.perf_counter()
+import app.main as m
+t_import = time.perf_counter()
+from fastapi.testclient import TestClient
+with TestClient(m.app) as c:
+    t_startup = time.perf_counter()
+    c.get("/cars")
+    t_cars = time.perf_counter()
+    c.post("/chat", json={"message": "most expensive?"})
+    t_chat = time.perf_counter()
+print(json.dumps({
+    "import_app_main_ms": (t_import - t0) * 1000,
+    "startup_ms": (t_startup - t_import) * 1000,
+    "first_cars_ms": (t_cars - t_startup) * 1000,
+    "first_chat_ms": (t_chat - t_cars) * 1000,
+}))
+"""
+
+
+def _env():
+    env = dict(os.environ)
+    env["PYTHONPATH"] = BACKEND + os.pathsep + env.get("PYTHONPATH", "")
+    env.setdefault("CHAT_WARMUP", "0")  # measure the lazy path itself
+    return env
+
+
+def run_probe(workdir: str) -> dict:
+    out = subprocess.run(
+        [sys.executable, "-W", "ignore", "-c", PROBE],
+        cwd=workdir, env=_env(), capture_output=True, text=True, check=True,
+    )
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def import_profile(workdir: str, top: int):
+    out = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import app.main"],
+        cwd=workdir, env=_env(), capture_output=True, text=True, check=True,
+    )
+    rows = []
+    for line in out.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line or "cumulative" in line:
+            continue
+        _, cumulative, name = (p.strip() for p in line[len("import time:"):].split("|"))
+        rows.append((int(cumulative), name))
+    return sorted(rows, reverse=True)[:top]
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--runs", type=int, default=5)
+    ap.add_argument("--top", type=int, default=10)
+    args = ap.parse_args()
+
+    samples = []
+    for _ in range(args.runs):
+        with tempfile.TemporaryDirectory() as tmp:
+            shutil.copy(os.path.join(BACKEND, "toyota_vehicles.db"), tmp)
+            samples.append(run_probe(tmp))
+        with tempfile.TemporaryDirectory() as tmp:
+            profile = import_profile(tmp, args.top)
+
+    print(f"cold start, median of {args.runs} fresh interpreters:")
+    for key in samples[0]:
+        print(f"  {key:<20} {statistics.median(s[key] for s in samples):8.1f}")
+    print("\nslowest imports (cumulative, us) for `import app.main`:")
+    for cumulative, name in profile:
+        print(f"  {cumulative:>9,}  {name}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,213 @@
+"""End-to-end mixed-traffic load test over every user-facing endpoint, with a JSON report.
+
+Usage (from backend/):
+    python -m benchmarks.bench_e2e [--vehicles 5000] [--users 1000] [--concurrency 32]
+                                   [--duration 20] [--out results.json] [--app-dir DIR]
+
+Builds a synthetic database (benchmarks/synthetic.py; or pass --db), serves it with
+uvicorn, and drives a weighted mix of catalog browsing, compare, finance, favorites,
+history and chat traffic. The LLM and web search are stubbed (LLM_PROVIDER=stub,
+WEB_SEARCH_PROVIDER=stub) so runs need no keys and are repeatable. Writes per-route
+throughput and p50/p95/p99 latency as JSON; run it on two revisions (--app-dir) and
+diff the files to compare.
+"""
+
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import platform
+import random
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from datetime import datetime, timezone
+
+import httpx
+
+from benchmarks._server import BACKEND, serve
+from benchmarks.bench_mixed_load import pct
+from benchmarks.synthetic import build, popular_id
+
+CARS_QUERIES = [
+    {"model": "camry"},
+    {"category": "SUV"},
+    {"category": "Truck", "min_price": 40000},
+    {"max_price": 30000, "min_mpg": 30},
+    {"drivetrain": "AWD", "max_price": 38000},
+    {"search_query": "hybrid"},
+    {"search_query": "limited"},
+    {"near": "32.78,-96.80", "radius": 25},
+    {"near": "40.71,-74.01", "radius": 50, "category": "SUV"},
+]
+CHAT_MESSAGES = [
+    "What's the price of the RAV4?",
+    "Compare Camry vs Corolla",
+    "Which Toyota is most expensive?",
+    "What trims does the Highlander have?",
+    "How reliable is the Prius?",
+    "Is a minivan or an SUV better for a road trip?",
+]
+
+# Relative weights of each kind of request (roughly a browsing session)
+MIX = {
+    "GET /cars": 24,
+    "GET /cars/{id}": 24,
+    "POST /history": 12,
+    "GET /history/{user}": 5,
+    "GET /favorites/{user}": 6,
+    "POST /favorites": 4,
+    "POST /compare": 7,
+    "POST /finance": 10,
+    "POST /chat": 8,
+}
+
+
+def make_request(route: str, client: httpx.AsyncClient, rng: random.Random, n_vehicles: int, users: int):
+    user = f"user-{rng.randrange(users)}"
+    vid = popular_id(rng, n_vehicles)
+    if route == "GET /cars":
+        return client.get("/cars", params=rng.choice(CARS_QUERIES))
+    if route == "GET /cars/{id}":
+        return client.get(f"/cars/{vid}")
+    if route == "POST /history":
+        return client.post("/history", json={"user_id": user, "vehicle_id": vid})
+    if route == "GET /history/{user}":
+        return client.get(f"/history/{user}")
+    if route == "GET /favorites/{user}":
+        return client.get(f"/favorites/{user}")
+    if route == "POST /favorites":
+        return client.post("/favorites", json={"user_id": user, "vehicle_id": vid})
+    if route == "POST /compare":
+        ids = [popular_id(rng, n_vehicles) for _ in range(rng.choice([2, 3]))]
+        return client.post("/compare", json={"session_id": f"bench-{rng.randrange(10**6)}", "vehicle_ids": ids})
+    if route == "POST /finance":
+        return client.post("/finance", json={
+            "vehicle_price": rng.randrange(20000, 60000, 500),
+            "down_payment": rng.choice([0, 2000, 5000]),
+            "interest_rate": rng.choice([3.9, 5.9, 7.5]),
+            "loan_term_months": rng.choice([36, 48, 60, 72]),
+        })
+    if route == "POST /chat":
+        return client.post("/chat", json={"message": rng.choice(CHAT_MESSAGES)})
+    raise ValueError(route)
+
+
+async def drive(url: str, concurrency: int, duration: float, n_vehicles: int, users: int, seed: int):
+    latencies = defaultdict(list)
+    errors = defaultdict(int)
+    routes, weights = list(MIX), list(MIX.values())
+    stop_at = time.perf_counter() + duration
+
+    async def worker(client: httpx.AsyncClient, rng: random.Random):
+        while time.perf_counter() < stop_at:
+            route = rng.choices(routes, weights)[0]
+            req = make_request(route, client, rng, n_vehicles, users)
+            t0 = time.perf_counter()
+            try:
+                resp = await req
+                # 4xx from random ids (e.g. a favorite that already exists) is expected traffic
+                ok = resp.status_code < 500
+            except httpx.HTTPError:
+                ok = False
+            latencies[route].append((time.perf_counter() - t0) * 1000)
+            if not ok:
+                errors[route] += 1
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=url, limits=limits, timeout=60) as client:
+        await asyncio.gather(*(worker(client, random.Random(seed * 1000 + i)) for i in range(concurrency)))
+    return latencies, errors
+
+
+def summarize(latencies, errors, duration: float):
+    def stats(samples, errs):
+        return {
+            "requests": len(samples),
+            "rps": round(len(samples) / duration, 1),
+            "p50_ms": round(pct(samples, 50), 2),
+            "p95_ms": round(pct(samples, 95), 2),
+            "p99_ms": round(pct(samples, 99), 2),
+            "errors": errs,
+        }
+
+    routes = {route: stats(latencies[route], errors[route]) for route in sorted(latencies)}
+    everything = [ms for samples in latencies.values() for ms in samples]
+    return routes, stats(everything, sum(errors.values()))
+
+
+def _git_rev(app_dir: str):
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=app_dir, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--app-dir", default=BACKEND)
+    ap.add_argument("--db", help="serve this database instead of generating one")
+    ap.add_argument("--vehicles", type=int, default=5000)
+    ap.add_argument("--users", type=int, default=1000)
+    ap.add_argument("--concurrency", type=int, default=32)
+    ap.add_argument("--duration", type=float, default=20)
+    ap.add_argument("--workers", type=int, default=1)
+    ap.add_argument("--llm-latency-ms", default="200")
+    ap.add_argument("--web-latency-ms", default="150")
+    ap.add_argument("--seed", type=int, default=7)
+    ap.add_argument("--out", help="write the JSON report here (default: stdout)")
+    args = ap.parse_args()
+
+    env = {
+        "LLM_STUB_LATENCY_MS": args.llm_latency_ms,
+        "WEB_SEARCH_PROVIDER": "stub",
+        "WEB_STUB_LATENCY_MS": args.web_latency_ms,
+    }
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = args.db
+        if not db_path:
+            db_path = os.path.join(tmp, "synthetic.db")
+            counts = build(db_path, vehicles=args.vehicles, users=args.users, seed=args.seed)
+            print(f"synthetic data: {counts}", file=sys.stderr)
+        with contextlib.closing(sqlite3.connect(db_path)) as conn:
+            n_vehicles = conn.execute("SELECT MAX(id) FROM vehicles").fetchone()[0] or 1
+        with serve(args.app_dir, env=env, workers=args.workers, db_path=db_path) as url:
+            asyncio.run(drive(url, 4, 2.0, n_vehicles, args.users, args.seed + 1))  # warm-up
+            latencies, errors = asyncio.run(
+                drive(url, args.concurrency, args.duration, n_vehicles, args.users, args.seed)
+            )
+
+    routes, total = summarize(latencies, errors, args.duration)
+    report = {
+        "meta": {
+            "app_dir": os.path.abspath(args.app_dir),
+            "git_rev": _git_rev(args.app_dir),
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "cpus": os.cpu_count(),
+            "params": {k: v for k, v in vars(args).items() if k not in ("out",)},
+            "mix": MIX,
+        },
+        "routes": routes,
+        "total": total,
+    }
+    text = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(text + "\n")
+        print(f"{'route':<22} {'reqs':>7} {'rps':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'errors':>7}", file=sys.stderr)
+        for route, s in list(routes.items()) + [("total", total)]:
+            print(f"{route:<22} {s['requests']:>7} {s['rps']:>8} {s['p50_ms']:>8} {s['p95_ms']:>8} "
+                  f"{s['p99_ms']:>8} {s['errors']:>7}", file=sys.stderr)
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""Prompt size and build latency of the chatbot inventory context vs. catalog size.
+
+Usage (from backend/):
+    python -m benchmarks.bench_inventory_context [--sizes 30,1000,10000,100000]
+
+Compares the old one-line-per-vehicle dump with build_inventory_context on throwaway
+SQLite catalogs built by repeating the seed vehicles across years and trim variants.
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+
+from sqlalchemy import create_engine, insert, select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from app.database import Base
+from app.models import Vehicle
+from app.mock_data import TOYOTA_VEHICLES
+from app.inventory_context import build_inventory_context, detect_intents
+from app.chatbot import _extract_models_from_text
+
+QUESTIONS = [
+    "What would you recommend for a small family?",
+    "Camry or RAV4 for commuting?",
+    "Which truck tows the most?",
+]
+
+
+async def legacy_context(db) -> str:
+    cars = (await db.execute(select(Vehicle))).scalars().all()
+    lines = [f"- {c.year} {c.model} {c.trim}: ${c.price:,} (MPG: {c.mpg_combined})" for c in cars]
+    return "Currently available vehicles:\n" + ("\n".join(lines) if lines else "(none)")
+
+
+def make_catalog(path: str, n: int):
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(bind=engine)
+    rows = []
+    seeds = len(TOYOTA_VEHICLES)
+    for i in range(n):
+        row = dict(TOYOTA_VEHICLES[i % seeds])
+        variant = i // seeds
+        row["year"] = 2020 + variant % 6
+        if variant >= 6:
+            row["trim"] = f"{row['trim']} Pkg {variant // 6}"
+        row["price"] = row["price"] + 150 * (variant % 40)
+        rows.append(row)
+    with engine.begin() as conn:
+        for start in range(0, n, 5000):
+            conn.execute(insert(Vehicle), rows[start:start + 5000])
+    engine.dispose()
+
+
+async def timed(fn, repeat: int):
+    samples, out = [], None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        out = await fn()
+        samples.append((time.perf_counter() - t0) * 1000)
+    return out, statistics.median(samples)
+
+
+async def run(sizes, repeat: int):
+    print(f"{'vehicles':>9} {'legacy chars':>13} {'legacy ms':>10} {'new chars':>10} {'new ms':>8}")
+    for n in sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "bench.db")
+            make_catalog(path, n)
+            engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+            async with async_sessionmaker(engine)() as db:
+                legacy, legacy_ms = await timed(lambda: legacy_context(db), repeat)
+                sizes_out, times = [], []
+                for q in QUESTIONS:
+                    ctx, ms = await timed(
+                        lambda: build_inventory_context(db, _extract_models_from_text(q), detect_intents(q)),
+                        repeat,
+                    )
+                    sizes_out.append(len(ctx))
+                    times.append(ms)
+            await engine.dispose()
+        print(f"{n:>9} {len(legacy):>13,} {legacy_ms:>10.1f} {max(sizes_out):>10,} {statistics.median(times):>8.1f}")
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--sizes", default="30,1000,10000,100000")
+    ap.add_argument("--repeat", type=int, default=5)
+    args = ap.parse_args()
+    asyncio.run(run([int(s) for s in args.sizes.split(",")], args.repeat))
+
+
+if __name__ == "__main__":
+    main()
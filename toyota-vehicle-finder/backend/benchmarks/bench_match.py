@@ -0,0 +1,72 @@
+"""/cars/match ranking: vectorized scoring + argpartition across catalog sizes and k.
+
+Usage (from backend/):
+    python -m benchmarks.bench_match [--sizes 1000,10000,100000] [--k 1,10,100] [--repeat 50]
+
+Builds match indexes over synthetic catalogs (benchmarks/synthetic.py, in memory) and
+times one quiz query - constraint mask, weighted scores, top-k - per size and k,
+against a plain Python score-and-sort of every candidate. Latency should grow
+linearly with catalog size and stay flat in k.
+"""
+
+import argparse
+import random
+import statistics
+import time
+
+from app.matching import CRITERIA, MatchIndex
+from app.models import Vehicle
+from benchmarks.synthetic import synthetic_vehicles
+
+WEIGHTS = {"price": 3, "mpg_combined": 2, "seating": 1, "cargo_volume": 0.5, "towing_capacity": 0, "safety_rating": 1}
+QUIZ = {"max_price": 45000, "min_seating": 5}
+
+
+def python_top(index: MatchIndex, k: int):
+    """Baseline: score each candidate in Python and sort them all."""
+    total = sum(WEIGHTS.values())
+    scored = []
+    for row in index.candidates(**QUIZ):
+        score = sum(index.features[row, j] * WEIGHTS[name] / total for j, name in enumerate(CRITERIA))
+        scored.append((-score, int(index.ids[row])))
+    return sorted(scored)[:k]
+
+
+def timed(fn, repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - t0) * 1000)
+    return statistics.median(samples)
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--sizes", default="1000,10000,100000")
+    ap.add_argument("--k", default="1,10,100")
+    ap.add_argument("--repeat", type=int, default=50)
+    ap.add_argument("--seed", type=int, default=5)
+    args = ap.parse_args()
+
+    ks = [int(k) for k in args.k.split(",")]
+    print(f"{'vehicles':>9} {'build ms':>9} " + " ".join(f"{'k=' + str(k) + ' ms':>10}" for k in ks)
+          + f" {'python ms':>10}")
+    for size in (int(s) for s in args.sizes.split(",")):
+        rng = random.Random(args.seed)
+        vehicles = [Vehicle(id=i + 1, **row) for i, row in enumerate(synthetic_vehicles(size, rng))]
+        t0 = time.perf_counter()
+        index = MatchIndex(vehicles)
+        build_ms = (time.perf_counter() - t0) * 1000
+        times = []
+        for k in ks:
+            times.append(timed(lambda: index.top(index.candidates(**QUIZ), WEIGHTS, k), args.repeat))
+        expected = [vid for _, vid in python_top(index, max(ks))]
+        got = [r["vehicle"].id for r in index.top(index.candidates(**QUIZ), WEIGHTS, max(ks))]
+        assert got == expected, "vectorized ranking differs from the baseline"
+        baseline = timed(lambda: python_top(index, max(ks)), max(3, args.repeat // 10))
+        print(f"{size:>9} {build_ms:>9.1f} " + " ".join(f"{t:>10.2f}" for t in times) + f" {baseline:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
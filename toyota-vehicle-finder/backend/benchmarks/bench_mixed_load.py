@@ -0,0 +1,108 @@
+"""Mixed /cars + /chat load: throughput and latency percentiles per route.
+
+Usage (from backend/):
+    python -m benchmarks.bench_mixed_load [--app-dir DIR ...] [--concurrency 64] [--duration 10]
+
+Each --app-dir is a backend/ directory (default: this one), so two revisions can be
+compared side by side, e.g. after `git worktree add /tmp/base <ref>`:
+    python -m benchmarks.bench_mixed_load --app-dir /tmp/base/toyota-vehicle-finder/backend --app-dir .
+
+The chatbot runs with the stub LLM (LLM_PROVIDER=stub) and no web search key, so
+/chat exercises the DB-backed rules plus a fixed-latency LLM fallback. Needs httpx.
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import time
+from collections import defaultdict
+
+import httpx
+
+from benchmarks._server import BACKEND, serve
+
+CHAT_MESSAGES = [
+    "What's the price of the RAV4?",
+    "Compare Camry vs Corolla",
+    "Which Toyota is most expensive?",
+    "What trims does the Highlander have?",
+    "Is a minivan or an SUV better for a road trip?",
+]
+CARS_QUERIES = [
+    {},
+    {"model": "camry"},
+    {"category": "SUV"},
+    {"max_price": 35000},
+    {"search_query": "hybrid"},
+]
+
+
+def pct(samples, p):
+    if not samples:
+        return float("nan")
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))]
+
+
+async def drive(url: str, concurrency: int, duration: float, chat_ratio: float, seed: int):
+    latencies = defaultdict(list)
+    errors = defaultdict(int)
+    rng = random.Random(seed)
+    stop_at = time.perf_counter() + duration
+
+    async def worker(client: httpx.AsyncClient):
+        while time.perf_counter() < stop_at:
+            r = rng.random()
+            if r < chat_ratio:
+                route, req = "POST /chat", client.post("/chat", json={"message": rng.choice(CHAT_MESSAGES)})
+            elif r < chat_ratio + (1 - chat_ratio) / 2:
+                route, req = "GET /cars", client.get("/cars", params=rng.choice(CARS_QUERIES))
+            else:
+                route, req = "GET /cars/{id}", client.get(f"/cars/{rng.randint(1, 12)}")
+            t0 = time.perf_counter()
+            try:
+                resp = await req
+                ok = resp.status_code < 500
+            except httpx.HTTPError:
+                ok = False
+            latencies[route].append((time.perf_counter() - t0) * 1000)
+            if not ok:
+                errors[route] += 1
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=url, limits=limits, timeout=60) as client:
+        await asyncio.gather(*(worker(client) for _ in range(concurrency)))
+    return latencies, errors
+
+
+def report(label: str, latencies, errors, duration: float):
+    print(f"\n{label}")
+    print(f"  {'route':<16} {'reqs':>7} {'rps':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'errors':>7}")
+    for route in sorted(latencies):
+        s = latencies[route]
+        print(f"  {route:<16} {len(s):>7} {len(s) / duration:>8.1f} {statistics.median(s):>8.1f} "
+              f"{pct(s, 95):>8.1f} {pct(s, 99):>8.1f} {errors[route]:>7}")
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--app-dir", action="append", dest="app_dirs")
+    ap.add_argument("--concurrency", type=int, default=64)
+    ap.add_argument("--duration", type=float, default=10)
+    ap.add_argument("--chat-ratio", type=float, default=0.2)
+    ap.add_argument("--llm-latency-ms", default="200")
+    ap.add_argument("--seed", type=int, default=7)
+    args = ap.parse_args()
+
+    for app_dir in args.app_dirs or [BACKEND]:
+        env = {"LLM_STUB_LATENCY_MS": args.llm_latency_ms}
+        with serve(app_dir, env=env) as url:
+            asyncio.run(drive(url, 4, 1.0, args.chat_ratio, args.seed))  # warm-up
+            latencies, errors = asyncio.run(drive(url, args.concurrency, args.duration, args.chat_ratio, args.seed))
+        report(os.path.abspath(app_dir), latencies, errors, args.duration)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""Full-catalog /cars payloads: encode time and bytes on the wire per encoding.
+
+Usage (from backend/):
+    python -m benchmarks.bench_payload [--sizes 1000,10000,100000] [--repeat 3]
+
+Builds the list FastAPI hands to the response class for GET /cars (validated
+schemas.Vehicle rows dumped in JSON mode) from synthetic vehicles, then times the
+stdlib JSONResponse encoder against ORJSONResponse, and each encoding the compression
+middleware can negotiate (brotli/zstd only if installed).
+"""
+
+import argparse
+import random
+import statistics
+import time
+
+from fastapi.responses import JSONResponse, ORJSONResponse
+
+from app import schemas
+from app.compression import available_encodings, compress
+from app.mock_data import TOYOTA_VEHICLES
+from benchmarks.synthetic import synthetic_vehicles
+
+
+def catalog(n: int):
+    rows = list(TOYOTA_VEHICLES) + list(synthetic_vehicles(max(0, n - len(TOYOTA_VEHICLES)), random.Random(1)))
+    return [schemas.Vehicle(id=i, **row).model_dump(mode="json") for i, row in enumerate(rows[:n], 1)]
+
+
+def timed(fn, repeat: int):
+    samples, out = [], None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        out = fn()
+        samples.append((time.perf_counter() - t0) * 1000)
+    return out, statistics.median(samples)
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--sizes", default="1000,10000,100000")
+    ap.add_argument("--repeat", type=int, default=3)
+    args = ap.parse_args()
+
+    encodings = available_encodings()
+    print(f"{'vehicles':>9} {'encoder':>8} {'encode ms':>10} {'bytes':>12}", end="")
+    for enc in encodings:
+        print(f" {enc + ' bytes':>11} {enc + ' ms':>8}", end="")
+    print()
+    for n in (int(s) for s in args.sizes.split(",")):
+        content = catalog(n)
+        body = None
+        for name, cls in (("json", JSONResponse), ("orjson", ORJSONResponse)):
+            body, ms = timed(lambda: cls(content).body, args.repeat)
+            print(f"{n:>9} {name:>8} {ms:>10.1f} {len(body):>12,}", end="")
+            if name == "json":
+                print()
+                continue
+            for enc in encodings:
+                data, cms = timed(lambda: compress(body, enc), args.repeat)
+                print(f" {len(data):>11,} {cms:>8.1f}", end="")
+            print()
+
+
+if __name__ == "__main__":
+    main()
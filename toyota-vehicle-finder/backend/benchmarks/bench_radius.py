@@ -0,0 +1,87 @@
+"""Radius search over dealer stock: R*Tree + haversine vs. scanning every dealer.
+
+Usage (from backend/):
+    python -m benchmarks.bench_radius [--dealers 3000] [--stock-per-dealer 300]
+                                      [--radius 10,50,200] [--repeat 20] [--db PATH]
+
+Builds a synthetic database (benchmarks/synthetic.py; or pass --db) and, for random
+points near the generated metros, times the dealer lookup both ways plus the full
+/cars?near= query (dealers -> stock -> vehicles) the endpoint runs.
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import tempfile
+import time
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from app import geo
+from app.database import create_sqlite_engine
+from app.main import _query_vehicles
+from benchmarks.synthetic import METROS, build
+
+
+async def scan_dealers(db, lat: float, lon: float, radius: float):
+    rows = await db.execute(text("SELECT id, latitude, longitude FROM dealers"))
+    hits = [(i, geo.haversine_miles(lat, lon, a, b)) for i, a, b in rows]
+    return sorted((h for h in hits if h[1] <= radius), key=lambda h: h[1])
+
+
+async def run(path: str, radii, repeat: int, seed: int):
+    engine = create_sqlite_engine(f"sqlite+aiosqlite:///{path}", readonly=True, pool_size=1, max_overflow=0)
+    sessions = async_sessionmaker(engine, expire_on_commit=False)
+    rng = random.Random(seed)
+    points = [(lat + rng.gauss(0, 0.3), lon + rng.gauss(0, 0.3)) for _, _, lat, lon in rng.choices(METROS, k=repeat)]
+    print(f"{'radius':>7} {'dealers':>8} {'vehicles':>9} {'rtree ms':>9} {'scan ms':>8} {'/cars ms':>9}")
+    async with sessions() as db:
+        for radius in radii:
+            t_rtree, t_scan, t_cars, found, vehicles = [], [], [], [], []
+            for lat, lon in points:
+                t0 = time.perf_counter()
+                hits = await geo.dealers_within(db, lat, lon, radius)
+                t_rtree.append((time.perf_counter() - t0) * 1000)
+                t0 = time.perf_counter()
+                scanned = await scan_dealers(db, lat, lon, radius)
+                t_scan.append((time.perf_counter() - t0) * 1000)
+                assert [h[0] for h in hits] == [h[0] for h in scanned]
+                t0 = time.perf_counter()
+                hits = await geo.dealers_within(db, lat, lon, radius)
+                rows = await _query_vehicles(db, *([None] * 7), dealer_ids=[h[0] for h in hits])
+                t_cars.append((time.perf_counter() - t0) * 1000)
+                found.append(len(hits))
+                vehicles.append(len(rows))
+            print(f"{radius:>7g} {statistics.mean(found):>8.0f} {statistics.mean(vehicles):>9.0f} "
+                  f"{statistics.median(t_rtree):>9.2f} {statistics.median(t_scan):>8.2f} {statistics.median(t_cars):>9.2f}")
+    await engine.dispose()
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--db", help="use this database instead of generating one")
+    ap.add_argument("--dealers", type=int, default=3000)
+    ap.add_argument("--stock-per-dealer", type=int, default=300)
+    ap.add_argument("--vehicles", type=int, default=5000)
+    ap.add_argument("--radius", default="10,50,200")
+    ap.add_argument("--repeat", type=int, default=20)
+    ap.add_argument("--seed", type=int, default=3)
+    args = ap.parse_args()
+
+    radii = [float(r) for r in args.radius.split(",")]
+    with tempfile.TemporaryDirectory() as tmp:
+        path = args.db
+        if not path:
+            path = os.path.join(tmp, "radius.db")
+            t0 = time.perf_counter()
+            counts = build(path, vehicles=args.vehicles, users=0, n_dealers=args.dealers,
+                           stock_per_dealer=args.stock_per_dealer, seed=args.seed)
+            print(f"synthetic data: {counts} in {time.perf_counter() - t0:.1f}s")
+        asyncio.run(run(path, radii, args.repeat, args.seed))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,206 @@
+"""Deterministic synthetic catalog and user activity for load tests.
+
+Usage (from backend/):
+    python -m benchmarks.synthetic OUT.db [--vehicles 10000] [--users 1000] [--seed 42]
+                                          [--dealers 200] [--stock-per-dealer 100]
+
+Builds a database the app can serve directly: the seed vehicles and dealers first
+(exactly as startup would), then generated vehicles, dealers with lot stock,
+favorites, comparisons and view history. Vehicles are jittered copies of the seed
+rows, so prices, MPG, seating and categories follow the seed distributions; dealers
+cluster around US metro areas; activity and stock are skewed towards a small set of
+popular vehicles the way real browsing is. The same seed always yields the same data.
+"""
+
+import argparse
+import json
+import math
+import random
+import time
+from datetime import datetime, timedelta
+from typing import Dict, Iterator, List
+
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+
+from app.database import create_sqlite_engine
+from app.mock_data import TOYOTA_DEALERS, TOYOTA_VEHICLES, populate_database
+from app.models import Comparison, Dealer, Favorite, Stock, Vehicle, ViewHistory
+
+CHUNK = 5000
+EPOCH = datetime(2025, 1, 1)  # fixed so generated timestamps are reproducible
+
+_PACKAGES = ["", "Premium", "Convenience", "Tech", "Weather", "Nightshade", "Adventure", "TRD"]
+_EXTRA_FEATURES = [
+    "Heated Seats", "Sunroof", "Blind Spot Monitor", "Head-Up Display", "Wireless Charging",
+    "360 Camera", "JBL Premium Audio", "Ventilated Seats", "Tow Package", "Roof Rails",
+]
+
+# (city, state, lat, lon) dealers are scattered around
+METROS = [
+    ("Dallas", "TX", 32.78, -96.80), ("Houston", "TX", 29.76, -95.37), ("Austin", "TX", 30.27, -97.74),
+    ("Phoenix", "AZ", 33.45, -112.07), ("Los Angeles", "CA", 34.05, -118.24), ("San Jose", "CA", 37.34, -121.89),
+    ("Seattle", "WA", 47.61, -122.33), ("Denver", "CO", 39.74, -104.99), ("Chicago", "IL", 41.88, -87.63),
+    ("Atlanta", "GA", 33.75, -84.39), ("Miami", "FL", 25.76, -80.19), ("New York", "NY", 40.71, -74.01),
+    ("Boston", "MA", 42.36, -71.06), ("Detroit", "MI", 42.33, -83.05), ("Minneapolis", "MN", 44.98, -93.27),
+]
+
+
+def popular_id(rng: random.Random, n: int, skew: float = 3.0) -> int:
+    """A vehicle id in 1..n, heavily skewed towards low ids (a few models get most traffic)."""
+    return 1 + min(n - 1, int(n * rng.random() ** skew))
+
+
+def synthetic_vehicles(n: int, rng: random.Random, start: int = 0) -> Iterator[Dict]:
+    """`n` vehicles derived from the seed rows, unique on (model, year, trim)."""
+    seeds = TOYOTA_VEHICLES
+    for i in range(start, start + n):
+        row = dict(seeds[rng.randrange(len(seeds))])
+        package = rng.choice(_PACKAGES)
+        row["year"] = 2024 - min(9, int(rng.expovariate(0.5)))
+        row["trim"] = f"{row['trim']} {package} #{i}".replace("  ", " ")
+        age = 2024 - row["year"]
+        row["price"] = round(row["price"] * rng.gauss(1.0, 0.06) * (0.97 ** age) / 5) * 5
+        for field in ("mpg_city", "mpg_highway", "mpg_combined"):
+            row[field] = max(10, row[field] + rng.randint(-2, 2) - age // 3)
+        row["towing_capacity"] = int(row["towing_capacity"] * rng.choice([1.0, 1.0, 1.1, 0.9]))
+        features = json.loads(row["features"]) + rng.sample(_EXTRA_FEATURES, rng.randint(0, 3))
+        row["features"] = json.dumps(features)
+        yield row
+
+
+def dealers(n: int, rng: random.Random) -> Iterator[Dict]:
+    for i in range(n):
+        city, state, lat, lon = rng.choice(METROS)
+        yield {
+            "name": f"Toyota of {city} #{i}",
+            "address": f"{rng.randrange(100, 20000)} Auto Mall Dr",
+            "city": city,
+            "state": state,
+            "latitude": round(lat + rng.gauss(0, 0.35), 5),
+            "longitude": round(lon + rng.gauss(0, 0.45), 5),
+        }
+
+
+def stock(dealer_ids: range, per_dealer: int, n_vehicles: int, rng: random.Random) -> Iterator[Dict]:
+    for dealer_id in dealer_ids:
+        for unit in range(rng.randint(per_dealer // 2, per_dealer * 3 // 2)):
+            vehicle_id = popular_id(rng, n_vehicles, skew=2.0)
+            yield {
+                "vin": f"S{dealer_id:07d}{unit:09d}",
+                "dealer_id": dealer_id,
+                "vehicle_id": vehicle_id,
+                "price": round(rng.uniform(22000, 60000) / 5) * 5,
+            }
+
+
+def favorites(users: int, n_vehicles: int, per_user: float, rng: random.Random) -> Iterator[Dict]:
+    for u in range(users):
+        picked = {popular_id(rng, n_vehicles) for _ in range(_poisson(rng, per_user))}
+        for vehicle_id in sorted(picked):
+            yield {"user_id": f"user-{u}", "vehicle_id": vehicle_id, "created_at": _when(rng)}
+
+
+def comparisons(sessions: int, n_vehicles: int, rng: random.Random) -> Iterator[Dict]:
+    for s in range(sessions):
+        created = _when(rng)
+        for position in range(1, rng.choice([2, 2, 3]) + 1):
+            yield {
+                "session_id": f"session-{s}",
+                "vehicle_id": popular_id(rng, n_vehicles),
+                "position": position,
+                "created_at": created,
+            }
+
+
+def view_history(users: int, n_vehicles: int, per_user: float, rng: random.Random) -> Iterator[Dict]:
+    for u in range(users):
+        for _ in range(_poisson(rng, per_user)):
+            yield {"user_id": f"user-{u}", "vehicle_id": popular_id(rng, n_vehicles), "viewed_at": _when(rng)}
+
+
+def _poisson(rng: random.Random, mean: float) -> int:
+    # Knuth's method; means here are small
+    limit, k, p = math.exp(-mean), 0, 1.0
+    while True:
+        p *= rng.random()
+        if p <= limit:
+            return k
+        k += 1
+
+
+def _when(rng: random.Random) -> datetime:
+    return EPOCH - timedelta(seconds=rng.randrange(90 * 24 * 3600))
+
+
+def _insert_chunks(conn, model, rows: Iterator[Dict]) -> int:
+    total, chunk = 0, []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= CHUNK:
+            conn.execute(insert(model), chunk)
+            total += len(chunk)
+            chunk = []
+    if chunk:
+        conn.execute(insert(model), chunk)
+        total += len(chunk)
+    return total
+
+
+def build(
+    path: str,
+    vehicles: int = 10000,
+    users: int = 1000,
+    favorites_per_user: float = 3.0,
+    views_per_user: float = 20.0,
+    comparison_sessions: int = 0,
+    seed: int = 42,
+    n_dealers: int = 200,
+    stock_per_dealer: int = 100,
+) -> Dict[str, int]:
+    """Create (or extend) the SQLite database at `path`; returns row counts per table."""
+    rng = random.Random(seed)
+    engine = create_sqlite_engine(f"sqlite:///{path}")
+    with Session(engine) as db:
+        populate_database(db)
+    n_vehicles = len(TOYOTA_VEHICLES) + vehicles
+    sessions = comparison_sessions or users // 2
+    first_dealer = len(TOYOTA_DEALERS) + 1
+    with engine.begin() as conn:
+        counts = {
+            "vehicles": len(TOYOTA_VEHICLES) + _insert_chunks(conn, Vehicle, synthetic_vehicles(vehicles, rng)),
+            "dealers": len(TOYOTA_DEALERS) + _insert_chunks(conn, Dealer, dealers(n_dealers, rng)),
+            "stock": _insert_chunks(
+                conn, Stock, stock(range(first_dealer, first_dealer + n_dealers), stock_per_dealer, n_vehicles, rng)
+            ),
+            "favorites": _insert_chunks(conn, Favorite, favorites(users, n_vehicles, favorites_per_user, rng)),
+            "comparisons": _insert_chunks(conn, Comparison, comparisons(sessions, n_vehicles, rng)),
+            "view_history": _insert_chunks(conn, ViewHistory, view_history(users, n_vehicles, views_per_user, rng)),
+        }
+    engine.dispose()
+    return counts
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("out", help="SQLite file to create (should not exist yet)")
+    ap.add_argument("--vehicles", type=int, default=10000)
+    ap.add_argument("--users", type=int, default=1000)
+    ap.add_argument("--favorites-per-user", type=float, default=3.0)
+    ap.add_argument("--views-per-user", type=float, default=20.0)
+    ap.add_argument("--comparison-sessions", type=int, default=0, help="default: users / 2")
+    ap.add_argument("--seed", type=int, default=42)
+    ap.add_argument("--dealers", type=int, default=200)
+    ap.add_argument("--stock-per-dealer", type=int, default=100)
+    args = ap.parse_args()
+
+    t0 = time.perf_counter()
+    counts = build(
+        args.out, args.vehicles, args.users, args.favorites_per_user, args.views_per_user,
+        args.comparison_sessions, args.seed, args.dealers, args.stock_per_dealer,
+    )
+    print(json.dumps(counts), f"in {time.perf_counter() - t0:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,26 @@
+"""Shared test setup: every test session runs against a scratch copy of the SQLite DB.
+
+Run from backend/:
+    pip install pytest
+    python -m pytest
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND)
+
+# Set before anything imports app.database, which reads them at import time
+_scratch = tempfile.mkdtemp(prefix="toyota-tests-")
+shutil.copy(os.path.join(BACKEND, "toyota_vehicles.db"), _scratch)
+os.environ["DATABASE_PATH"] = os.path.join(_scratch, "toyota_vehicles.db")
+os.environ.setdefault("CHAT_WARMUP", "0")
+os.environ.setdefault("SCHEDULER_ENABLED", "0")
+os.environ.setdefault("LLM_PROVIDER", "stub")
+os.environ.setdefault("WEB_SEARCH_PROVIDER", "stub")
+os.environ.setdefault("RATE_LIMIT_ENABLED", "0")
+# No change-feed polling: its queries would land in the SQL statement budgets
+os.environ.setdefault("CATALOG_POLL_INTERVAL_S", "0")
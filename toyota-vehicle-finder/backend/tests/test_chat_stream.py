@@ -0,0 +1,96 @@
+import asyncio
+import threading
+import time
+
+from app import chatbot
+from app.concurrency import llm_limiter
+from app.database import AsyncReadSessionLocal
+from app.llm import CircuitBreaker, GuardedLLM, LLMProvider
+
+
+class StallingProvider(LLMProvider):
+    """Sends one sentence, then hangs until released."""
+
+    name = "stalling"
+
+    def __init__(self):
+        self.release = threading.Event()
+
+    def available(self) -> bool:
+        return True
+
+    def generate(self, prompt):
+        return None
+
+    def stream(self, prompt):
+        yield "The Prius is a dependable hybrid with excellent fuel economy. "
+        self.release.wait(5)
+        yield "This never arrives."
+
+
+def test_stream_that_stalls_mid_answer_ends(monkeypatch):
+    provider = StallingProvider()
+    llm = GuardedLLM(provider, CircuitBreaker(), llm_limiter, timeout_s=5)
+    monkeypatch.setattr(chatbot, "_llm", llm)
+    monkeypatch.setattr(chatbot, "LLM_STREAM_IDLE_S", 0.2)
+
+    async def main():
+        pieces, timings = [], {}
+        async with AsyncReadSessionLocal() as db:
+            async for piece in chatbot.stream_chat_response("tell me about prius reliability", db, timings=timings):
+                pieces.append(piece)
+        return pieces, timings
+
+    t0 = time.perf_counter()
+    try:
+        pieces, timings = asyncio.run(main())
+    finally:
+        provider.release.set()
+    assert time.perf_counter() - t0 < 3
+    assert "".join(pieces).startswith("The Prius is a dependable hybrid")
+    assert "never arrives" not in "".join(pieces)
+    assert timings["winner"] in ("web", "inventory")
+    assert llm.breaker.stats()["consecutive_failures"] == 1  # the stall counts toward tripping
+
+
+def test_stream_closed_after_data_is_not_a_failure():
+    provider = StallingProvider()
+    llm = GuardedLLM(provider, CircuitBreaker(), llm_limiter, timeout_s=5)
+
+    async def main():
+        chunks = llm.stream("prompt")
+        first = await chunks.__anext__()
+        await chunks.aclose()
+        return first
+
+    try:
+        assert asyncio.run(main()).startswith("The Prius")
+    finally:
+        provider.release.set()
+    assert llm.breaker.stats()["consecutive_failures"] == 0
+
+
+def test_cancelled_streams_do_not_trip_the_breaker():
+    """Clients closing their tab mid-answer must not switch the LLM off for everyone."""
+    provider = StallingProvider()
+    llm = GuardedLLM(provider, CircuitBreaker(failure_threshold=3), llm_limiter, timeout_s=5)
+
+    async def consume(chunks, got_first):
+        async for _ in chunks:
+            got_first.set()
+
+    async def main():
+        for _ in range(3):
+            got_first = asyncio.Event()
+            task = asyncio.ensure_future(consume(llm.stream("prompt", idle_s=5), got_first))
+            await got_first.wait()
+            task.cancel()  # what an SSE client disconnect does
+            await asyncio.gather(task, return_exceptions=True)
+
+    try:
+        asyncio.run(main())
+    finally:
+        provider.release.set()
+    assert llm.breaker.stats()["state"] == CircuitBreaker.CLOSED
+    assert llm.breaker.stats()["consecutive_failures"] == 0
+    assert llm.ready()
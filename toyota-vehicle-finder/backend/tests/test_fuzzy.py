@@ -0,0 +1,17 @@
+from app.fuzzy import TrigramIndex
+
+INDEX = TrigramIndex({"corolla", "camry", "hybrid", "awd", "rav4", "tundra", "prius"})
+
+
+def test_corrects_only_misspelled_words():
+    assert INDEX.correct("carolla") == "corolla"
+    assert INDEX.correct("Carolla hybird, AWD!") == "corolla hybrid, AWD!"
+
+
+def test_leaves_text_without_typos_untouched():
+    for text in ("$30,000", "hybrid+awd", "Camry", "tund", "under 30k"):
+        assert INDEX.correct(text) == text
+
+
+def test_whole_term_with_other_spacing():
+    assert INDEX.correct("rav 4") == "rav4"
@@ -0,0 +1,27 @@
+import random
+
+from app.matching import MatchIndex
+from app.models import Vehicle
+
+
+def _vehicle(vid: int, price: float) -> Vehicle:
+    return Vehicle(id=vid, model="Camry", price=price, mpg_combined=32, seating=5, cargo_volume=15.1,
+                   towing_capacity=1000, safety_rating=5.0, drivetrain="FWD", category="Sedan")
+
+
+def test_ties_at_the_cutoff_go_to_the_lowest_ids():
+    ids = list(range(1, 201))
+    random.Random(3).shuffle(ids)
+    # One clear winner, then 199 vehicles tied on every criterion
+    vehicles = [_vehicle(vid, 20000.0 if vid == 150 else 30000.0) for vid in ids]
+    index = MatchIndex(vehicles)
+    rows = index.candidates()
+    for k in (1, 2, 5, 50):
+        got = [r["vehicle"].id for r in index.top(rows, {"price": 1}, k)]
+        assert got == ([150] + list(range(1, 150)))[:k]
+
+
+def test_results_ordered_by_score_then_id():
+    index = MatchIndex([_vehicle(vid, price) for vid, price in ((4, 25000), (2, 25000), (9, 20000), (1, 30000))])
+    results = index.top(index.candidates(), {"price": 1}, 3)
+    assert [r["vehicle"].id for r in results] == [9, 2, 4]
@@ -0,0 +1,78 @@
+import asyncio
+
+from app.scheduler import Scheduler
+
+
+def test_lease_failure_does_not_stop_the_job():
+    """A transient DB error while taking the lease is recorded; the job runs on the next tick."""
+    ran = []
+
+    async def job_func():
+        ran.append(1)
+
+    async def main():
+        scheduler = Scheduler()
+        job = scheduler.add("shared", job_func, interval_s=0.05, single_instance=True)
+        attempts = []
+
+        async def acquire(job, periodic):
+            attempts.append(periodic)
+            if len(attempts) == 1:
+                raise RuntimeError("database is locked")
+            return True
+
+        async def release(job):
+            pass
+
+        scheduler._acquire, scheduler._release = acquire, release
+        scheduler.start()
+        try:
+            for _ in range(100):
+                await asyncio.sleep(0.01)
+                if ran:
+                    break
+        finally:
+            await scheduler.stop()
+        return job
+
+    job = asyncio.run(main())
+    assert ran, "the job never ran after the failed lease"
+    assert job.failures == 1
+    assert job.runs == 1 + len(ran)
+
+
+def test_release_failure_is_recorded_not_raised():
+    async def main():
+        scheduler = Scheduler()
+
+        async def job_func():
+            return "done"
+
+        job = scheduler.add("shared", job_func, single_instance=True)
+
+        async def acquire(job, periodic):
+            return True
+
+        async def release(job):
+            raise RuntimeError("database is locked")
+
+        scheduler._acquire, scheduler._release = acquire, release
+        return await scheduler.run(job), job
+
+    ok, job = asyncio.run(main())
+    assert ok and job.last_result == "done" and job.failures == 0
+
+
+def test_catalog_listener_only_registered_while_running():
+    from app import cache
+
+    async def main():
+        scheduler = Scheduler()
+        assert scheduler._catalog_changed not in cache._LISTENERS
+        scheduler.start()
+        assert scheduler._catalog_changed in cache._LISTENERS
+        await scheduler.stop()
+        return scheduler
+
+    scheduler = asyncio.run(main())
+    assert scheduler._catalog_changed not in cache._LISTENERS
@@ -0,0 +1,45 @@
+import asyncio
+
+from app.singleflight import SingleFlight
+
+
+def test_waiters_share_one_call():
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return "value"
+
+    async def main():
+        sf = SingleFlight("test")
+        return await asyncio.gather(*(sf.do("k", fetch) for _ in range(5)))
+
+    assert asyncio.run(main()) == ["value"] * 5
+    assert len(calls) == 1
+
+
+def test_rejoin_after_last_waiter_cancelled_starts_a_new_call():
+    started = []
+
+    async def fetch():
+        started.append(1)
+        try:
+            await asyncio.sleep(0.05)
+        except asyncio.CancelledError:
+            await asyncio.sleep(0.01)  # slow to unwind, widening the window
+            raise
+        return len(started)
+
+    async def main():
+        sf = SingleFlight("test")
+        first = asyncio.ensure_future(sf.do("k", fetch))
+        await asyncio.sleep(0)
+        first.cancel()
+        await asyncio.gather(first, return_exceptions=True)
+        # The cancelled call is still unwinding; this caller must not inherit its CancelledError
+        return await sf.do("k", fetch), sf.stats()
+
+    result, stats = asyncio.run(main())
+    assert result == 2
+    assert stats == {"calls": 2, "deduplicated": 0, "in_flight": 0}
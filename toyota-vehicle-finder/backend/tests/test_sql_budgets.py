@@ -0,0 +1,40 @@
+"""Statement budgets per endpoint: a change that adds queries (or an N+1) fails here."""
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.sqlprofile import assert_max_statements
+
+
+@pytest.fixture(scope="module")
+def client():
+    with TestClient(app) as c:
+        yield c
+
+
+def test_add_favorite(client):
+    with assert_max_statements(4):
+        r = client.post("/favorites", json={"user_id": "budget-add", "vehicle_id": 1})
+    assert r.status_code == 200
+
+
+def test_get_favorites_does_not_grow_with_favorites(client):
+    for vehicle_id in (1, 2, 3, 4):
+        client.post("/favorites", json={"user_id": "budget-get", "vehicle_id": vehicle_id})
+    with assert_max_statements(2):
+        r = client.get("/favorites/budget-get")
+    assert len(r.json()) == 4
+
+
+def test_compare_vehicles(client):
+    with assert_max_statements(2):
+        r = client.post("/compare", json={"session_id": "budget", "vehicle_ids": [1, 2, 3]})
+    assert len(r.json()["vehicles"]) == 3
+
+
+def test_chatbot_two_model_compare(client):
+    with assert_max_statements(1):
+        r = client.post("/chat", json={"message": "camry vs corolla"})
+    reply = r.json()["response"]
+    assert "Camry" in reply and "Corolla" in reply
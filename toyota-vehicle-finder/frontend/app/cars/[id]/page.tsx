@@ -1,7 +1,8 @@
 'use client';
 
-import { useState, useEffect } from 'react';
+import { useState, useEffect, useRef } from 'react';
 import { useParams } from 'next/navigation';
+import { v4 as uuidv4 } from 'uuid';
 import { Heart, Car, Fuel, DollarSign, Shield, Users, Package, Gauge } from 'lucide-react';
 import { Button } from '@/components/ui/button';
 import { Card, CardContent, CardHeader, CardTitle } from '@/components/ui/card';
@@ -12,6 +13,8 @@ export default function VehicleDetailPage() {
   const [vehicle, setVehicle] = useState<Vehicle | null>(null);
   const [loading, setLoading] = useState(true);
   const [isFavorite, setIsFavorite] = useState(false);
+  // One key per page visit, so re-renders and effect re-runs record a single view
+  const visitId = useRef(uuidv4());
 
   useEffect(() => {
     if (params.id) {
@@ -24,7 +27,7 @@ export default function VehicleDetailPage() {
       setLoading(true);
       const data = await vehicleApi.getVehicle(id);
       setVehicle(data);
-      await vehicleApi.addToHistory(id);
+      await vehicleApi.addToHistory(id, `${visitId.current}:${id}`);
       checkFavorite(id);
     } catch (error) {
       console.error('Error loading vehicle:', error);
@@ -11,7 +11,7 @@ import {
   SelectTrigger,
   SelectValue,
 } from '@/components/ui/select';
-import { vehicleApi, Vehicle, ComparisonResponse } from '@/lib/api';
+import { vehicleApi, Vehicle, ComparisonResponse, applyCatalogDiff, isFieldUpdate, subscribeCatalog } from '@/lib/api';
 
 export default function ComparePage() {
   const [vehicles, setVehicles] = useState<Vehicle[]>([]);
@@ -23,6 +23,20 @@ export default function ComparePage() {
     loadVehicles();
   }, []);
 
+  // Keep the picker and the selected vehicles current as prices and specs change
+  useEffect(() => {
+    return subscribeCatalog((message) => {
+      if (isFieldUpdate(message)) {
+        setVehicles((current) => applyCatalogDiff(current, message));
+        setSelectedVehicles((current) =>
+          current.map((v) => (v && message.updated?.[v.id] ? { ...v, ...message.updated[v.id] } : v))
+        );
+      } else if (message.type === 'diff' || message.type === 'reset') {
+        loadVehicles();
+      }
+    });
+  }, []);
+
   const loadVehicles = async () => {
     try {
       const data = await vehicleApi.getVehicles();
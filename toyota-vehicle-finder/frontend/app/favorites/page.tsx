@@ -4,7 +4,7 @@ import { useState, useEffect } from 'react';
 import { Heart, Trash2 } from 'lucide-react';
 import { Button } from '@/components/ui/button';
 import { Card, CardContent, CardFooter, CardHeader, CardTitle } from '@/components/ui/card';
-import { vehicleApi } from '@/lib/api';
+import { vehicleApi, isFieldUpdate, subscribeCatalog } from '@/lib/api';
 
 export default function FavoritesPage() {
   const [favorites, setFavorites] = useState<any[]>([]);
@@ -14,6 +14,23 @@ export default function FavoritesPage() {
     loadFavorites();
   }, []);
 
+  // Live updates for the favorited vehicles only
+  const vehicleIds = favorites.map((f) => f.vehicle_id).join(',');
+  useEffect(() => {
+    if (!vehicleIds) return;
+    return subscribeCatalog((message) => {
+      if (isFieldUpdate(message)) {
+        setFavorites((current) =>
+          current.map((f) =>
+            message.updated?.[f.vehicle_id] ? { ...f, vehicle: { ...f.vehicle, ...message.updated[f.vehicle_id] } } : f
+          )
+        );
+      } else if (message.type === 'diff' || message.type === 'reset') {
+        loadFavorites();
+      }
+    }, vehicleIds.split(',').map(Number));
+  }, [vehicleIds]);
+
   const loadFavorites = async () => {
     try {
       setLoading(true);
@@ -12,7 +12,7 @@ import {
   SelectTrigger,
   SelectValue,
 } from '@/components/ui/select';
-import { vehicleApi, Vehicle, VehicleFilter } from '@/lib/api';
+import { vehicleApi, Vehicle, VehicleFilter, applyCatalogDiff, isFieldUpdate, subscribeCatalog } from '@/lib/api';
 
 export default function Home() {
   const [vehicles, setVehicles] = useState<Vehicle[]>([]);
@@ -24,6 +24,17 @@ export default function Home() {
     loadVehicles();
   }, [filters]);
 
+  // Price/spec changes are applied in place; added or removed vehicles reload the list
+  useEffect(() => {
+    return subscribeCatalog((message) => {
+      if (isFieldUpdate(message)) {
+        setVehicles((current) => applyCatalogDiff(current, message));
+      } else if (message.type === 'diff' || message.type === 'reset') {
+        loadVehicles();
+      }
+    });
+  }, [filters]);
+
   const loadVehicles = async () => {
     try {
       setLoading(true);
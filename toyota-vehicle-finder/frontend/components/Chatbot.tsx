@@ -7,6 +7,7 @@ import { Button } from './ui/button';
 import { Input } from './ui/input';
 import { Card } from './ui/card';
 import { MessageCircle, X, Send, Bot, User, RotateCcw } from 'lucide-react';
+import { getSessionId } from '@/lib/api';
 
 interface Message {
   id: number;
@@ -53,30 +54,65 @@ export default function Chatbot() {
     setInputMessage('');
     setIsLoading(true);
 
+    const botId = userMessage.id + 1;
+    const appendToBot = (piece: string) =>
+      setMessages((prev) => {
+        if (prev.some((m) => m.id === botId)) {
+          return prev.map((m) => (m.id === botId ? { ...m, text: m.text + piece } : m));
+        }
+        return [...prev, { id: botId, text: piece, sender: 'bot', timestamp: new Date() }];
+      });
+
     try {
-      const res = await fetch(`${API_BASE}/chat`, {
+      const res = await fetch(`${API_BASE}/chat/stream`, {
         method: 'POST',
-        headers: { 'Content-Type': 'application/json' },
+        headers: {
+          'Content-Type': 'application/json',
+          Accept: 'text/event-stream',
+          'X-Session-Id': getSessionId(),
+        },
         body: JSON.stringify({ message: text }),
       });
-      if (!res.ok) throw new Error(`HTTP ${res.status}`);
-      const data: { response?: string } = await res.json();
+      if (res.status === 429) {
+        appendToBot("You're sending messages faster than I can answer. Please wait a few seconds and try again.");
+        return;
+      }
+      if (!res.ok || !res.body) throw new Error(`HTTP ${res.status}`);
 
-      const botMessage: Message = {
-        id: userMessage.id + 1,
-        text: data.response ?? "I'm sorry, I couldn't process that request.",
-        sender: 'bot',
-        timestamp: new Date(),
-      };
-      setMessages((prev) => [...prev, botMessage]);
+      // Parse Server-Sent Events: "event: delta" frames carry {text}, "event: done" ends the answer.
+      const reader = res.body.getReader();
+      const decoder = new TextDecoder();
+      let buffer = '';
+      let received = false;
+      for (;;) {
+        const { done, value } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+        let sep: number;
+        while ((sep = buffer.indexOf('\n\n')) !== -1) {
+          const frame = buffer.slice(0, sep);
+          buffer = buffer.slice(sep + 2);
+          const event = frame.match(/^event: (.*)$/m)?.[1];
+          const data = frame.match(/^data: (.*)$/m)?.[1];
+          if (event === 'delta' && data) {
+            const { text: piece } = JSON.parse(data) as { text: string };
+            if (!received) {
+              received = true;
+              setIsLoading(false);
+            }
+            appendToBot(piece);
+          }
+        }
+      }
+      if (!received) appendToBot("I'm sorry, I couldn't process that request.");
     } catch (e) {
       const errorMessage: Message = {
-        id: messages.length + 2,
+        id: botId,
         text: "I'm having trouble connecting. Please try again later.",
         sender: 'bot',
         timestamp: new Date(),
       };
-      setMessages((prev) => [...prev, errorMessage]);
+      setMessages((prev) => [...prev.filter((m) => m.id !== botId), errorMessage]);
     } finally {
       setIsLoading(false);
     }
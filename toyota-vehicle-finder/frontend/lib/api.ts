@@ -24,6 +24,12 @@ const api = axios.create({
   },
 });
 
+// The backend rate-limits per session, so every request says whose it is
+api.interceptors.request.use((config) => {
+  config.headers.set('X-Session-Id', getSessionId());
+  return config;
+});
+
 // Types
 export interface Vehicle {
   id: number;
@@ -54,6 +60,113 @@ export interface VehicleFilter {
   min_mpg?: number;
   category?: string;
   search_query?: string;
+  near?: string; // "lat,lon": only vehicles in stock within `radius` miles
+  radius?: number;
+}
+
+export interface PricePoint {
+  changed_at: string;
+  price: number;
+  low: number;
+  high: number;
+}
+
+export interface PriceHistory {
+  vehicle_id: number;
+  since: string;
+  until: string;
+  start_price?: number | null;
+  downsampled: boolean;
+  points: PricePoint[];
+}
+
+export interface PriceDrop {
+  vehicle: Vehicle;
+  previous_price: number;
+  price: number;
+  drop: number;
+  drop_pct?: number | null;
+}
+
+export interface FacetValue {
+  value: string;
+  count: number;
+}
+
+export interface Facets {
+  total: number;
+  model: FacetValue[];
+  category: FacetValue[];
+  drivetrain: FacetValue[];
+  year: FacetValue[];
+  price: { min?: number | null; max?: number | null };
+  mpg_combined: { min?: number | null; max?: number | null };
+}
+
+export interface TrendingVehicle {
+  vehicle: Vehicle;
+  views_24h: number;
+  views_7d: number;
+  score: number;
+  computed_at: string;
+}
+
+export interface MatchWeights {
+  price?: number; // cheaper is better
+  mpg_combined?: number;
+  seating?: number;
+  cargo_volume?: number;
+  towing_capacity?: number;
+  safety_rating?: number;
+}
+
+export interface MatchRequest {
+  max_price?: number;
+  min_seating?: number;
+  min_towing?: number;
+  min_mpg?: number;
+  all_wheel_drive?: boolean; // AWD or 4WD
+  category?: string;
+  weights?: MatchWeights;
+  limit?: number;
+}
+
+export interface MatchResult {
+  vehicle: Vehicle;
+  score: number; // 0-1
+  breakdown: Record<string, number>; // per-criterion share of the score
+}
+
+export interface MatchResponse {
+  candidates: number;
+  results: MatchResult[];
+}
+
+export interface CatalogMessage {
+  type: 'hello' | 'diff' | 'reset' | 'error';
+  version?: number | null;
+  updated?: Record<string, Partial<Vehicle>>; // changed fields only
+  added?: Record<string, Omit<Vehicle, 'id'>>;
+  removed?: number[];
+  detail?: string;
+}
+
+export interface Dealer {
+  id: number;
+  name: string;
+  address: string;
+  city: string;
+  state: string;
+  latitude: number;
+  longitude: number;
+  distance_miles?: number | null;
+}
+
+export interface StockUnit {
+  id: number;
+  vin: string;
+  price: number;
+  dealer: Dealer;
 }
 
 export interface FinanceRequest {
@@ -134,6 +247,48 @@ export const vehicleApi = {
     return data;
   },
 
+  // Price changes of a vehicle (downsampled to `points` for long ranges)
+  getPriceHistory: async (id: number, since?: string, points?: number): Promise<PriceHistory> => {
+    const { data } = await api.get(`/cars/${id}/price-history`, { params: { since, points } });
+    return data;
+  },
+
+  // Vehicles whose price fell since `since` (default: last 7 days)
+  getPriceDrops: async (since?: string): Promise<PriceDrop[]> => {
+    const { data } = await api.get('/cars/price-drops', { params: { since } });
+    return data;
+  },
+
+  // Filter values with vehicle counts, plus price/MPG ranges
+  getFacets: async (): Promise<Facets> => {
+    const { data } = await api.get('/cars/facets');
+    return data;
+  },
+
+  // Most-viewed vehicles over the last day and week
+  getTrending: async (limit?: number): Promise<TrendingVehicle[]> => {
+    const { data } = await api.get('/cars/trending', { params: { limit } });
+    return data;
+  },
+
+  // Quiz answers -> best-matching vehicles, ranked on the server
+  matchVehicles: async (request: MatchRequest): Promise<MatchResponse> => {
+    const { data } = await api.post('/cars/match', request);
+    return data;
+  },
+
+  // Units of a vehicle on dealer lots (nearest first when `near` is given)
+  getVehicleStock: async (id: number, near?: string, radius?: number): Promise<StockUnit[]> => {
+    const { data } = await api.get(`/cars/${id}/stock`, { params: { near, radius } });
+    return data;
+  },
+
+  // Dealers, optionally within `radius` miles of `near` ("lat,lon")
+  getDealers: async (near?: string, radius?: number): Promise<Dealer[]> => {
+    const { data } = await api.get('/dealers', { params: { near, radius } });
+    return data;
+  },
+
   // Compare vehicles
   compareVehicles: async (vehicleIds: number[]): Promise<ComparisonResponse> => {
     const { data } = await api.post('/compare', {
@@ -175,11 +330,13 @@ export const vehicleApi = {
   },
 
   // View history
-  addToHistory: async (vehicleId: number): Promise<any> => {
-    const { data } = await api.post('/history', {
-      user_id: getSessionId(),
-      vehicle_id: vehicleId,
-    });
+  // Repeats of one view (same idempotencyKey, or the same vehicle soon after) are dropped server-side
+  addToHistory: async (vehicleId: number, idempotencyKey?: string): Promise<any> => {
+    const { data } = await api.post(
+      '/history',
+      { user_id: getSessionId(), vehicle_id: vehicleId },
+      idempotencyKey ? { headers: { 'Idempotency-Key': idempotencyKey } } : undefined,
+    );
     return data;
   },
 
@@ -190,3 +347,60 @@ export const vehicleApi = {
     return data;
   },
 };
+
+// Live catalog changes pushed over /ws/catalog: every vehicle, or only `vehicleIds`.
+// After a `reset` the data on screen may be stale and should be refetched.
+// A dropped connection (e.g. a backend restart) is reopened with backoff; if the
+// catalog changed meanwhile, a `reset` is delivered so the page refetches.
+// Returns a function that closes the connection.
+export const subscribeCatalog = (
+  onMessage: (message: CatalogMessage) => void,
+  vehicleIds?: number[],
+): (() => void) => {
+  if (typeof window === 'undefined') return () => {};
+  let socket: WebSocket | null = null;
+  let retry: ReturnType<typeof setTimeout> | undefined;
+  let attempts = 0;
+  let version: number | null | undefined; // last version seen; undefined before the first hello
+  let closed = false;
+
+  const connect = () => {
+    socket = new WebSocket(`${API_URL.replace(/^http/, 'ws')}/ws/catalog`);
+    socket.onopen = () => {
+      if (vehicleIds) socket?.send(JSON.stringify({ subscribe: vehicleIds }));
+    };
+    socket.onmessage = (event) => {
+      const message: CatalogMessage = JSON.parse(event.data);
+      if (message.type === 'hello') {
+        attempts = 0;
+        if (version !== undefined && message.version !== version) {
+          onMessage({ type: 'reset', version: message.version });
+        }
+      }
+      if (message.version !== undefined) version = message.version;
+      onMessage(message);
+    };
+    socket.onclose = () => {
+      if (closed) return;
+      // 1s, 2s, 4s ... capped at 30s, with jitter so clients do not reconnect in lockstep
+      const delay = Math.min(30000, 1000 * 2 ** attempts) * (0.5 + Math.random() / 2);
+      attempts += 1;
+      retry = setTimeout(connect, delay);
+    };
+  };
+
+  connect();
+  return () => {
+    closed = true;
+    clearTimeout(retry);
+    socket?.close();
+  };
+};
+
+// True if a diff only changed fields of existing vehicles (nothing added or removed)
+export const isFieldUpdate = (message: CatalogMessage): boolean =>
+  message.type === 'diff' && !Object.keys(message.added ?? {}).length && !message.removed?.length;
+
+// Vehicles with the changed fields of a diff applied
+export const applyCatalogDiff = <T extends Vehicle>(vehicles: T[], message: CatalogMessage): T[] =>
+  vehicles.map((v) => (message.updated?.[v.id] ? { ...v, ...message.updated[v.id] } : v));